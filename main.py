@@ -12,6 +12,7 @@ from src.menus.privacy_menus import (
 from src.menus.tor_settings_menu import TorSettingsMenu
 from src.menus.tor_irc_menu import TorIRCMenu
 from src.solana_manager import SolanaManager
+from src.status_bar import create_status_bar
 from src.tor_manager import TorManager
 import questionary
 from questionary import Style
@@ -46,7 +47,7 @@ TOR_MODE_CHOICES = [
     'Exit Terminal'
 ]
 
-async def run_terminal(solana_manager, tor_manager):
+async def run_terminal(solana_manager, tor_manager, status_bar=None):
     irc_menu = IRCMenu()
     settings_menu = SettingsMenu()
     solana_menu = SolanaMenu(solana_manager)
@@ -57,6 +58,9 @@ async def run_terminal(solana_manager, tor_manager):
 
     while True:
         is_tor_mode = tor_manager.onion_mode
+        if status_bar:
+            # Balance and activity are kept current by the RPC websocket between prompts
+            console.print(status_bar.create_status_panel())
         
         if is_tor_mode:
             choices = [f"{choice} [Tor Running]" for choice in TOR_MODE_CHOICES]
@@ -137,8 +141,9 @@ async def main():
         solana_manager = SolanaManager()
         tor_manager = TorManager()
         await solana_manager.initialize()
+        status_bar = await create_status_bar(solana_manager)
         await display_startup_sequence()
-        await run_terminal(solana_manager, tor_manager)
+        await run_terminal(solana_manager, tor_manager, status_bar)
     finally:
         await solana_manager.cleanup()
         if tor_manager.controller:
@@ -0,0 +1,241 @@
+"""Load test for the notification server.
+
+Starts the app in-process on a free port, connects N WebSocket (or SSE)
+clients, has M producers POST /transaction as fast as they can, and
+reports throughput, delivery latency percentiles and memory per connection.
+
+    python benchmark.py --clients 1000 --producers 8 --requests 500
+    python benchmark.py --clients 1000 --transport sse
+"""
+import argparse
+import asyncio
+import os
+import socket
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+# The benchmark must never reach Twilio or the real event log and journal
+_scratch = tempfile.mkdtemp()
+os.environ.setdefault("SMS_TRANSPORT", "fake")
+os.environ.setdefault("EVENT_LOG_PATH", os.path.join(_scratch, "events.log"))
+os.environ.setdefault("JOURNAL_PATH", os.path.join(_scratch, "transactions.db"))
+# Producers share one address and a few wallets; measure the server, not the limiter
+for route in ("TRANSACTION", "BATCH", "WS_TRANSACTION"):
+    os.environ.setdefault(f"RATE_LIMIT_{route}", "0/0")
+
+import aiohttp
+import uvicorn
+import websockets
+
+from main import app
+from src.protocol import JSON, MSGPACK
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Results:
+    def __init__(self):
+        self.sent_at: Dict[str, float] = {}
+        self.delivery: List[float] = []
+        self.request: List[float] = []
+        self.frame_bytes = 0
+        self.frames = 0
+        self.errors = 0
+
+
+async def start_server(port: int):
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, serving
+
+
+async def ws_client(url: str, codec, results: Results, ready: asyncio.Event, done: asyncio.Event):
+    subprotocols = [codec.subprotocol] if codec is not JSON else None
+    async with websockets.connect(url, max_queue=None, subprotocols=subprotocols) as ws:
+        ready.set()
+        while not done.is_set():
+            try:
+                frame = await asyncio.wait_for(ws.recv(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            received = time.perf_counter()
+            results.frames += 1
+            results.frame_bytes += len(frame)
+            message = codec.decode(frame)
+            # Micro-batching clients get arrays of messages
+            for event in iter_events(message):
+                if event.get("type") != "new_transaction":
+                    continue
+                sent = results.sent_at.get(event["data"]["recipient"])
+                if sent is not None:
+                    results.delivery.append(received - sent)
+
+
+async def sse_client(url: str, results: Results, ready: asyncio.Event, done: asyncio.Event):
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=None)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with session.get(url) as response:
+            ready.set()
+            reading = asyncio.ensure_future(read_sse(response, results))
+            await done.wait()
+            reading.cancel()
+
+
+async def read_sse(response, results: Results):
+    async for line in response.content:
+        if not line.startswith(b"data: "):
+            continue
+        received = time.perf_counter()
+        results.frames += 1
+        results.frame_bytes += len(line)
+        event = JSON.decode(line[6:])
+        if event.get("type") == "new_transaction":
+            sent = results.sent_at.get(event["data"]["recipient"])
+            if sent is not None:
+                results.delivery.append(received - sent)
+
+
+def iter_events(message):
+    if isinstance(message, list):
+        for item in message:
+            yield from iter_events(item)
+    elif message.get("type") == "event_batch":
+        yield from message["events"]
+    else:
+        yield message
+
+
+async def producer(base_url: str, producer_id: int, count: int, results: Results):
+    async with aiohttp.ClientSession() as session:
+        for i in range(count):
+            key = f"bench-{producer_id}-{i}"
+            payload = {
+                "wallet_address": f"wallet-{producer_id}",
+                "amount": 1.0,
+                "recipient": key,
+                "phone_number": None
+            }
+            start = time.perf_counter()
+            results.sent_at[key] = start
+            try:
+                async with session.post(f"{base_url}/transaction", json=payload) as response:
+                    await response.read()
+                    if response.status != 200:
+                        results.errors += 1
+            except aiohttp.ClientError:
+                results.errors += 1
+            results.request.append(time.perf_counter() - start)
+
+
+async def open_clients(port: int, count: int, args, codec, results: Results, done: asyncio.Event):
+    tasks = []
+    for i in range(count):
+        ready = asyncio.Event()
+        if args.transport == "sse":
+            url = f"http://127.0.0.1:{port}/events?client_id=bench-client-{i}"
+            client = sse_client(url, results, ready, done)
+        else:
+            url = f"ws://127.0.0.1:{port}/ws/bench-client-{i}?batch_ms={args.batch_ms}"
+            client = ws_client(url, codec, results, ready, done)
+        tasks.append(asyncio.create_task(client))
+        await ready.wait()
+    return tasks
+
+
+async def run(args):
+    codec = MSGPACK if args.codec == "msgpack" else JSON
+    if codec is None:
+        raise SystemExit("msgpack is not installed")
+    port = free_port()
+    server, serving = await start_server(port)
+    results = Results()
+    done = asyncio.Event()
+
+    # Python-level allocations made while connecting, on both ends of each socket
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    clients = await open_clients(port, args.clients, args, codec, results, done)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    connection_bytes = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        producer(f"http://127.0.0.1:{port}", p, args.requests, results)
+        for p in range(args.producers)
+    ))
+    elapsed = time.perf_counter() - start
+
+    # Give the last events time to arrive
+    expected = args.clients * args.producers * args.requests
+    deadline = time.perf_counter() + args.drain_timeout
+    while len(results.delivery) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+
+    done.set()
+    await asyncio.gather(*clients, return_exceptions=True)
+    server.should_exit = True
+    await serving
+
+    report(args, results, elapsed, expected, connection_bytes)
+
+
+def ms(seconds: float) -> str:
+    return f"{seconds * 1000:.2f} ms"
+
+
+def report(args, results: Results, elapsed: float, expected: int, connection_bytes: int):
+    total_requests = args.producers * args.requests
+
+    print(f"clients={args.clients} producers={args.producers} requests={total_requests} "
+          f"transport={args.transport} codec={args.codec} batch_ms={args.batch_ms}")
+    print(f"throughput:       {total_requests / elapsed:.0f} req/s, "
+          f"{len(results.delivery) / elapsed:.0f} deliveries/s")
+    print(f"errors:           {results.errors}")
+    if results.frames:
+        print(f"frame size:       {results.frame_bytes / results.frames:.0f} bytes avg")
+    print(f"delivered:        {len(results.delivery)}/{expected}")
+    print(f"POST latency:     p50 {ms(percentile(results.request, 50))}  "
+          f"p95 {ms(percentile(results.request, 95))}  p99 {ms(percentile(results.request, 99))}")
+    print(f"delivery latency: p50 {ms(percentile(results.delivery, 50))}  "
+          f"p95 {ms(percentile(results.delivery, 95))}  p99 {ms(percentile(results.delivery, 99))}")
+    if args.clients:
+        print(f"memory/conn:      {connection_bytes / args.clients / 1024:.1f} KiB "
+              f"(Python heap, client and server side)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notification server load test")
+    parser.add_argument("--clients", type=int, default=100, help="concurrent WebSocket clients")
+    parser.add_argument("--producers", type=int, default=4, help="concurrent POST /transaction producers")
+    parser.add_argument("--requests", type=int, default=250, help="requests per producer")
+    parser.add_argument("--transport", choices=("ws", "sse"), default="ws",
+                        help="how clients subscribe: WebSocket or Server-Sent Events")
+    parser.add_argument("--codec", choices=("json", "msgpack"), default="json",
+                        help="WebSocket subprotocol the clients negotiate")
+    parser.add_argument("--batch-ms", type=float, default=0,
+                        help="per-client micro-batching window (0 disables)")
+    parser.add_argument("--drain-timeout", type=float, default=10.0,
+                        help="seconds to wait for outstanding deliveries")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
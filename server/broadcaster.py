@@ -0,0 +1,306 @@
+from fastapi import WebSocket
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import logging
+import os
+import time
+import metrics
+from src.protocol import JSON, Frame
+from src.tasks import spawn
+
+# Per-client send queue size and what to do when a client can't keep up:
+#   "disconnect"  - drop the slow consumer entirely
+#   "drop_oldest" - keep the client but discard its oldest queued frames
+DEFAULT_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+DEFAULT_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "drop_oldest")
+
+WS_SEND_SECONDS = metrics.histogram(
+    "ws_send_duration_seconds", "Time to write one frame to a WebSocket"
+)
+WS_FRAMES_DROPPED = metrics.counter(
+    "ws_frames_dropped_total", "Frames discarded because a client's send queue was full"
+)
+WS_SLOW_CLIENTS_DROPPED = metrics.counter(
+    "ws_slow_clients_dropped_total", "Clients disconnected because their send queue was full"
+)
+WS_FRAMES_COALESCED = metrics.counter(
+    "ws_frames_coalesced_total", "Frames merged into array frames by micro-batching clients"
+)
+EVENTS_PUBLISHED = metrics.counter(
+    "events_published_total", "Events handed to the local broadcaster"
+)
+
+
+class ClientConnection:
+    """A connected WebSocket with its own bounded send queue and writer task"""
+
+    def __init__(
+        self,
+        client_id: str,
+        websocket: WebSocket,
+        max_queue: int = DEFAULT_QUEUE_SIZE,
+        overflow_policy: str = DEFAULT_OVERFLOW_POLICY,
+        codec=JSON,
+        batch_window: float = 0.0,
+        batch_max: int = 1
+    ):
+        self.client_id = client_id
+        self.websocket = websocket
+        self.codec = codec
+        # Micro-batching: gather up to batch_max frames for batch_window seconds into one array frame
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self.overflow_policy = overflow_policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.topics: Set[str] = set()
+        # Whether the client gets every event while it has no subscriptions
+        self.firehose = True
+        self.paused = False
+        self.dropped = 0
+        self.closed = False
+        # Monotonic time of the last frame received from the client
+        self.last_seen = time.monotonic()
+        self.writer_task: Optional[asyncio.Task] = None
+        self._on_close = None
+
+    def start(self, on_close=None):
+        self._on_close = on_close
+        self.writer_task = asyncio.create_task(self._writer())
+
+    def offer(self, frame: Frame) -> bool:
+        """Queue a pre-serialized frame without waiting. Returns False if the client was dropped."""
+        if self.closed:
+            return False
+        if self.paused:
+            # Replay in progress; the replay covers anything skipped here
+            return True
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.overflow_policy == "disconnect":
+            logging.warning(f"Dropping slow WebSocket client {self.client_id}")
+            WS_SLOW_CLIENTS_DROPPED.inc()
+            self.close()
+            return False
+
+        # Downgrade: discard the oldest frame to make room for the newest
+        try:
+            self.queue.get_nowait()
+            self.dropped += 1
+            WS_FRAMES_DROPPED.inc()
+        except asyncio.QueueEmpty:
+            pass
+        self.queue.put_nowait(frame)
+        return True
+
+    async def send_json(self, data: dict):
+        """Queue a direct reply, waiting for room instead of dropping it"""
+        if not self.closed:
+            await self.queue.put(self.codec.encode(data))
+
+    async def _writer(self):
+        send = self.websocket.send_bytes if self.codec.binary else self.websocket.send_text
+        try:
+            while True:
+                frame = await self.queue.get()
+                if self.dropped:
+                    lagged = self.codec.encode({"type": "lagged", "dropped": self.dropped})
+                    self.dropped = 0
+                    await send(lagged)
+                if self.batch_max > 1:
+                    frame = await self._gather(frame)
+                start = time.perf_counter()
+                await send(frame)
+                WS_SEND_SECONDS.observe(time.perf_counter() - start)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logging.error(f"WebSocket send error for {self.client_id}: {e}")
+        finally:
+            self.closed = True
+            if self._on_close:
+                self._on_close(self)
+
+    async def _gather(self, first: Frame) -> Frame:
+        """Collect frames arriving within the batch window into one array frame"""
+        if self.batch_window and self.queue.qsize() < self.batch_max - 1:
+            await asyncio.sleep(self.batch_window)
+        frames = [first]
+        while len(frames) < self.batch_max and not self.queue.empty():
+            frames.append(self.queue.get_nowait())
+        if len(frames) == 1:
+            return first
+        WS_FRAMES_COALESCED.inc(len(frames))
+        return self.codec.array_frame(frames)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.writer_task and self.writer_task is not asyncio.current_task():
+            self.writer_task.cancel()
+        if self._on_close:
+            self._on_close(self)
+        spawn(self._close_socket())
+
+    async def _close_socket(self):
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+
+
+def wallet_topic(address: str) -> str:
+    return f"wallet:{address}"
+
+def event_topic(event_type: str) -> str:
+    return f"event:{event_type}"
+
+
+class Broadcaster:
+    """Fans events out to subscribed clients without waiting on any of them.
+
+    Clients that never subscribe to anything keep receiving every event, as
+    before; once a client subscribes it only gets events for its topics.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = DEFAULT_QUEUE_SIZE,
+        overflow_policy: str = DEFAULT_OVERFLOW_POLICY
+    ):
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.connections: Dict[str, ClientConnection] = {}
+        self.subscribers: Dict[str, Set[ClientConnection]] = {}
+        self.firehose: Set[ClientConnection] = set()
+
+    def register(
+        self,
+        client_id: str,
+        websocket: WebSocket,
+        codec=JSON,
+        batch_window: float = 0.0,
+        batch_max: int = 1,
+        firehose: bool = True
+    ) -> ClientConnection:
+        conn = ClientConnection(
+            client_id, websocket, self.max_queue, self.overflow_policy, codec, batch_window, batch_max
+        )
+        conn.firehose = firehose
+        return self.add(conn)
+
+    def add(self, conn: ClientConnection) -> ClientConnection:
+        """Start routing events to an already-built connection"""
+        previous = self.connections.get(conn.client_id)
+        if previous:
+            previous.close()
+        self.connections[conn.client_id] = conn
+        if conn.firehose:
+            self.firehose.add(conn)
+        conn.start(on_close=self._forget)
+        return conn
+
+    def unregister(self, conn: ClientConnection):
+        self._forget(conn)
+        conn.close()
+
+    def _forget(self, conn: ClientConnection):
+        if self.connections.get(conn.client_id) is conn:
+            del self.connections[conn.client_id]
+        self.firehose.discard(conn)
+        for topic in conn.topics:
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(conn)
+                if not subscribers:
+                    del self.subscribers[topic]
+        conn.topics.clear()
+
+    def subscribe(self, conn: ClientConnection, topics: Iterable[str]) -> List[str]:
+        if conn.closed:
+            return []
+        for topic in topics:
+            self.subscribers.setdefault(topic, set()).add(conn)
+            conn.topics.add(topic)
+        if conn.topics:
+            self.firehose.discard(conn)
+        return sorted(conn.topics)
+
+    def unsubscribe(self, conn: ClientConnection, topics: Iterable[str]) -> List[str]:
+        for topic in topics:
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(conn)
+                if not subscribers:
+                    del self.subscribers[topic]
+            conn.topics.discard(topic)
+        if not conn.topics and not conn.closed and conn.firehose:
+            self.firehose.add(conn)
+        return sorted(conn.topics)
+
+    def wants(self, conn: ClientConnection, topics: Iterable[str]) -> bool:
+        """Whether an event with these topics would be routed to conn"""
+        return (conn.firehose and not conn.topics) or not conn.topics.isdisjoint(topics)
+
+    def recipients(self, topics: Iterable[str]) -> Set[ClientConnection]:
+        """Clients that should see an event tagged with the given topics"""
+        targets = set(self.firehose)
+        for topic in topics:
+            subscribers = self.subscribers.get(topic)
+            if subscribers:
+                targets |= subscribers
+        return targets
+
+    def publish(self, event: dict, topics: Iterable[str] = ()) -> int:
+        """Serialize an event once per codec and queue it for its subscribers.
+
+        Returns the number of clients reached.
+        """
+        EVENTS_PUBLISHED.inc()
+        frames: Dict[object, Frame] = {}
+        delivered = 0
+        for conn in self.recipients(topics):
+            frame = frames.get(conn.codec)
+            if frame is None:
+                frame = frames[conn.codec] = conn.codec.encode(event)
+            if conn.offer(frame):
+                delivered += 1
+        return delivered
+
+    def publish_batch(self, items: List[Tuple[dict, List[str]]]) -> int:
+        """Send each client one frame holding just the events it subscribes to.
+
+        Every event is serialized once per codec; per-client frames are
+        built by joining the pre-serialized events.
+        """
+        EVENTS_PUBLISHED.inc(len(items))
+        per_client: Dict[ClientConnection, List[Frame]] = {}
+        for event, topics in items:
+            encoded: Dict[object, Frame] = {}
+            for conn in self.recipients(topics):
+                frame = encoded.get(conn.codec)
+                if frame is None:
+                    frame = encoded[conn.codec] = conn.codec.encode(event)
+                per_client.setdefault(conn, []).append(frame)
+
+        delivered = 0
+        for conn, encoded_events in per_client.items():
+            frame = conn.codec.batch_frame(encoded_events)
+            if conn.offer(frame):
+                delivered += 1
+        return delivered
+
+    def deliver(self, items: List[Tuple[dict, List[str]]]) -> int:
+        """Broker handler: single events go out as-is, batches as one frame per client"""
+        if len(items) == 1:
+            event, topics = items[0]
+            return self.publish(event, topics)
+        return self.publish_batch(items)
+
+    async def close(self):
+        for conn in list(self.connections.values()):
+            self.unregister(conn)
@@ -0,0 +1,252 @@
+from typing import Callable, List, Optional, Set, Tuple
+import json
+import asyncio
+import fcntl
+import logging
+import os
+import struct
+
+# An event together with the topics it is routed by
+EventItem = Tuple[dict, List[str]]
+
+# Called with every batch of events this worker should deliver
+EventHandler = Callable[[List[EventItem]], object]
+
+# Stamps a batch (e.g. with sequence numbers) once, before it fans out
+Sequencer = Callable[[List[EventItem]], List[EventItem]]
+
+_FRAME_HEADER = struct.Struct(">I")
+
+
+class EventBroker:
+    """Carries published events to the broadcaster of every server worker"""
+
+    def __init__(self):
+        self._handler: Optional[EventHandler] = None
+        self._sequencer: Optional[Sequencer] = None
+
+    def set_handler(self, handler: EventHandler):
+        self._handler = handler
+
+    def set_sequencer(self, sequencer: Sequencer):
+        """Run by exactly one worker for every event, so all workers agree on the result"""
+        self._sequencer = sequencer
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def publish(self, event: dict, topics: List[str]):
+        self.publish_batch([(event, topics)])
+
+    def publish_batch(self, items: List[EventItem]):
+        raise NotImplementedError
+
+    def _sequence(self, items: List[EventItem]) -> List[EventItem]:
+        if self._sequencer:
+            try:
+                return self._sequencer(items)
+            except Exception as e:
+                logging.error(f"Event sequencing error: {e}")
+        return items
+
+    def _deliver(self, items: List[EventItem]):
+        if self._handler:
+            try:
+                self._handler(items)
+            except Exception as e:
+                logging.error(f"Event delivery error: {e}")
+
+
+class InProcessBroker(EventBroker):
+    """Single-worker broker: publishing is a direct call into the local broadcaster"""
+
+    def publish_batch(self, items: List[EventItem]):
+        self._deliver(self._sequence(items))
+
+
+class UnixSocketBroker(EventBroker):
+    """Inter-process broker for `uvicorn --workers N` on one host.
+
+    Whichever worker holds the lock file next to the socket is the hub and
+    listens on the socket; the others connect to it. Every event goes through the hub, which delivers it
+    locally and relays it to every connected worker (including the one that
+    published it), so all workers see events in the same order and only the
+    hub runs the sequencer. If the hub goes away, the remaining workers race
+    to take over.
+
+    The hub registers a worker before acknowledging it with an empty frame,
+    and start() waits for that ack, so nothing published afterwards can miss
+    it. A connection whose unsent data passes `max_buffer` bytes is dropped
+    and the worker rejoins, rather than buffering without limit.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        reconnect_delay: float = 0.5,
+        ack_timeout: float = 5.0,
+        max_buffer: int = 8 * 1024 * 1024
+    ):
+        super().__init__()
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self.ack_timeout = ack_timeout
+        self.max_buffer = max_buffer
+        self.is_hub = False
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Set[asyncio.StreamWriter] = set()
+        self._hub_writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._lock_fd: Optional[int] = None
+
+    async def start(self):
+        self._stopping = False
+        while not await self._join():
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def stop(self):
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._hub_writer:
+            self._hub_writer.close()
+            self._hub_writer = None
+        for writer in list(self._peers):
+            writer.close()
+        self._peers.clear()
+        if self._server:
+            self._server.close()
+            self._server = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self.is_hub = False
+
+    def publish_batch(self, items: List[EventItem]):
+        if self.is_hub:
+            items = self._sequence(items)
+            self._relay(self._encode(items))
+            self._deliver(items)
+        elif self._hub_writer and self._send(self._hub_writer, self._encode(items)):
+            pass
+        else:
+            # Hub unreachable: keep local clients working (unsequenced) until we rejoin
+            self._deliver(items)
+
+    async def _join(self) -> bool:
+        """Become the hub if nobody holds the lock, otherwise connect to the hub"""
+        if self._try_lock():
+            # The lock dies with its process, so any socket file still here is stale
+            self._server = await asyncio.start_unix_server(self._serve_peer, path=self.path)
+            self.is_hub = True
+            logging.info(f"Event broker hub listening on {self.path}")
+            return True
+
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # The hub holds the lock but isn't listening yet
+            return False
+        try:
+            # The hub relays to us from the moment it sends this
+            await asyncio.wait_for(self._read_frame(reader), self.ack_timeout)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            writer.close()
+            return False
+
+        self._hub_writer = writer
+        self.is_hub = False
+        self._task = asyncio.create_task(self._follow_hub(reader))
+        return True
+
+    def _try_lock(self) -> bool:
+        fd = os.open(f"{self.path}.lock", os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    async def _follow_hub(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                self._deliver(await self._read_frame(reader))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logging.warning("Lost connection to event broker hub")
+        finally:
+            if self._hub_writer:
+                self._hub_writer.close()
+                self._hub_writer = None
+
+        while not self._stopping:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                if await self._join():
+                    return
+            except OSError as e:
+                logging.warning(f"Event broker rejoin failed: {e}")
+
+    async def _serve_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._peers.add(writer)
+        writer.write(self._encode([]))
+        try:
+            while True:
+                items = self._sequence(await self._read_frame(reader))
+                self._relay(self._encode(items))
+                self._deliver(items)
+                # Don't take more from a worker that isn't reading what we send it
+                await asyncio.wait_for(writer.drain(), self.ack_timeout)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    def _relay(self, frame: bytes):
+        for writer in list(self._peers):
+            if not self._send(writer, frame):
+                self._peers.discard(writer)
+
+    def _send(self, writer: asyncio.StreamWriter, frame: bytes) -> bool:
+        """Queue a frame, or close a connection too far behind; False if it is closed"""
+        if writer.is_closing():
+            return False
+        if writer.transport.get_write_buffer_size() > self.max_buffer:
+            logging.warning("Event broker connection fell too far behind, dropping it")
+            writer.close()
+            return False
+        writer.write(frame)
+        return True
+
+    @staticmethod
+    def _encode(items: List[EventItem]) -> bytes:
+        body = json.dumps([[event, list(topics)] for event, topics in items]).encode()
+        return _FRAME_HEADER.pack(len(body)) + body
+
+    @staticmethod
+    async def _read_frame(reader: asyncio.StreamReader) -> List[EventItem]:
+        header = await reader.readexactly(_FRAME_HEADER.size)
+        (length,) = _FRAME_HEADER.unpack(header)
+        return [(event, topics) for event, topics in json.loads(await reader.readexactly(length))]
+
+
+def create_broker() -> EventBroker:
+    """Pick a broker from EVENT_BROKER ("memory" or "unix")"""
+    kind = os.getenv("EVENT_BROKER", "memory")
+    if kind == "unix":
+        path = os.getenv("EVENT_BROKER_PATH", "/tmp/ica-events.sock")
+        return UnixSocketBroker(path)
+    if kind != "memory":
+        logging.warning(f"Unknown EVENT_BROKER '{kind}', using in-process broker")
+    return InProcessBroker()
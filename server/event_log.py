@@ -0,0 +1,158 @@
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+import json
+import logging
+import os
+
+# A logged event: (seq, event, topics)
+LogEntry = Tuple[int, dict, List[str]]
+
+
+class EventLog:
+    """Sequence numbers and a replay buffer for broadcast events.
+
+    Only the sequencer (the broker hub, or the single in-process worker)
+    stamps events and appends them to the on-disk segment. Every worker
+    records stamped events in its in-memory ring, and falls back to reading
+    the shared segment files when a client asks for something older.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        capacity: int = 10000,
+        max_segment_bytes: int = 64 * 1024 * 1024
+    ):
+        self.path = path
+        self.max_segment_bytes = max_segment_bytes
+        self.ring: Deque[LogEntry] = deque(maxlen=capacity)
+        self.last_seq = self._recover_last_seq()
+        self._segment = None
+
+    def _recover_last_seq(self) -> int:
+        for path in (self.path, f"{self.path}.1"):
+            last_line = None
+            try:
+                with open(path, "rb") as f:
+                    for line in f:
+                        if line.strip():
+                            last_line = line
+            except FileNotFoundError:
+                continue
+            if last_line:
+                try:
+                    return json.loads(last_line)["seq"]
+                except (ValueError, KeyError):
+                    logging.warning(f"Ignoring corrupt tail of event log {path}")
+        return 0
+
+    def stamp(self, items: List[Tuple[dict, List[str]]]) -> List[Tuple[dict, List[str]]]:
+        """Assign sequence numbers and append to the segment file (sequencer only)"""
+        lines = []
+        for event, topics in items:
+            self.last_seq += 1
+            event["seq"] = self.last_seq
+            lines.append(json.dumps({"seq": self.last_seq, "event": event, "topics": topics}))
+
+        try:
+            segment = self._open_segment()
+            segment.write("\n".join(lines) + "\n")
+            segment.flush()
+        except OSError as e:
+            logging.error(f"Event log write error: {e}")
+        return items
+
+    def record(self, items: List[Tuple[dict, List[str]]]):
+        """Keep stamped events in the in-memory replay ring"""
+        for event, topics in items:
+            seq = event.get("seq")
+            if seq is None:
+                continue
+            self.ring.append((seq, event, topics))
+            if seq > self.last_seq:
+                self.last_seq = seq
+
+    def since_in_memory(self, after_seq: int) -> Optional[List[LogEntry]]:
+        """Entries newer than after_seq, or None if the ring no longer reaches back that far"""
+        if not self.ring:
+            return [] if after_seq >= self.last_seq else None
+        oldest = self.ring[0][0]
+        if after_seq < oldest - 1:
+            return None
+        return [entry for entry in self.ring if entry[0] > after_seq]
+
+    def read_from_disk(self, after_seq: int, until_seq: int) -> List[LogEntry]:
+        """Entries in (after_seq, until_seq] from the segment files. Blocking; run in a thread."""
+        entries = []
+        for path in (f"{self.path}.1", self.path):
+            try:
+                with open(path, "rb") as f:
+                    # Segments are in seq order: start at after_seq and stop past until_seq
+                    _seek_after(f, after_seq)
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        record = json.loads(line)
+                        if record["seq"] > until_seq:
+                            return entries
+                        if record["seq"] > after_seq:
+                            entries.append((record["seq"], record["event"], record["topics"]))
+            except FileNotFoundError:
+                continue
+            except ValueError as e:
+                logging.error(f"Event log read error in {path}: {e}")
+        return entries
+
+    def _open_segment(self):
+        if self._segment is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._segment = open(self.path, "a")
+        elif self._segment.tell() >= self.max_segment_bytes:
+            # Keep one previous segment around for replay
+            self._segment.close()
+            os.replace(self.path, f"{self.path}.1")
+            self._segment = open(self.path, "a")
+        return self._segment
+
+    def close(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+
+def _seek_after(f, after_seq: int):
+    """Position a segment file at its first line with a seq above after_seq.
+
+    Binary search over byte offsets: each probe reads the first whole line
+    at or after the offset, so a 64MB segment takes a few dozen reads.
+    """
+    lo, hi = 0, os.fstat(f.fileno()).st_size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        seq = _seq_at(f, mid)
+        if seq is None or seq > after_seq:
+            hi = mid
+        else:
+            lo = mid + 1
+    _line_start(f, lo)
+
+
+def _seq_at(f, offset: int) -> Optional[int]:
+    """Seq of the first complete line at or after offset; None at the end or a torn tail"""
+    _line_start(f, offset)
+    for line in iter(f.readline, b""):
+        if line.strip():
+            try:
+                return json.loads(line)["seq"]
+            except (ValueError, KeyError):
+                return None
+    return None
+
+
+def _line_start(f, offset: int):
+    if offset == 0:
+        f.seek(0)
+    else:
+        # Finish the line offset falls in; a newline just before it means it starts one
+        f.seek(offset - 1)
+        f.readline()
@@ -0,0 +1,105 @@
+from typing import Hashable, List, Optional, Set
+import asyncio
+import logging
+import math
+import time
+import metrics
+
+WS_REAPED = metrics.counter(
+    "ws_connections_reaped_total", "WebSocket clients closed for sending nothing within the idle timeout"
+)
+
+
+class TimerWheel:
+    """Hashed timing wheel: O(1) scheduling, and one tick expires a whole slot.
+
+    Delays are rounded up to whole ticks and capped at one revolution, so
+    callers re-check how much time is really left when an item fires.
+    """
+
+    def __init__(self, tick: float, slots: int):
+        self.tick = tick
+        self.slots: List[Set[Hashable]] = [set() for _ in range(max(slots, 2))]
+        self.cursor = 0
+
+    def schedule(self, item: Hashable, delay: float):
+        ticks = min(max(1, math.ceil(delay / self.tick)), len(self.slots) - 1)
+        self.slots[(self.cursor + ticks) % len(self.slots)].add(item)
+
+    def advance(self) -> Set[Hashable]:
+        """Move one tick forward and return the items due on it"""
+        self.cursor = (self.cursor + 1) % len(self.slots)
+        due = self.slots[self.cursor]
+        self.slots[self.cursor] = set()
+        return due
+
+
+class HeartbeatMonitor:
+    """Pings quiet WebSocket clients and reaps the ones that stay silent.
+
+    Only tracked connections are watched, i.e. clients that said they
+    answer application pings; a receive-only subscriber would otherwise
+    be reaped for listening. Any frame from a client counts as a sign of
+    life, a pong included.
+    Each connection sits in exactly one wheel slot; when the slot fires
+    the connection is pinged, reaped or rescheduled from its last_seen
+    time, so activity never has to touch the wheel. A single task drives
+    every connection.
+    """
+
+    def __init__(self, broadcaster, ping_interval: float, idle_timeout: float, tick: float = 1.0):
+        self.broadcaster = broadcaster
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        self.enabled = ping_interval > 0 or idle_timeout > 0
+        horizon = max(ping_interval, idle_timeout)
+        self.wheel = TimerWheel(tick, math.ceil(horizon / tick) + 1)
+        self._task: Optional[asyncio.Task] = None
+
+    def track(self, conn):
+        if not self.enabled:
+            return
+        conn.last_seen = time.monotonic()
+        self.wheel.schedule(conn, self._interval())
+
+    async def start(self):
+        if self.enabled:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _interval(self) -> float:
+        return self.ping_interval or self.idle_timeout
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + self.wheel.tick
+        while True:
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            # Catch up tick by tick if the loop was busy for longer than a tick
+            while next_tick <= loop.time():
+                now = time.monotonic()
+                for conn in self.wheel.advance():
+                    self._check(conn, now)
+                next_tick += self.wheel.tick
+
+    def _check(self, conn, now: float):
+        if conn.closed:
+            return
+        idle = now - conn.last_seen
+        if self.idle_timeout and idle >= self.idle_timeout:
+            WS_REAPED.inc()
+            logging.info(f"Closing idle WebSocket client {conn.client_id} after {idle:.0f}s")
+            self.broadcaster.unregister(conn)
+            return
+        if self.ping_interval and idle >= self.ping_interval:
+            conn.offer(conn.codec.encode({"type": "ping", "ts": time.time()}))
+            delay = self.ping_interval
+        else:
+            delay = self._interval() - idle
+        if self.idle_timeout:
+            delay = min(delay, self.idle_timeout - idle)
+        self.wheel.schedule(conn, delay)
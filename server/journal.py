@@ -0,0 +1,202 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import metrics
+
+JOURNAL_COMMIT_SECONDS = metrics.histogram(
+    "journal_commit_duration_seconds", "Time to write and commit one group of journal rows"
+)
+JOURNAL_ROWS = metrics.counter("journal_rows_written_total", "Transactions written to the journal")
+JOURNAL_DROPPED = metrics.counter(
+    "journal_rows_dropped_total", "Transactions not journaled because the write queue was full"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    wallet TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    amount REAL NOT NULL,
+    type TEXT NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_wallet ON transactions (wallet, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_recipient ON transactions (recipient, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_created_at ON transactions (created_at);
+"""
+
+COLUMNS = "id, created_at, wallet, recipient, amount, type, metadata"
+
+MAX_ROWID = 2 ** 63 - 1
+
+Row = Tuple[float, str, str, float, str, Optional[str]]
+
+
+class TransactionJournal:
+    """Append-only SQLite record of accepted transactions.
+
+    Writes are queued and committed in groups by a single writer thread, so
+    a burst of requests costs one fsync rather than one per transaction.
+    Reads use their own connection; WAL mode lets them run alongside writes.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10000, batch_size: int = 500):
+        self.path = path
+        self.batch_size = batch_size
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        # sqlite3 connections stay on the thread that created them
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal-write")
+        self._read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal-read")
+        self._writer: Optional[sqlite3.Connection] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._write_executor, self._open_writer)
+        await loop.run_in_executor(self._read_executor, self._open_reader)
+        self._task = asyncio.create_task(self._write_loop())
+
+    async def stop(self, timeout: float = 10.0):
+        """Flush what is queued, giving up after `timeout` seconds.
+
+        Rows still queued then are logged in full, so they can be replayed by hand.
+        """
+        if self._task:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                rows = []
+                while not self.queue.empty():
+                    rows.append(self.queue.get_nowait())
+                    self.queue.task_done()
+                logging.error(f"Journal stopped with {len(rows)} transactions unwritten")
+                for row in rows:
+                    logging.error(f"Unwritten journal row: {json.dumps(row)}")
+            self._task.cancel()
+            self._task = None
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._write_executor, self._close, "_writer")
+        await loop.run_in_executor(self._read_executor, self._close, "_reader")
+
+    def append(self, wallet: str, recipient: str, amount: float, transaction_type: str,
+               metadata: Optional[Dict[str, Any]] = None):
+        """Queue a transaction for the next group commit without waiting"""
+        row = (
+            time.time(), wallet, recipient, amount, transaction_type,
+            json.dumps(metadata) if metadata else None
+        )
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            JOURNAL_DROPPED.inc()
+            logging.error(f"Journal queue full, transaction from {wallet} not recorded")
+
+    async def query(
+        self,
+        wallet: Optional[str] = None,
+        cursor: Optional[int] = None,
+        limit: int = 100
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Newest-first page of transactions (sent or received by wallet, if given).
+
+        Returns the rows and the cursor for the next page, or None on the last page.
+        """
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(
+            self._read_executor, self._select, wallet, cursor, limit + 1
+        )
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            rows = [await self.queue.get()]
+            while len(rows) < self.batch_size and not self.queue.empty():
+                rows.append(self.queue.get_nowait())
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(self._write_executor, self._insert, rows)
+                JOURNAL_ROWS.inc(len(rows))
+            except sqlite3.Error as e:
+                logging.error(f"Journal write error, {len(rows)} transactions lost: {e}")
+            finally:
+                JOURNAL_COMMIT_SECONDS.observe(time.perf_counter() - start)
+                for _ in rows:
+                    self.queue.task_done()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _open_writer(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        # Durable at checkpoints; a crash can only lose the last few commits
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer.executescript(SCHEMA)
+        self._writer.commit()
+
+    def _open_reader(self):
+        self._reader = self._connect()
+
+    def _close(self, attribute: str):
+        conn = getattr(self, attribute)
+        if conn is not None:
+            conn.close()
+            setattr(self, attribute, None)
+
+    def _insert(self, rows: List[Row]):
+        with self._writer:
+            self._writer.executemany(
+                "INSERT INTO transactions (created_at, wallet, recipient, amount, type, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def _select(self, wallet: Optional[str], cursor: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        before = cursor if cursor is not None else MAX_ROWID
+        if wallet is None:
+            rows = self._reader.execute(
+                f"SELECT {COLUMNS} FROM transactions WHERE id < ? ORDER BY id DESC LIMIT ?",
+                (before, limit)
+            ).fetchall()
+        else:
+            # Each branch walks its own index backwards; the outer sort merges two short lists
+            rows = self._reader.execute(
+                f"""
+                SELECT * FROM (
+                    SELECT {COLUMNS} FROM transactions
+                    WHERE wallet = ? AND id < ? ORDER BY id DESC LIMIT ?
+                )
+                UNION
+                SELECT * FROM (
+                    SELECT {COLUMNS} FROM transactions
+                    WHERE recipient = ? AND id < ? ORDER BY id DESC LIMIT ?
+                )
+                ORDER BY id DESC LIMIT ?
+                """,
+                (wallet, before, limit, wallet, before, limit, limit)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "created_at": row["created_at"],
+            "wallet": row["wallet"],
+            "recipient": row["recipient"],
+            "amount": row["amount"],
+            "type": row["type"],
+            "metadata": json.loads(row["metadata"]) if row["metadata"] else None
+        }
@@ -1,12 +1,31 @@
-from fastapi import FastAPI, HTTPException, WebSocket
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from twilio.rest import Client
-from typing import Dict, Optional
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+import os
+import sys
+
+# The message schema and codecs are shared with the CLI in src/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.protocol import JSON, ProtocolError, TransactionMessage, codec_for_content_type, negotiate
+from broadcaster import Broadcaster, ClientConnection, wallet_topic, event_topic
+from event_broker import create_broker
+from event_log import EventLog
+from heartbeat import HeartbeatMonitor
+from journal import TransactionJournal
+from pipeline import MessagePipeline
+from rate_limit import RateLimiter
+from sms_dispatcher import SmsDispatcher, create_transport
+from sse import SseConnection
 import json
 import asyncio
 import logging
-import os
+import math
+import time
+import uuid
+import metrics
 
 # Initialize FastAPI
 app = FastAPI()
@@ -20,72 +39,536 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Twilio setup
-twilio_client = Client(
-    os.getenv("TWILIO_ACCOUNT_SID"),
-    os.getenv("TWILIO_AUTH_TOKEN")
+# SMS goes out from a background worker pool (Twilio, or SMS_TRANSPORT=fake)
+sms_dispatcher = SmsDispatcher(
+    create_transport(),
+    max_queue=int(os.getenv("SMS_QUEUE_SIZE", "1000")),
+    workers=int(os.getenv("SMS_WORKERS", "4")),
+    coalesce_window=float(os.getenv("SMS_COALESCE_SECONDS", "1.0"))
+)
+metrics.callback_gauge(
+    "sms_queue_depth", "Phone numbers waiting for an SMS worker",
+    lambda: [({}, sms_dispatcher.queue.qsize())]
+)
+
+# Active connections, each with its own send queue and writer task
+broadcaster = Broadcaster()
+
+# Token-bucket limits per route as "rate/burst"; override with RATE_LIMIT_<ROUTE>
+rate_limiter = RateLimiter({
+    "transaction": "5/20",
+    # Charged per record, and to each wallet per record of it
+    "batch": "50/500",
+    "ws_transaction": "10/40"
+})
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "Latency of transaction endpoints",
+    labelnames=("method", "route", "status")
+)
+CONNECTIONS_REJECTED = metrics.counter(
+    "connections_rejected_total", "Streaming clients turned away at the connection cap",
+    labelnames=("transport",)
+)
+metrics.callback_gauge(
+    "ws_active_connections", "Connected WebSocket clients",
+    lambda: [({}, len(broadcaster.connections))]
+)
+metrics.callback_gauge(
+    "ws_send_queue_depth", "Frames waiting in each client's send queue",
+    lambda: [({"client_id": c.client_id}, c.queue.qsize()) for c in broadcaster.connections.values()]
+)
+
+# Sequence-numbered history of broadcast events, for resume-on-reconnect
+event_log = EventLog(
+    os.getenv("EVENT_LOG_PATH", os.path.join("logs", "events.log")),
+    capacity=int(os.getenv("EVENT_LOG_CAPACITY", "10000"))
+)
+
+# Durable history of accepted transactions, written in group commits
+journal = TransactionJournal(os.getenv("JOURNAL_PATH", os.path.join("logs", "transactions.db")))
+MAX_HISTORY_PAGE = 1000
+
+# Upper bounds for per-client micro-batching requested in the WebSocket handshake
+MAX_BATCH_MS = 100
+MAX_BATCH_FRAMES = 1000
+# Hard cap on WebSocket and SSE clients; new ones are refused once it is reached
+MAX_CONNECTIONS = int(os.getenv("MAX_CONNECTIONS", "10000"))
+
+# Clients that connect with ?heartbeat=1 promise to answer {"type":"ping"}: they
+# are pinged every WS_PING_INTERVAL seconds when quiet and closed after
+# WS_IDLE_TIMEOUT seconds without a frame; 0 disables either. Everyone else is
+# covered by uvicorn's protocol-level pings and by failed sends.
+heartbeat = HeartbeatMonitor(
+    broadcaster,
+    ping_interval=float(os.getenv("WS_PING_INTERVAL", "20")),
+    idle_timeout=float(os.getenv("WS_IDLE_TIMEOUT", "60"))
 )
 
-# Store active connections
-connections: Dict[str, WebSocket] = {}
+# Messages from one WebSocket that may be handled at the same time
+WS_MAX_IN_FLIGHT = int(os.getenv("WS_MAX_IN_FLIGHT", "32"))
+
+# Replayed events are sent to resuming clients in frames of this many events
+REPLAY_FRAME_SIZE = 500
+
+def deliver_events(items):
+    event_log.record(items)
+    broadcaster.deliver(items)
+
+# Events are published through the broker so every worker's clients see them
+broker = create_broker()
+broker.set_sequencer(event_log.stamp)
+broker.set_handler(deliver_events)
+
+# Batch requests are validated and broadcast this many records at a time
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "500"))
 
 class TransactionRequest(BaseModel):
     wallet_address: str
     amount: float
     recipient: str
     phone_number: Optional[str]
+    type: str = "transfer"
+    metadata: Optional[Dict[str, Any]] = None
+
+# REST requests are validated by pydantic, batch and WebSocket messages by the shared schema
+Transaction = Union[TransactionRequest, TransactionMessage]
+
+class TransactionTiming:
+    """Times /transaction* requests until the last byte of the response.
+
+    Plain ASGI rather than @app.middleware("http"): that wraps every
+    response in its own streaming task, /events included, and stops the
+    clock at the headers, before a batch has streamed its results.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/transaction"):
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            # The matched route's template, not the raw path, so unknown paths can't add series
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], route.path if route else "unmatched", status
+            ).observe(time.perf_counter() - start)
+
+app.add_middleware(TransactionTiming)
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    await websocket.accept()
-    connections[client_id] = websocket
+    if len(broadcaster.connections) >= MAX_CONNECTIONS:
+        # Refused during the handshake, before any per-connection state exists
+        CONNECTIONS_REJECTED.labels("ws").inc()
+        await websocket.close(code=1013)
+        return
+    # Clients opt into a binary codec via Sec-WebSocket-Protocol; plain JSON otherwise
+    codec = negotiate(websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=codec.subprotocol if codec else None)
+    batch_window, batch_max = batch_options(websocket)
+    # ?firehose=0 is for clients that only want replies and their own subscriptions
+    firehose = websocket.query_params.get("firehose") != "0"
+    conn = broadcaster.register(client_id, websocket, codec or JSON, batch_window, batch_max, firehose)
+    if websocket.query_params.get("heartbeat") == "1":
+        heartbeat.track(conn)
+    pipeline = None
     try:
+        resume_from = websocket.query_params.get("resume_from")
+        if resume_from is not None:
+            try:
+                await replay_events(conn, parse_seq(resume_from))
+            except ValueError:
+                await conn.send_json({"type": "error", "message": "resume_from must be an event sequence number"})
+
+        # Messages are handled concurrently; a slow one no longer holds up the next frame
+        pipeline = MessagePipeline(
+            lambda data: handle_message(data, conn), conn.send_json, WS_MAX_IN_FLIGHT, MESSAGE_TYPES
+        )
         while True:
-            data = await websocket.receive_json()
-            # Handle different message types
-            if data["type"] == "transaction":
-                # Process transaction from Python CLI
-                await handle_transaction(data, websocket)
-            elif data["type"] == "notification":
-                # Handle notifications
-                await send_notification(data)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            conn.last_seen = time.monotonic()
+            try:
+                data = conn.codec.decode(message.get("bytes") or message.get("text"))
+                if not isinstance(data, dict):
+                    raise ProtocolError("Message must be an object")
+            except ProtocolError as e:
+                await conn.send_json({"type": "error", "message": str(e)})
+                continue
+            await pipeline.submit(data, ordering_key(data))
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
         logging.error(f"WebSocket error: {e}")
     finally:
-        connections.pop(client_id, None)
+        if pipeline:
+            pipeline.cancel()
+        broadcaster.unregister(conn)
+
+# Every type handle_message knows; the rest are timed as "other"
+MESSAGE_TYPES = ("transaction", "notify", "notification", "subscribe", "unsubscribe", "resume", "ping", "pong")
+
+async def handle_message(data: dict, conn: ClientConnection) -> Optional[dict]:
+    """Handle one client message and return the reply to send, if any"""
+    if data.get("type") == "transaction":
+        # Process transaction from Python CLI
+        return await handle_transaction(data, conn)
+    elif data.get("type") == "notify":
+        return handle_notify(data, conn)
+    elif data.get("type") == "notification":
+        # Handle notifications
+        await send_notification(data)
+    elif data.get("type") in ("subscribe", "unsubscribe"):
+        return handle_subscription(data, conn)
+    elif data.get("type") == "resume":
+        try:
+            after_seq = parse_seq(data.get("resume_from"))
+        except ValueError:
+            return {"type": "error", "message": "resume_from must be an event sequence number"}
+        await replay_events(conn, after_seq)
+    elif data.get("type") == "ping":
+        return {"type": "pong"}
+    elif data.get("type") == "pong":
+        # Heartbeat reply; receiving it already refreshed last_seen
+        pass
+    else:
+        return {"type": "error", "message": f"Unknown message type: {data.get('type')}"}
+    return None
+
+def ordering_key(data: dict) -> Optional[str]:
+    """Messages sharing a key are handled in the order they arrived.
+
+    Transactions are ordered per wallet unless the client sends "ordered": false;
+    subscription changes and resumes are ordered among themselves.
+    """
+    if data.get("type") in ("transaction", "notify"):
+        transaction = data.get("transaction") if data["type"] == "notify" else data
+        if not isinstance(transaction, dict):
+            return None
+        wallet = transaction.get("wallet_address") or transaction.get("wallet")
+        if wallet and data.get("ordered", True):
+            return wallet_topic(wallet)
+        return None
+    if data.get("type") in ("subscribe", "unsubscribe", "resume"):
+        return "control"
+    return None
+
+def batch_options(websocket: WebSocket) -> Tuple[float, int]:
+    """Micro-batching opt-in from the handshake: ?batch_ms=10&batch_max=50
+
+    Opted-in clients receive top-level array frames of messages instead of
+    one frame per message.
+    """
+    try:
+        batch_ms = float(websocket.query_params.get("batch_ms", 0))
+        batch_max = int(websocket.query_params.get("batch_max", 100 if batch_ms else 1))
+    except ValueError:
+        return 0.0, 1
+    return min(max(batch_ms, 0.0), MAX_BATCH_MS) / 1000, min(max(batch_max, 1), MAX_BATCH_FRAMES)
+
+@app.get("/events")
+async def stream_events(
+    request: Request,
+    wallets: Optional[str] = None,
+    events: Optional[str] = None,
+    client_id: Optional[str] = None
+):
+    """Read-only Server-Sent Events feed: /events?wallets=a,b&events=token_creation
+
+    Resumes after the Last-Event-ID header (or ?last_event_id=) when given.
+    """
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    try:
+        resume_from = parse_seq(last_event_id) if last_event_id else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID must be an event sequence number")
+    if len(broadcaster.connections) >= MAX_CONNECTIONS:
+        CONNECTIONS_REJECTED.labels("sse").inc()
+        raise HTTPException(status_code=503, detail="Too many connections", headers={"Retry-After": "5"})
+
+    conn = SseConnection(
+        f"sse:{client_id or uuid.uuid4().hex}", broadcaster.max_queue, broadcaster.overflow_policy
+    )
+    broadcaster.add(conn)
+    topics = [wallet_topic(w) for w in (wallets or "").split(",") if w]
+    topics += [event_topic(e) for e in (events or "").split(",") if e]
+    if topics:
+        broadcaster.subscribe(conn, topics)
+
+    return StreamingResponse(
+        sse_stream(conn, resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def sse_stream(conn: SseConnection, resume_from: Optional[int]) -> AsyncIterator[str]:
+    # Replay runs alongside the stream, which is what drains the client's queue
+    replay = asyncio.create_task(replay_events(conn, resume_from)) if resume_from is not None else None
+    try:
+        async for frame in conn.frames():
+            yield frame
+    finally:
+        if replay:
+            replay.cancel()
+        broadcaster.unregister(conn)
 
 @app.post("/transaction")
-async def create_transaction(request: TransactionRequest):
+async def create_transaction(request: TransactionRequest, http_request: Request):
     try:
         # Validate transaction request
-        if request.amount <= 0:
+        if not valid_amount(request):
             raise HTTPException(status_code=400, detail="Invalid amount")
 
-        # Notify connected dApp clients
-        for ws in connections.values():
-            await ws.send_json({
-                "type": "new_transaction",
-                "data": {
-                    "wallet": request.wallet_address,
-                    "amount": request.amount,
-                    "recipient": request.recipient
-                }
-            })
-
-        # Send SMS notification if phone number provided
-        if request.phone_number:
-            await send_sms(
-                request.phone_number,
-                f"New transaction: {request.amount} SOL to {request.recipient}"
-            )
+        admit("transaction", http_request, f"wallet:{request.wallet_address}")
+
+        # Notify subscribed dApp clients; this only queues, it never waits on a socket
+        broker.publish(transaction_event(request), transaction_topics(request))
+        record_transaction(request)
+        notify_by_sms(request)
 
         return {"status": "success", "message": "Transaction processed"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Transaction error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-async def handle_transaction(data: dict, websocket: WebSocket):
+@app.get("/transactions")
+async def list_transactions(wallet: Optional[str] = None, cursor: Optional[int] = None, limit: int = 100):
+    """Transaction history, newest first. Pass next_cursor back as cursor for the next page."""
+    if not 1 <= limit <= MAX_HISTORY_PAGE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_HISTORY_PAGE}")
+    transactions, next_cursor = await journal.query(wallet, cursor, limit)
+    return {"transactions": transactions, "next_cursor": next_cursor}
+
+def client_key(request: Request) -> str:
+    # HTTP callers identify themselves with X-Client-Id; otherwise fall back to their address
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return f"client:{client_id}"
+    return f"client:{request.client.host if request.client else 'unknown'}"
+
+def admit(route: str, request: Request, *keys: str, cost: float = 1.0):
+    """Raise a 429 with Retry-After if the caller is over the route's limit"""
+    admit_costs(route, {key: cost for key in (client_key(request),) + keys})
+
+def admit_costs(route: str, costs: Dict[str, float]):
+    retry_after = rate_limiter.check_costs(route, costs)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+@app.post("/transactions/batch")
+async def create_transaction_batch(request: Request):
+    """Accept a JSON/MessagePack array or NDJSON body and stream one NDJSON result line per record"""
+    # Refuse callers still paying off an earlier batch before reading the body
+    admit("batch", request, cost=0)
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type:
+        records = decode_ndjson(body)
+    else:
+        try:
+            records = codec_for_content_type(content_type).decode(body)
+        except ProtocolError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of transactions")
+
+    # One token per record from the caller, and from each wallet for every record of its own
+    costs: Dict[str, float] = {client_key(request): max(1, len(records))}
+    for record in records:
+        wallet = record.get("wallet_address") if isinstance(record, dict) else None
+        if isinstance(wallet, str):
+            key = f"wallet:{wallet}"
+            costs[key] = costs.get(key, 0) + 1
+    admit_costs("batch", costs)
+
+    return StreamingResponse(process_batch(iter(records)), media_type="application/x-ndjson")
+
+def decode_ndjson(body: bytes) -> List[Any]:
+    """One record per non-blank line; a line that doesn't parse is kept as bytes and fails only its own record"""
+    records = []
+    for line in body.splitlines():
+        if line.strip():
+            try:
+                records.append(JSON.decode(line))
+            except ProtocolError:
+                records.append(line)
+    return records
+
+async def process_batch(records: Iterator[Any]) -> AsyncIterator[str]:
+    chunk: List[Tuple[int, Any]] = []
+    for index, record in enumerate(records):
+        chunk.append((index, record))
+        if len(chunk) >= BATCH_CHUNK_SIZE:
+            yield process_batch_chunk(chunk)
+            chunk = []
+            # Let other requests run between chunks of a large batch
+            await asyncio.sleep(0)
+    if chunk:
+        yield process_batch_chunk(chunk)
+
+def process_batch_chunk(chunk: List[Tuple[int, Any]]) -> str:
+    """Validate a chunk, broadcast the valid records together and return their result lines"""
+    results = []
+    accepted = []
+    for index, record in chunk:
+        try:
+            if isinstance(record, bytes):
+                record = JSON.decode(record)
+            request = TransactionMessage.from_dict(record)
+            if not valid_amount(request):
+                raise ValueError("Invalid amount")
+        except Exception as e:
+            results.append({"index": index, "status": "error", "detail": str(e)})
+            continue
+        accepted.append(request)
+        results.append({"index": index, "status": "success"})
+
+    if accepted:
+        broker.publish_batch([
+            (transaction_event(request), transaction_topics(request))
+            for request in accepted
+        ])
+        for request in accepted:
+            record_transaction(request)
+            notify_by_sms(request)
+
+    return "".join(json.dumps(result) + "\n" for result in results)
+
+def valid_amount(request: Transaction) -> bool:
+    """Transfers must move something; other events (e.g. token_creation) may carry 0"""
+    if request.type == "transfer":
+        return request.amount > 0
+    return request.amount >= 0
+
+def transaction_event(request: Transaction) -> dict:
+    return {
+        "type": "new_transaction",
+        "data": {
+            "wallet": request.wallet_address,
+            "amount": request.amount,
+            "recipient": request.recipient,
+            "transaction_type": request.type
+        }
+    }
+
+def record_transaction(request: Transaction):
+    journal.append(
+        request.wallet_address, request.recipient, request.amount, request.type, request.metadata
+    )
+
+def notify_by_sms(request: Transaction):
+    # Queue SMS notification if phone number provided
+    if request.phone_number:
+        send_sms(
+            request.phone_number,
+            f"New transaction: {request.amount} SOL to {request.recipient}"
+        )
+
+def transaction_topics(request: Transaction) -> List[str]:
+    return [
+        wallet_topic(request.wallet_address),
+        wallet_topic(request.recipient),
+        event_topic(request.type)
+    ]
+
+def handle_subscription(data: dict, conn: ClientConnection) -> dict:
+    # {"type": "subscribe", "wallets": [...], "events": ["token_creation", ...]}
+    topics = [wallet_topic(w) for w in data.get("wallets", [])]
+    topics += [event_topic(e) for e in data.get("events", [])]
+    if data["type"] == "subscribe":
+        current = broadcaster.subscribe(conn, topics)
+    else:
+        current = broadcaster.unsubscribe(conn, topics)
+    return {
+        "type": "subscriptions",
+        "topics": current
+    }
+
+def parse_seq(value: Any) -> int:
+    """An event sequence number sent by a client; ValueError if it isn't one"""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Not a sequence number: {value!r}")
+    seq = int(value)
+    if seq < 0:
+        raise ValueError(f"Not a sequence number: {value!r}")
+    return seq
+
+async def replay_events(conn: ClientConnection, after_seq: int):
+    """Send a reconnecting client the events it missed after after_seq"""
+    # Live events are skipped while paused; the replay loop below catches up on them
+    conn.paused = True
+    try:
+        last_seq = after_seq
+        if event_log.since_in_memory(after_seq) is None:
+            oldest_in_memory = event_log.ring[0][0] if event_log.ring else event_log.last_seq + 1
+            loop = asyncio.get_running_loop()
+            entries = await loop.run_in_executor(
+                None, event_log.read_from_disk, after_seq, oldest_in_memory - 1
+            )
+            if not entries or entries[0][0] > after_seq + 1:
+                await conn.send_json({
+                    "type": "resync_required",
+                    "oldest_seq": entries[0][0] if entries else oldest_in_memory
+                })
+            await send_replay(conn, entries)
+            last_seq = max(last_seq, oldest_in_memory - 1)
+
+        # Repeat until nothing new arrived while we were sending, so there is no gap
+        while True:
+            entries = event_log.since_in_memory(last_seq)
+            if entries is None:
+                await conn.send_json({"type": "resync_required", "oldest_seq": event_log.ring[0][0]})
+                break
+            if not entries:
+                break
+            await send_replay(conn, entries)
+            last_seq = entries[-1][0]
+    finally:
+        conn.paused = False
+
+async def send_replay(conn: ClientConnection, entries):
+    events = [event for _, event, topics in entries if broadcaster.wants(conn, topics)]
+    for start in range(0, len(events), REPLAY_FRAME_SIZE):
+        await conn.send_json({
+            "type": "event_batch",
+            "replay": True,
+            "events": events[start:start + REPLAY_FRAME_SIZE]
+        })
+
+async def handle_transaction(data: dict, conn: ClientConnection) -> dict:
+    keys = [f"client:{conn.client_id}"]
+    wallet = data.get("wallet_address") or data.get("wallet")
+    if wallet:
+        keys.append(f"wallet:{wallet}")
+    retry_after = rate_limiter.check("ws_transaction", keys)
+    if retry_after:
+        return rate_limited_reply(retry_after)
+
     try:
         # Process transaction logic
         # Add your Solana transaction code here
@@ -94,33 +577,74 @@ async def handle_transaction(data: dict, websocket: WebSocket):
             "status": "success",
             "data": data
         }
-        await websocket.send_json(response)
+        return response
     except Exception as e:
-        await websocket.send_json({
+        return {
             "type": "error",
             "message": str(e)
-        })
+        }
+
+def handle_notify(data: dict, conn: ClientConnection) -> dict:
+    """WebSocket counterpart of POST /transaction for clients that keep a channel open
+
+    {"type": "notify", "request_id": ..., "transaction": {...}}
+    """
+    try:
+        request = TransactionMessage.from_dict(data.get("transaction"))
+    except ProtocolError as e:
+        return {"type": "error", "code": 400, "message": str(e)}
+    if not valid_amount(request):
+        return {"type": "error", "code": 400, "message": "Invalid amount"}
+
+    retry_after = rate_limiter.check(
+        "transaction", [f"client:{conn.client_id}", f"wallet:{request.wallet_address}"]
+    )
+    if retry_after:
+        return rate_limited_reply(retry_after)
+
+    broker.publish(transaction_event(request), transaction_topics(request))
+    record_transaction(request)
+    notify_by_sms(request)
+    return {"type": "notify_result", "status": "success", "message": "Transaction processed"}
+
+def rate_limited_reply(retry_after: float) -> dict:
+    return {
+        "type": "error",
+        "code": 429,
+        "message": "Rate limit exceeded",
+        "retry_after": retry_after
+    }
 
 async def send_notification(data: dict):
     try:
         if data.get("phone_number"):
-            await send_sms(
+            send_sms(
                 data["phone_number"],
                 data["message"]
             )
     except Exception as e:
         logging.error(f"Notification error: {e}")
 
-async def send_sms(to_number: str, message: str):
-    try:
-        twilio_client.messages.create(
-            body=message,
-            from_=os.getenv("TWILIO_PHONE_NUMBER"),
-            to=to_number
-        )
-    except Exception as e:
-        logging.error(f"SMS error: {e}")
-        raise
+def send_sms(to_number: str, message: str):
+    # Returns immediately; delivery, coalescing and retries happen in the dispatcher
+    if not sms_dispatcher.enqueue(to_number, message):
+        logging.error(f"SMS error: queue full, message to {to_number} dropped")
+
+@app.on_event("startup")
+async def startup():
+    await journal.start()
+    await broker.start()
+    await sms_dispatcher.start()
+    await heartbeat.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await heartbeat.stop()
+    await broker.stop()
+    await broadcaster.close()
+    event_log.close()
+    await sms_dispatcher.stop()
+    await journal.stop()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,85 @@
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+import asyncio
+import logging
+import time
+import metrics
+
+MESSAGE_SECONDS = metrics.histogram(
+    "ws_message_duration_seconds", "Time to handle one WebSocket message", labelnames=("type",)
+)
+MESSAGES_IN_FLIGHT = metrics.gauge(
+    "ws_messages_in_flight", "WebSocket messages being handled across all connections"
+)
+
+Handler = Callable[[dict], Awaitable[Optional[dict]]]
+Reply = Callable[[dict], Awaitable[None]]
+
+
+class MessagePipeline:
+    """Handles one connection's messages concurrently, up to max_in_flight at a time.
+
+    Messages with the same ordering key run one after another in arrival
+    order; messages without one run as soon as a slot is free. A reply is
+    tagged with the request_id of the message it answers, so clients can
+    match replies that arrive out of order. When the pipeline is full,
+    submit() waits, which stops the receive loop reading more frames.
+    Timings are labelled by message type; types outside `message_types`
+    share the "other" label, so clients can't create new series.
+    """
+
+    def __init__(self, handler: Handler, reply: Reply, max_in_flight: int = 32, message_types: Iterable[str] = ()):
+        self.handler = handler
+        self.reply = reply
+        self.message_types = frozenset(message_types)
+        self._slots = asyncio.Semaphore(max_in_flight)
+        # Last task queued for each ordering key; the next one waits on it
+        self._tails: Dict[str, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, data: dict, key: Optional[str] = None):
+        await self._slots.acquire()
+        previous = self._tails.get(key) if key else None
+        task = asyncio.create_task(self._run(data, previous))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        if key:
+            self._tails[key] = task
+            task.add_done_callback(lambda t: self._forget_tail(key, t))
+
+    async def _run(self, data: dict, previous: Optional[asyncio.Task]):
+        if previous is not None:
+            # Only ordering matters here; the previous message's outcome was already reported
+            await asyncio.wait([previous])
+        MESSAGES_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            response = await self.handler(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"WebSocket message error: {e}")
+            response = {"type": "error", "message": str(e)}
+        finally:
+            MESSAGES_IN_FLIGHT.dec()
+            MESSAGE_SECONDS.labels(self._type_label(data)).observe(time.perf_counter() - start)
+        if response is not None:
+            if "request_id" in data:
+                response["request_id"] = data["request_id"]
+            await self.reply(response)
+
+    def _type_label(self, data: dict) -> str:
+        message_type = data.get("type")
+        return message_type if isinstance(message_type, str) and message_type in self.message_types else "other"
+
+    def _forget_tail(self, key: str, task: asyncio.Task):
+        # Keep the entry if a later message for this key has queued behind it
+        if self._tails.get(key) is task:
+            del self._tails[key]
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        self._slots.release()
+
+    def cancel(self):
+        for task in list(self._tasks):
+            task.cancel()
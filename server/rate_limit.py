@@ -0,0 +1,105 @@
+from typing import Dict, Iterable, Tuple
+import logging
+import os
+import time
+import metrics
+
+RATE_LIMITED = metrics.counter(
+    "rate_limited_total", "Requests rejected by admission control", labelnames=("route",)
+)
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by wallet address or client id.
+
+    Buckets live in a plain dict of (tokens, last_refill) tuples kept in
+    least-recently-used order: touching a key re-inserts it at the end, so
+    idle keys collect at the front and are evicted from there. Only a
+    bucket that would have refilled completely is evicted for being idle,
+    as it carries no state worth keeping; one still in debt stays until
+    it is paid off, unless the limiter is over `max_keys`.
+
+    A cost larger than the burst is admitted once the bucket is full and
+    leaves it in debt, so big batches still go through but the average
+    rate holds.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 1_000_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def _current(self, key: str, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.burst
+        tokens, last = bucket
+        return min(self.burst, tokens + (now - last) * self.rate)
+
+    def wait_time(self, key: str, cost: float = 1.0) -> float:
+        """Seconds until `cost` tokens are available; 0 if they are available now"""
+        tokens = self._current(key, time.monotonic())
+        needed = min(cost, self.burst)
+        if tokens >= needed:
+            return 0.0
+        return (needed - tokens) / self.rate
+
+    def consume(self, key: str, cost: float = 1.0):
+        now = time.monotonic()
+        tokens = self._current(key, now)
+        self._buckets.pop(key, None)
+        self._buckets[key] = (tokens - cost, now)
+        self._evict(now)
+
+    def _evict(self, now: float):
+        buckets = self._buckets
+        # A couple of steps per call keeps eviction amortized O(1)
+        for _ in range(2):
+            if not buckets:
+                break
+            oldest = next(iter(buckets))
+            tokens, last = buckets[oldest]
+            if len(buckets) <= self.max_keys and tokens + (now - last) * self.rate < self.burst:
+                break
+            del buckets[oldest]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimiter:
+    """Per-route admission control. Limits are "rate/burst" strings, e.g. "5/10"."""
+
+    def __init__(self, limits: Dict[str, str]):
+        self.limiters: Dict[str, TokenBucketLimiter] = {}
+        for route, spec in limits.items():
+            spec = os.getenv(f"RATE_LIMIT_{route.upper()}", spec)
+            try:
+                rate, burst = (float(part) for part in spec.split("/"))
+            except ValueError:
+                logging.error(f"Invalid rate limit '{spec}' for {route}, route left unlimited")
+                continue
+            if rate > 0:
+                self.limiters[route] = TokenBucketLimiter(rate, burst)
+
+    def check(self, route: str, keys: Iterable[str], cost: float = 1.0) -> float:
+        """Admit a request charged to every key, or return seconds to wait.
+
+        Nothing is consumed unless every key has capacity, so a request
+        rejected for its client doesn't also drain its wallet's bucket.
+        """
+        return self.check_costs(route, {key: cost for key in keys if key})
+
+    def check_costs(self, route: str, costs: Dict[str, float]) -> float:
+        """Like check, with a separate cost per key"""
+        limiter = self.limiters.get(route)
+        if limiter is None:
+            return 0.0
+        retry_after = max((limiter.wait_time(key, cost) for key, cost in costs.items()), default=0.0)
+        if retry_after > 0:
+            RATE_LIMITED.labels(route).inc()
+            return retry_after
+        for key, cost in costs.items():
+            limiter.consume(key, cost)
+        return 0.0
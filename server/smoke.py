@@ -1,3 +1,5 @@
+"""Manual smoke test against a server running on localhost:8000: python smoke.py"""
+
 import asyncio
 import websockets
 import json
@@ -27,9 +29,23 @@ async def test_websocket():
         response = await ws.recv()
         print(f"WebSocket Response: {response}")
 
+async def test_subscription():
+    async with websockets.connect("ws://localhost:8000/ws/test_subscriber") as ws:
+        await ws.send(json.dumps({
+            "type": "subscribe",
+            "wallets": ["test_wallet"],
+            "events": ["token_creation"]
+        }))
+        print(f"Subscribe Response: {await ws.recv()}")
+
+        await test_rest_endpoint()
+        response = await asyncio.wait_for(ws.recv(), timeout=5)
+        print(f"Subscribed Event: {response}")
+
 async def main():
     await test_rest_endpoint()
     await test_websocket()
+    await test_subscription()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,179 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import random
+import time
+import metrics
+
+SMS_SEND_SECONDS = metrics.histogram(
+    "sms_send_duration_seconds", "Time for one SMS transport call, including failed attempts"
+)
+SMS_SENT = metrics.counter("sms_sent_total", "SMS messages delivered to the transport")
+SMS_FAILED = metrics.counter("sms_failed_total", "SMS messages that failed after all retries")
+SMS_COALESCED = metrics.counter(
+    "sms_coalesced_total", "Notifications merged into another message's digest"
+)
+SMS_REJECTED = metrics.counter("sms_rejected_total", "Notifications dropped because the queue was full")
+
+
+class SmsTransport:
+    """Sends one SMS. Called from a worker thread, so it may block."""
+
+    def send(self, to_number: str, body: str):
+        raise NotImplementedError
+
+
+class TwilioTransport(SmsTransport):
+    def __init__(self):
+        from twilio.rest import Client
+
+        self.client = Client(
+            os.getenv("TWILIO_ACCOUNT_SID"),
+            os.getenv("TWILIO_AUTH_TOKEN")
+        )
+        self.from_number = os.getenv("TWILIO_PHONE_NUMBER")
+
+    def send(self, to_number: str, body: str):
+        self.client.messages.create(
+            body=body,
+            from_=self.from_number,
+            to=to_number
+        )
+
+
+class FakeSmsTransport(SmsTransport):
+    """Local stand-in for Twilio that records messages instead of sending them"""
+
+    def __init__(self, latency: float = 0.0, fail_times: int = 0):
+        self.latency = latency
+        self.fail_times = fail_times
+        self.sent: List[Tuple[str, str]] = []
+
+    def send(self, to_number: str, body: str):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise ConnectionError("Simulated SMS failure")
+        self.sent.append((to_number, body))
+        logging.info(f"[fake sms] to {to_number}: {body}")
+
+
+class SmsDispatcher:
+    """Sends SMS in the background so request handlers never wait on Twilio.
+
+    Messages for the same number that arrive within `coalesce_window`
+    seconds of each other go out as a single digest message.
+    """
+
+    def __init__(
+        self,
+        transport: SmsTransport,
+        max_queue: int = 1000,
+        workers: int = 4,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        coalesce_window: float = 1.0,
+        max_digest_lines: int = 5
+    ):
+        self.transport = transport
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.coalesce_window = coalesce_window
+        self.max_digest_lines = max_digest_lines
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._pending: Dict[str, List[str]] = {}
+        self._first_seen: Dict[str, float] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sms")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 5.0):
+        """Give queued messages a chance to go out, then stop the workers"""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Dropping {self.queue.qsize()} queued SMS on shutdown")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def enqueue(self, to_number: str, message: str) -> bool:
+        """Queue a message without waiting. Returns False if the queue is full."""
+        pending = self._pending.get(to_number)
+        if pending is not None:
+            pending.append(message)
+            SMS_COALESCED.inc()
+            return True
+
+        try:
+            self.queue.put_nowait(to_number)
+        except asyncio.QueueFull:
+            logging.warning(f"SMS queue full, dropping message to {to_number}")
+            SMS_REJECTED.inc()
+            return False
+        self._pending[to_number] = [message]
+        self._first_seen[to_number] = time.monotonic()
+        return True
+
+    async def _worker(self):
+        while True:
+            to_number = await self.queue.get()
+            try:
+                # Let a burst for this number build up before sending
+                waited = time.monotonic() - self._first_seen[to_number]
+                if waited < self.coalesce_window:
+                    await asyncio.sleep(self.coalesce_window - waited)
+
+                messages = self._pending.pop(to_number)
+                del self._first_seen[to_number]
+                await self._send_with_retry(to_number, self._digest(messages))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                SMS_FAILED.inc()
+                logging.error(f"SMS error: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _digest(self, messages: List[str]) -> str:
+        if len(messages) == 1:
+            return messages[0]
+        lines = messages[:self.max_digest_lines]
+        body = f"{len(messages)} new notifications:\n" + "\n".join(lines)
+        if len(messages) > len(lines):
+            body += f"\n...and {len(messages) - len(lines)} more"
+        return body
+
+    async def _send_with_retry(self, to_number: str, body: str):
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(self._executor, self.transport.send, to_number, body)
+                SMS_SEND_SECONDS.observe(time.perf_counter() - start)
+                SMS_SENT.inc()
+                return
+            except Exception as e:
+                SMS_SEND_SECONDS.observe(time.perf_counter() - start)
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                logging.warning(f"SMS to {to_number} failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+
+def create_transport() -> SmsTransport:
+    """Pick a transport from SMS_TRANSPORT ("twilio" or "fake")"""
+    if os.getenv("SMS_TRANSPORT", "twilio") == "fake":
+        return FakeSmsTransport()
+    return TwilioTransport()
@@ -0,0 +1,89 @@
+from typing import Any, AsyncIterator, List
+import asyncio
+import json
+from broadcaster import ClientConnection
+
+
+class SseCodec:
+    """Encodes broadcast events as Server-Sent Events messages.
+
+    Sequenced events carry their seq as the SSE id, so a reconnecting
+    browser sends it back as Last-Event-ID automatically.
+    """
+
+    binary = False
+
+    def encode(self, message: Any) -> str:
+        if isinstance(message, dict) and message.get("type") == "event_batch":
+            # Split batches back into individual events so each keeps its own id
+            return "".join(self.encode(event) for event in message["events"])
+        seq = message.get("seq") if isinstance(message, dict) else None
+        prefix = f"id: {seq}\n" if seq is not None else ""
+        return f"{prefix}data: {json.dumps(message)}\n\n"
+
+    def batch_frame(self, encoded_events: List[str]) -> str:
+        return "".join(encoded_events)
+
+    def array_frame(self, encoded_messages: List[str]) -> str:
+        return "".join(encoded_messages)
+
+
+SSE = SseCodec()
+
+# Comment line sent when idle so proxies keep the stream open and dead peers surface
+KEEPALIVE = ": keepalive\n\n"
+_CLOSED = object()
+MAX_CHUNK_FRAMES = 256
+
+
+class SseConnection(ClientConnection):
+    """A read-only subscriber whose queue is drained by the HTTP response itself.
+
+    Unlike a WebSocket it needs no writer task and no receive loop; the
+    streaming response generator is the only task per client.
+    """
+
+    def __init__(self, client_id: str, max_queue: int, overflow_policy: str):
+        super().__init__(client_id, None, max_queue, overflow_policy, SSE)
+
+    def start(self, on_close=None):
+        self._on_close = on_close
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self._on_close:
+            self._on_close(self)
+        # Wake the response generator so it can finish
+        while True:
+            try:
+                self.queue.put_nowait(_CLOSED)
+                return
+            except asyncio.QueueFull:
+                self.queue.get_nowait()
+
+    async def frames(self, keepalive: float = 15.0) -> AsyncIterator[str]:
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(self.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+                    continue
+                # Whatever else is already queued goes out in the same chunk
+                chunk = []
+                while frame is not _CLOSED:
+                    chunk.append(frame)
+                    if self.queue.empty() or len(chunk) >= MAX_CHUNK_FRAMES:
+                        break
+                    frame = self.queue.get_nowait()
+                if self.dropped:
+                    chunk.insert(0, SSE.encode({"type": "lagged", "dropped": self.dropped}))
+                    self.dropped = 0
+                if chunk:
+                    yield "".join(chunk)
+                if frame is _CLOSED:
+                    return
+        finally:
+            self.close()
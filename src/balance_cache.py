@@ -0,0 +1,78 @@
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import time
+
+# (pubkey, commitment)
+Key = Tuple[str, str]
+Fetch = Callable[[str, str], Awaitable[int]]
+
+
+class BalanceCache:
+    """Lamport balances keyed by pubkey and commitment, kept for `ttl` seconds.
+
+    Concurrent lookups for the same key share one RPC call. invalidate()
+    drops a pubkey's entries and disowns any fetch already in flight for
+    it, so a read that raced a transfer can't put the old balance back.
+    """
+
+    def __init__(self, fetch: Fetch, ttl: float = 5.0, max_entries: int = 1024):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Key, Tuple[int, float]] = {}
+        self._inflight: Dict[Key, asyncio.Future] = {}
+
+    async def get(self, pubkey: str, commitment: str, refresh: bool = False) -> int:
+        key = (pubkey, str(commitment))
+        if not refresh:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.create_task(self._load(key))
+            self._inflight[key] = future
+        # One caller giving up must not cancel the fetch for the others
+        return await asyncio.shield(future)
+
+    def set(self, pubkey: str, commitment: str, lamports: int, ttl: Optional[float] = None):
+        """Store a balance learned some other way, e.g. from an account subscription"""
+        key = (pubkey, str(commitment))
+        self._inflight.pop(key, None)
+        self._store(key, lamports, ttl)
+
+    def invalidate(self, pubkey: str):
+        for key in [key for key in self._entries if key[0] == pubkey]:
+            del self._entries[key]
+        for key in [key for key in self._inflight if key[0] == pubkey]:
+            del self._inflight[key]
+
+    def clear(self):
+        self._entries.clear()
+        self._inflight.clear()
+
+    def peek(self, pubkey: str, commitment: str) -> Optional[int]:
+        """The cached balance if it is still fresh, without fetching"""
+        entry = self._entries.get((pubkey, str(commitment)))
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    async def _load(self, key: Key) -> int:
+        try:
+            lamports = await self.fetch(*key)
+        finally:
+            owned = self._inflight.get(key) is asyncio.current_task()
+            if owned:
+                del self._inflight[key]
+        # Only cache if nobody invalidated the key while we were fetching
+        if owned:
+            self._store(key, lamports)
+        return lamports
+
+    def _store(self, key: Key, lamports: int, ttl: Optional[float] = None):
+        self._entries.pop(key, None)
+        self._entries[key] = (lamports, time.monotonic() + (self.ttl if ttl is None else ttl))
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
@@ -0,0 +1,99 @@
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Commitment, Confirmed
+from solders.pubkey import Pubkey as PublicKey
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+from src.balance_cache import BalanceCache
+from src.rpc_pubsub import RpcPubSub, Subscription
+
+# Called with (pubkey, lamports) on every change
+Listener = Callable[[str, int], None]
+
+
+class BalanceFeed:
+    """Keeps watched balances current from accountSubscribe instead of polling.
+
+    While the RPC websocket is up a watched address's cache entry doesn't
+    expire, since every change arrives as a notification. If the socket
+    drops, the entries are invalidated so reads go back to getBalance.
+    After a reconnect each watched address is read once to pick up
+    whatever changed in between. Updates older than the last slot seen
+    for an address, and repeats of it, are ignored.
+    """
+
+    def __init__(self, pubsub: RpcPubSub, cache: BalanceCache, client: AsyncClient, commitment: Commitment = Confirmed):
+        self.pubsub = pubsub
+        self.cache = cache
+        self.client = client
+        self.commitment = commitment
+        self._watching: Dict[str, List[Tuple[Subscription, Optional[Listener]]]] = {}
+        # Last (slot, lamports) applied per address
+        self._seen: Dict[str, Tuple[int, int]] = {}
+        pubsub.on_connect(self._catch_up)
+        pubsub.on_disconnect(self._unpin)
+
+    async def watch(self, pubkey: str, listener: Optional[Listener] = None) -> Subscription:
+        subscription = await self.pubsub.account_subscribe(
+            pubkey, lambda result: self._on_account(pubkey, result), str(self.commitment)
+        )
+        self._watching.setdefault(pubkey, []).append((subscription, listener))
+        if pubkey in self._seen:
+            if listener:
+                listener(pubkey, self._seen[pubkey][1])
+        elif self.pubsub.connected:
+            await self._refresh(pubkey)
+        return subscription
+
+    async def unwatch(self, subscription: Subscription):
+        pubkey = self._pubkey_of(subscription)
+        await subscription.close()
+        if pubkey is None:
+            return
+        watchers = [entry for entry in self._watching[pubkey] if entry[0] is not subscription]
+        if watchers:
+            self._watching[pubkey] = watchers
+        else:
+            del self._watching[pubkey]
+            self._seen.pop(pubkey, None)
+            self.cache.invalidate(pubkey)
+
+    def _pubkey_of(self, subscription: Subscription) -> Optional[str]:
+        for pubkey, watchers in self._watching.items():
+            if any(entry[0] is subscription for entry in watchers):
+                return pubkey
+        return None
+
+    def _on_account(self, pubkey: str, result: dict):
+        value = result.get("value")
+        self._update(pubkey, result["context"]["slot"], value["lamports"] if value else 0)
+
+    def _update(self, pubkey: str, slot: int, lamports: int):
+        seen = self._seen.get(pubkey)
+        # Watchers of one address share a node subscription but each get the notification
+        if pubkey not in self._watching or (seen and (slot < seen[0] or (slot, lamports) == seen)):
+            return
+        self._seen[pubkey] = (slot, lamports)
+        self.cache.set(pubkey, self.commitment, lamports, ttl=float("inf") if self.pubsub.connected else None)
+        for _, listener in self._watching[pubkey]:
+            if listener:
+                try:
+                    listener(pubkey, lamports)
+                except Exception as e:
+                    logging.error(f"Balance listener error: {e}")
+
+    async def _refresh(self, pubkey: str):
+        try:
+            response = await self.client.get_balance(PublicKey.from_string(pubkey), commitment=self.commitment)
+        except Exception as e:
+            logging.warning(f"Balance refresh for {pubkey} failed: {e}")
+            return
+        self._update(pubkey, response.context.slot, response.value)
+
+    async def _catch_up(self):
+        await asyncio.gather(*(self._refresh(pubkey) for pubkey in list(self._watching)))
+
+    def _unpin(self):
+        for pubkey in self._watching:
+            self.cache.invalidate(pubkey)
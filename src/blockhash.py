@@ -0,0 +1,86 @@
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Commitment, Confirmed
+from solders.hash import Hash
+from typing import Optional, Tuple
+import asyncio
+import logging
+import time
+
+
+class BlockhashService:
+    """Keeps a recent blockhash in memory so signing never waits on the RPC node.
+
+    A background task refreshes it every `interval` seconds. A blockhash
+    is accepted for roughly 150 blocks (about a minute), so one older than
+    `max_age` is treated as expired and get() fetches a new one on demand;
+    concurrent callers share that fetch.
+    """
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        interval: float = 10.0,
+        max_age: float = 45.0,
+        commitment: Commitment = Confirmed
+    ):
+        self.client = client
+        self.interval = interval
+        self.max_age = max_age
+        self.commitment = commitment
+        self.blockhash: Optional[Hash] = None
+        self.last_valid_block_height: Optional[int] = None
+        self.fetched_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def fresh(self) -> bool:
+        return self.blockhash is not None and time.monotonic() - self.fetched_at < self.max_age
+
+    async def get(self) -> Tuple[Hash, int]:
+        """The cached blockhash and its last valid block height, refreshed first if expired"""
+        if not self.fresh:
+            await self.refresh()
+        return self.blockhash, self.last_valid_block_height
+
+    def invalidate(self):
+        """Forget the cached blockhash, e.g. after the node reported it unknown"""
+        self.blockhash = None
+
+    async def refresh(self):
+        if self._refreshing is None:
+            self._refreshing = asyncio.create_task(self._fetch())
+        task = self._refreshing
+        try:
+            await asyncio.shield(task)
+        finally:
+            if self._refreshing is task and task.done():
+                self._refreshing = None
+
+    async def _fetch(self):
+        response = await self.client.get_latest_blockhash(self.commitment)
+        self.blockhash = response.value.blockhash
+        self.last_valid_block_height = response.value.last_valid_block_height
+        self.fetched_at = time.monotonic()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+                delay = self.interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep serving the previous blockhash until it expires
+                logging.warning(f"Blockhash refresh failed: {e}")
+                delay = min(self.interval, 2.0)
+            await asyncio.sleep(delay)
@@ -0,0 +1,336 @@
+from decimal import Decimal, InvalidOperation
+from solana.rpc.core import RPCException
+from solana.rpc.types import TxOpts
+from solders.hash import Hash
+from solders.instruction import Instruction
+from solders.message import Message
+from solders.pubkey import Pubkey as PublicKey
+from solders.signature import Signature
+from solders.system_program import TransferParams, transfer
+from solders.transaction_status import TransactionConfirmationStatus
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import os
+
+from src.confirmation import (
+    MAX_SIGNATURES_PER_REQUEST, TrackedSignature, TransactionExpiredError, TransactionFailedError
+)
+from src.rpc_pool import pinned
+
+# Largest serialized transaction the network accepts, and one signature in it
+PACKET_DATA_SIZE = 1232
+SIGNATURE_SIZE = 64
+LAMPORTS_PER_SOL = 10 ** 9
+# Lamport amounts are u64 on-chain
+MAX_LAMPORTS = 2 ** 64 - 1
+FEE_PER_SIGNATURE = 5000
+
+PENDING = "pending"
+INVALID = "invalid"
+SUBMITTED = "submitted"
+SENT = "sent"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+
+
+class PayoutRow:
+    __slots__ = ("index", "recipient", "lamports", "status", "signature", "last_valid_block_height", "error")
+
+    def __init__(self, index: int, recipient: str, lamports: int, status: str = PENDING, error: Optional[str] = None):
+        self.index = index
+        self.recipient = recipient
+        self.lamports = lamports
+        self.status = status
+        self.signature: Optional[str] = None
+        self.last_valid_block_height: Optional[int] = None
+        self.error = error
+
+    def instruction(self, payer: PublicKey) -> Instruction:
+        return transfer(TransferParams(
+            from_pubkey=payer,
+            to_pubkey=PublicKey.from_string(self.recipient),
+            lamports=self.lamports
+        ))
+
+
+def read_csv(path: str) -> Iterator[Tuple[str, str]]:
+    """(recipient, amount in SOL) pairs from a CSV; a header row and # comments are skipped"""
+    with open(path, newline="") as f:
+        for record in csv.reader(f):
+            if not record or not record[0].strip() or record[0].strip().startswith("#"):
+                continue
+            if record[0].strip().lower() in ("recipient", "address", "pubkey"):
+                continue
+            yield record[0].strip(), record[1].strip() if len(record) > 1 else ""
+
+
+def parse_row(index: int, recipient: str, amount) -> PayoutRow:
+    try:
+        PublicKey.from_string(recipient)
+        sol = Decimal(str(amount))
+        if not sol.is_finite():
+            raise InvalidOperation
+        lamports = int(sol * LAMPORTS_PER_SOL)
+        if lamports <= 0:
+            raise ValueError("amount must be positive")
+        if lamports > MAX_LAMPORTS:
+            raise ValueError("amount too large")
+    except (ValueError, InvalidOperation) as e:
+        return PayoutRow(index, recipient, 0, INVALID, "invalid amount" if isinstance(e, InvalidOperation) else str(e))
+    return PayoutRow(index, recipient, lamports)
+
+
+def transaction_size(instructions: List[Instruction], payer: PublicKey) -> int:
+    message = Message.new_with_blockhash(instructions, payer, Hash.default())
+    # Compact-array length byte plus the payer's signature, then the message
+    return 1 + SIGNATURE_SIZE + len(bytes(message))
+
+
+class BulkTransfer:
+    """Pays many recipients from the loaded wallet, many transfers per transaction.
+
+    Transfers are packed into transactions up to the packet size limit and
+    submitted `concurrency` at a time, then watched by the manager's
+    confirmation tracker. Every status change is appended to a JSONL
+    state file, and a batch's signature is written before the batch is
+    sent. A batch is only resent once its blockhash has expired without
+    it landing, either later in the same run (up to `max_rounds` rounds)
+    or on a rerun with the same payout list, so nobody is paid twice.
+    Failed batches paid nobody (they were rejected, or landed and were
+    rolled back), so a rerun sends their rows again.
+    """
+
+    def __init__(
+        self,
+        manager,
+        payouts: Iterable[Tuple[str, object]],
+        state_path: str,
+        concurrency: int = 8,
+        max_rounds: int = 3
+    ):
+        self.manager = manager
+        self.state_path = state_path
+        self.concurrency = concurrency
+        self.max_rounds = max_rounds
+        # Signature -> (its rows, its tracker entry) for batches awaiting confirmation
+        self._watching: Dict[str, Tuple[List[PayoutRow], TrackedSignature]] = {}
+        self.rows = [parse_row(index, recipient, amount) for index, (recipient, amount) in enumerate(payouts)]
+        self.fingerprint = hashlib.sha256(
+            "".join(f"{row.recipient},{row.lamports}\n" for row in self.rows).encode()
+        ).hexdigest()
+        self._load_state()
+
+    @classmethod
+    def from_csv(cls, manager, path: str, state_path: Optional[str] = None, concurrency: int = 8) -> "BulkTransfer":
+        return cls(manager, read_csv(path), state_path or f"{path}.state.jsonl", concurrency)
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for row in self.rows:
+            counts[row.status] = counts.get(row.status, 0) + 1
+        return counts
+
+    def pending(self) -> List[PayoutRow]:
+        return [row for row in self.rows if row.status == PENDING]
+
+    def plan(self) -> Tuple[int, int]:
+        """Lamports still to send and the number of transactions needed for them"""
+        # A run starts by putting failed rows back to pending
+        pending = [row for row in self.rows if row.status in (PENDING, FAILED)]
+        return sum(row.lamports for row in pending), sum(1 for _ in self._pack(pending))
+
+    async def run(self, progress: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+        """Send every pending payout and wait for confirmation.
+
+        progress is called with the row count of each batch once it is sent.
+        """
+        if not self.manager.keypair:
+            raise ValueError("Wallet not loaded")
+        await self._reconcile()
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def submit(batch: List[PayoutRow]):
+            async with semaphore:
+                await self._submit(batch)
+            if progress:
+                progress(len(batch))
+
+        for _ in range(self.max_rounds):
+            await asyncio.gather(*(submit(batch) for batch in self._pack(self.pending())))
+            await self._await_confirmations()
+            if not self.pending():
+                break
+
+        self.manager.balance_cache.invalidate(str(self.manager.keypair.pubkey()))
+        for row in self.rows:
+            self.manager.balance_cache.invalidate(row.recipient)
+        return self.counts()
+
+    def _pack(self, rows: List[PayoutRow]) -> Iterator[List[PayoutRow]]:
+        payer = self.manager.keypair.pubkey()
+        batch: List[PayoutRow] = []
+        instructions: List[Instruction] = []
+        for row in rows:
+            instructions.append(row.instruction(payer))
+            if batch and transaction_size(instructions, payer) > PACKET_DATA_SIZE:
+                yield batch
+                batch, instructions = [], [row.instruction(payer)]
+            batch.append(row)
+        if batch:
+            yield batch
+
+    async def _submit(self, batch: List[PayoutRow]):
+        payer = self.manager.keypair.pubkey()
+        instructions = [row.instruction(payer) for row in batch]
+        # The send, and every later read about whether it landed, go to one node
+        with pinned(self.manager.client) as endpoint:
+            for attempt in range(2):
+                transaction, last_valid_block_height = await self.manager.build_transaction(instructions)
+                signature = str(transaction.signatures[0])
+                self._record(batch, SUBMITTED, signature, last_valid_block_height)
+                try:
+                    await self.manager.client.send_transaction(transaction, opts=TxOpts(skip_preflight=False))
+                except RPCException as e:
+                    if "Blockhash not found" not in str(e) or attempt == 1:
+                        # Refused by preflight on the only node it was sent to, so it was never forwarded
+                        self._record(batch, FAILED, error=str(e))
+                        return
+                    if not await self.manager.signature_seen(transaction.signatures[0]):
+                        # Same reasoning; re-signing against a fresh blockhash can't pay twice
+                        self.manager.blockhash.invalidate()
+                        continue
+                    self._record(batch, SENT, signature, last_valid_block_height)
+                except Exception as e:
+                    # Unknown whether it landed; the tracker's rebroadcasts and expiry settle it
+                    logging.error(f"Bulk transfer batch of {len(batch)} left in flight: {e!r}")
+                else:
+                    self._record(batch, SENT, signature, last_valid_block_height)
+                self._watch(batch, signature, last_valid_block_height, bytes(transaction), endpoint)
+                return
+
+    def _watch(
+        self,
+        batch: List[PayoutRow],
+        signature: str,
+        last_valid_block_height: int,
+        transaction: Optional[bytes] = None,
+        endpoint: Optional[str] = None
+    ):
+        tracked = self.manager.confirmations.track(
+            signature, transaction, last_valid_block_height, endpoint=endpoint
+        )
+        self._watching[signature] = (batch, tracked)
+
+    async def _await_confirmations(self):
+        """Settle every watched batch as confirmed, failed, or pending again if it expired"""
+        watching, self._watching = self._watching, {}
+
+        async def settle(signature: str, batch: List[PayoutRow], tracked: TrackedSignature):
+            try:
+                await tracked.confirmed
+            except TransactionExpiredError:
+                self._record(batch, PENDING)
+                # Don't re-sign the next round against a blockhash as old as this one
+                self.manager.blockhash.invalidate()
+            except TransactionFailedError as e:
+                self._record(batch, FAILED, signature, batch[0].last_valid_block_height, str(e))
+            else:
+                self._record(batch, CONFIRMED, signature, batch[0].last_valid_block_height)
+
+        await asyncio.gather(*(settle(signature, *entry) for signature, entry in watching.items()))
+
+    async def _reconcile(self):
+        """Retry failed rows, and settle or watch batches an earlier run left unconfirmed"""
+        failed = [row for row in self.rows if row.status == FAILED]
+        if failed:
+            self._record(failed, PENDING)
+
+        in_flight: Dict[str, List[PayoutRow]] = {}
+        for row in self.rows:
+            if row.status in (SUBMITTED, SENT):
+                in_flight.setdefault(row.signature, []).append(row)
+        if not in_flight:
+            return
+
+        signatures = list(in_flight)
+        margin = self.manager.confirmations.expiry_margin
+        # Height and statuses from one node, so absent means absent at that height
+        statuses = []
+        with pinned(self.manager.client):
+            block_height = (await self.manager.client.get_block_height()).value
+            for start in range(0, len(signatures), MAX_SIGNATURES_PER_REQUEST):
+                chunk = signatures[start:start + MAX_SIGNATURES_PER_REQUEST]
+                response = await self.manager.client.get_signature_statuses(
+                    [Signature.from_string(signature) for signature in chunk],
+                    search_transaction_history=True
+                )
+                statuses.extend(response.value)
+        for signature, status in zip(signatures, statuses):
+            batch = in_flight[signature]
+            last_valid_block_height = batch[0].last_valid_block_height
+            if status is None and block_height > last_valid_block_height + margin:
+                # Never landed and now never can: safe to send again
+                self._record(batch, PENDING)
+            elif status is not None and status.err is not None:
+                self._record(batch, FAILED, signature, last_valid_block_height, str(status.err))
+            elif status is not None and status.confirmation_status in (
+                TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized
+            ):
+                self._record(batch, CONFIRMED, signature, last_valid_block_height)
+            else:
+                # Recent enough for the tracker's status checks to see it land or expire
+                self._watch(batch, signature, last_valid_block_height)
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path) or os.path.getsize(self.state_path) == 0:
+            self._append({"fingerprint": self.fingerprint, "rows": len(self.rows)})
+            return
+        with open(self.state_path) as f:
+            header = json.loads(f.readline())
+            if header.get("fingerprint") != self.fingerprint:
+                raise ValueError(f"{self.state_path} belongs to a different payout list")
+            for line in f:
+                try:
+                    update = json.loads(line)
+                except ValueError:
+                    break  # torn last line from an interrupted write
+                for index in update["rows"]:
+                    self._apply(self.rows[index], update)
+
+    def _record(
+        self,
+        batch: List[PayoutRow],
+        status: str,
+        signature: Optional[str] = None,
+        last_valid_block_height: Optional[int] = None,
+        error: Optional[str] = None
+    ):
+        update = {
+            "rows": [row.index for row in batch],
+            "status": status,
+            "signature": signature,
+            "last_valid_block_height": last_valid_block_height,
+            "error": error
+        }
+        self._append(update)
+        for row in batch:
+            self._apply(row, update)
+
+    @staticmethod
+    def _apply(row: PayoutRow, update: dict):
+        row.status = update["status"]
+        row.signature = update.get("signature")
+        row.last_valid_block_height = update.get("last_valid_block_height")
+        row.error = update.get("error")
+
+    def _append(self, entry: dict):
+        with open(self.state_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            # The signature has to be on disk before the transaction is on the wire
+            os.fsync(f.fileno())
@@ -1,21 +1,148 @@
 import aiohttp
+import asyncio
+import itertools
+import json
 import logging
-from typing import Optional, Dict, Any
+import random
+import uuid
+from typing import Optional, Dict, Any, AsyncIterator, Iterable
+from src.protocol import CODECS, JSON, ProtocolError
+from src.transport import HttpTransport
 
 class SolanaClient:
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    """Notifies the server about transactions.
+
+    send_transaction() opens one long-lived WebSocket on first use and
+    sends notifications over it many at a time, each matched to its reply
+    by request_id. While the socket is down they fall back to HTTP POST
+    /transaction, through a transport with deadlines, retries and a
+    circuit breaker. A notification is only sent over HTTP if its frame
+    was never written: once written, the server may have processed it.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        client_id: Optional[str] = None,
+        request_timeout: float = 10.0
+    ):
         self.base_url = base_url
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.client_id = client_id or f"cli-{uuid.uuid4().hex[:12]}"
+        # Replies only; this connection doesn't need every broadcast event
+        self.ws_url = base_url.replace("http", "ws", 1) + f"/ws/{self.client_id}?firehose=0&heartbeat=1"
+        self.request_timeout = request_timeout
+        self.transport = HttpTransport(base_url, timeout=request_timeout)
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._codec = JSON
+        self._channel: Optional[asyncio.Task] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._request_ids = itertools.count(1)
         
+    @property
+    def session(self) -> Optional[aiohttp.ClientSession]:
+        return self.transport.session
+
     async def connect(self):
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+        await self.transport.start()
+
+    def _open_channel(self):
+        if not self._channel:
+            self._channel = asyncio.create_task(self._run_channel())
             
     async def close(self):
-        if self.session:
-            await self.session.close()
-            self.session = None
-            
+        if self._channel:
+            self._channel.cancel()
+            try:
+                await self._channel
+            except asyncio.CancelledError:
+                pass
+            self._channel = None
+        await self.transport.close()
+
+    @property
+    def channel_open(self) -> bool:
+        return self._ws is not None and not self._ws.closed
+
+    async def _run_channel(self):
+        """Keep the notification WebSocket open, reconnecting with jittered backoff"""
+        delay = 0.5
+        while True:
+            try:
+                async with self.session.ws_connect(
+                    self.ws_url, protocols=[codec.subprotocol for codec in CODECS]
+                ) as ws:
+                    self._codec = next((c for c in CODECS if c.subprotocol == ws.protocol), JSON)
+                    self._ws = ws
+                    delay = 0.5
+                    await self._read_channel(ws)
+            except asyncio.CancelledError:
+                raise
+            except (aiohttp.ClientError, OSError, ProtocolError) as e:
+                logging.debug(f"Notification channel down: {e}")
+            except Exception as e:
+                logging.warning(f"Notification channel failed: {e!r}")
+            finally:
+                self._ws = None
+                self._fail_pending(ConnectionError("Notification channel closed"))
+            await asyncio.sleep(delay * (0.5 + random.random()))
+            delay = min(delay * 2, 30.0)
+
+    async def _read_channel(self, ws: aiohttp.ClientWebSocketResponse):
+        async for frame in ws:
+            if frame.type not in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                break
+            message = self._codec.decode(frame.data)
+            for item in message if isinstance(message, list) else [message]:
+                if not isinstance(item, dict):
+                    logging.debug(f"Ignoring notification channel message: {item!r}")
+                    continue
+                if item.get("type") == "ping":
+                    await self._send_frame(ws, {"type": "pong"})
+                    continue
+                future = self._pending.pop(item.get("request_id"), None)
+                if future and not future.done():
+                    future.set_result(item)
+
+    def _fail_pending(self, error: Exception):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def _send_frame(self, ws: aiohttp.ClientWebSocketResponse, message: Dict[str, Any]):
+        frame = self._codec.encode(message)
+        if self._codec.binary:
+            await ws.send_bytes(frame)
+        else:
+            await ws.send_str(frame)
+
+    async def _notify_over_channel(self, data: Dict[str, Any]) -> asyncio.Future:
+        """Write one notify frame and return the future for its reply"""
+        request_id = str(next(self._request_ids))
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda _: self._pending.pop(request_id, None))
+        self._pending[request_id] = future
+        try:
+            await self._send_frame(self._ws, {
+                "type": "notify",
+                "request_id": request_id,
+                "transaction": data
+            })
+        except Exception as e:
+            self._pending.pop(request_id, None)
+            raise ConnectionError(f"Notification channel write failed: {e}")
+        return future
+
+    def _log_reply(self, future: asyncio.Future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # Written but unanswered, so it may have been processed; resending could duplicate it
+            logging.warning(f"No reply to a transaction notification ({error}), it may not have arrived")
+        elif future.result().get("type") == "error":
+            logging.error(f"Transaction notification failed: {future.result().get('message')}")
+
     async def send_transaction(
         self,
         wallet_address: str,
@@ -23,9 +150,18 @@ class SolanaClient:
         recipient: str,
         phone_number: Optional[str] = None,
         transaction_type: str = "transfer",
-        metadata: Optional[Dict[str, Any]] = None
-    ):
+        metadata: Optional[Dict[str, Any]] = None,
+        wait: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """Notify the server about a transaction.
+
+        With wait=False the call returns once the frame is written and the
+        reply is checked in the background. Over HTTP it always waits.
+        If the frame was written but no reply came, ConnectionError or
+        asyncio.TimeoutError is raised rather than resending it.
+        """
         await self.connect()
+        self._open_channel()
         
         data = {
             "wallet_address": wallet_address,
@@ -37,16 +173,60 @@ class SolanaClient:
         
         if metadata:
             data["metadata"] = metadata
-            
+
+        if self.channel_open:
+            try:
+                future = await self._notify_over_channel(data)
+            except ConnectionError as e:
+                # Never went out, so HTTP can't deliver it twice
+                logging.warning(f"Notification channel unavailable ({e}), falling back to HTTP")
+            else:
+                if not wait:
+                    future.add_done_callback(self._log_reply)
+                    return None
+                reply = await asyncio.wait_for(future, self.request_timeout)
+                if reply.get("type") == "error":
+                    logging.error(f"Transaction notification failed: {reply.get('message')}")
+                return reply
+
+        return await self._post_transaction(data)
+
+    async def _post_transaction(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = await self.transport.request("POST", "/transaction", json=data)
+            if response.status != 200:
+                logging.error(f"Transaction notification failed: {response.text()}")
+            return response.json()
+
+        except Exception as e:
+            logging.error(f"Failed to notify server: {str(e)}")
+            raise
+
+    async def send_transaction_batch(
+        self,
+        transactions: Iterable[Dict[str, Any]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Send many notifications in one request, yielding per-record results as the server streams them"""
+        await self.connect()
+
+        # MessagePack when available: smaller bodies and cheaper to parse server-side
+        codec = CODECS[0]
+        body = codec.encode(list(transactions))
+
         try:
-            async with self.session.post(
-                f"{self.base_url}/transaction",
-                json=data
+            async with self.transport.stream(
+                "POST",
+                "/transactions/batch",
+                data=body,
+                headers={"Content-Type": codec.content_type}
             ) as response:
                 if response.status != 200:
-                    logging.error(f"Transaction notification failed: {await response.text()}")
-                return await response.json()
-                
+                    logging.error(f"Batch notification failed: {await response.text()}")
+                    response.raise_for_status()
+                async for line in response.content:
+                    if line.strip():
+                        yield json.loads(line)
+
         except Exception as e:
             logging.error(f"Failed to notify server: {str(e)}")
-            raise
\ No newline at end of file
+            raise
@@ -0,0 +1,303 @@
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Confirmed
+from solana.rpc.types import TxOpts
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
+from typing import Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+from src.rpc_pool import pinned
+from src.rpc_pubsub import RpcPubSub, Subscription
+from src.tasks import spawn
+
+# getSignatureStatuses accepts at most this many signatures per call
+MAX_SIGNATURES_PER_REQUEST = 256
+
+CONFIRMED = "confirmed"
+FINALIZED = "finalized"
+EXPIRED = "expired"
+FAILED = "failed"
+
+
+class TransactionExpiredError(Exception):
+    """The blockhash expired before the transaction landed, so it never will"""
+
+
+class TransactionFailedError(Exception):
+    """The transaction landed but its execution failed"""
+
+
+class TrackedSignature:
+    """A sent transaction being watched; await `confirmed` or `finalized`.
+
+    Both futures resolve to the slot the transaction landed in, or raise
+    TransactionExpiredError / TransactionFailedError. The callback, if
+    any, is called with (tracked, status) on every status change.
+    `endpoint` is the RPC endpoint it was sent through, if known.
+    """
+
+    __slots__ = (
+        "signature", "transaction", "last_valid_block_height", "callback",
+        "confirmed", "finalized", "status", "last_sent", "subscription", "endpoint"
+    )
+
+    def __init__(
+        self,
+        signature: str,
+        transaction: Optional[bytes],
+        last_valid_block_height: Optional[int],
+        callback: Optional[Callable[["TrackedSignature", str], None]],
+        endpoint: Optional[str] = None
+    ):
+        self.signature = signature
+        self.transaction = transaction
+        self.last_valid_block_height = last_valid_block_height
+        self.callback = callback
+        loop = asyncio.get_running_loop()
+        self.confirmed = loop.create_future()
+        self.finalized = loop.create_future()
+        for future in (self.confirmed, self.finalized):
+            # Nobody has to await both; don't warn about the one left alone
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.status: Optional[str] = None
+        self.last_sent = time.monotonic()
+        self.subscription: Optional[Subscription] = None
+        self.endpoint = endpoint
+
+
+class ConfirmationTracker:
+    """Watches sent transactions until they finalize, fail or expire.
+
+    With an RPC websocket each signature gets a signatureSubscribe, so
+    confirmation is reported as soon as the node sees it; the pubsub
+    manager re-subscribes them after a reconnect. A poll loop
+    checks everything still in flight with batched getSignatureStatuses;
+    it picks up finalization, covers signatures the websocket missed, and
+    resends unlanded transactions every `rebroadcast_interval` seconds
+    until their blockhash expires.
+
+    Expiry is what allows a caller to sign the payment again, so it is
+    only declared from one node's consistent view: the block height and
+    statuses are read from the endpoint the transaction was sent through,
+    the height must be `expiry_margin` blocks past the last valid one, and
+    a final search of the transaction history must still not find it.
+    """
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        pubsub: Optional[RpcPubSub] = None,
+        poll_interval: float = 2.0,
+        rebroadcast_interval: float = 2.0,
+        rebroadcast_concurrency: int = 16,
+        expiry_margin: int = 50
+    ):
+        self.client = client
+        self.pubsub = pubsub
+        self.poll_interval = poll_interval
+        self.rebroadcast_interval = rebroadcast_interval
+        self.rebroadcast_concurrency = rebroadcast_concurrency
+        self.expiry_margin = expiry_margin
+        self.in_flight: Dict[str, TrackedSignature] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def track(
+        self,
+        signature: str,
+        transaction: Optional[bytes] = None,
+        last_valid_block_height: Optional[int] = None,
+        callback: Optional[Callable[[TrackedSignature, str], None]] = None,
+        endpoint: Optional[str] = None
+    ) -> TrackedSignature:
+        """Watch a sent transaction; pass its wire bytes to have it rebroadcast"""
+        tracked = self.in_flight.get(signature)
+        if tracked is None:
+            tracked = TrackedSignature(signature, transaction, last_valid_block_height, callback, endpoint)
+            self.in_flight[signature] = tracked
+            if self.pubsub:
+                spawn(self._subscribe(tracked))
+        return tracked
+
+    async def _subscribe(self, tracked: TrackedSignature):
+        try:
+            subscription = await self.pubsub.subscribe(
+                "signatureSubscribe",
+                [tracked.signature, {"commitment": "confirmed"}],
+                lambda result: self._on_notification(tracked, result)
+            )
+        except Exception as e:
+            # The poll loop still covers it
+            logging.debug(f"signatureSubscribe failed for {tracked.signature}: {e!r}")
+            return
+        if tracked.status is None:
+            tracked.subscription = subscription
+        else:
+            await subscription.close()  # settled by a poll in the meantime
+
+    def _unsubscribe(self, tracked: TrackedSignature):
+        if tracked.subscription is not None:
+            spawn(tracked.subscription.close())
+            tracked.subscription = None
+
+    def _on_notification(self, tracked: TrackedSignature, result: dict):
+        value = result.get("value")
+        if not isinstance(value, dict):
+            return  # "receivedSignature" notices
+        if value.get("err") is not None:
+            self._fail(tracked, value["err"])
+        else:
+            self._confirm(tracked, result["context"]["slot"])
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self.in_flight:
+                continue
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Confirmation poll failed: {e}")
+
+    async def poll(self):
+        """Check every signature still in flight once"""
+        groups: Dict[Optional[str], List[TrackedSignature]] = {}
+        for tracked in self.in_flight.values():
+            groups.setdefault(tracked.endpoint, []).append(tracked)
+        results = await asyncio.gather(
+            *(self._poll_endpoint(endpoint, group) for endpoint, group in groups.items()),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logging.warning(f"Confirmation poll failed: {result}")
+
+    async def _poll_endpoint(self, endpoint: Optional[str], tracked_list: List[TrackedSignature]):
+        with pinned(self.client, endpoint):
+            block_height = None
+            if any(tracked.last_valid_block_height is not None for tracked in tracked_list):
+                # Read before the statuses: absent then means absent with this height
+                block_height = (await self.client.get_block_height(Confirmed)).value
+
+            unlanded = [
+                tracked for tracked, status in zip(tracked_list, await self._statuses(tracked_list))
+                if not self._apply(tracked, status)
+            ]
+
+            expiring = [
+                tracked for tracked in unlanded
+                if tracked.last_valid_block_height is not None
+                and block_height > tracked.last_valid_block_height + self.expiry_margin
+            ]
+            if expiring:
+                # Older than the node's recent status cache; only its history can rule out a landing
+                for tracked, status in zip(expiring, await self._statuses(expiring, search_transaction_history=True)):
+                    if not self._apply(tracked, status):
+                        self._expire(tracked)
+
+            now = time.monotonic()
+            resend = [
+                tracked for tracked in unlanded
+                if tracked.transaction is not None
+                and (tracked.last_valid_block_height is None or block_height <= tracked.last_valid_block_height)
+                and now - tracked.last_sent >= self.rebroadcast_interval
+            ]
+            if resend:
+                await self._rebroadcast(resend)
+
+    async def _statuses(self, tracked_list: List[TrackedSignature], search_transaction_history: bool = False):
+        chunks = [
+            tracked_list[start:start + MAX_SIGNATURES_PER_REQUEST]
+            for start in range(0, len(tracked_list), MAX_SIGNATURES_PER_REQUEST)
+        ]
+        responses = await asyncio.gather(*(
+            self.client.get_signature_statuses(
+                [Signature.from_string(t.signature) for t in chunk], search_transaction_history
+            )
+            for chunk in chunks
+        ))
+        return [status for response in responses for status in response.value]
+
+    def _apply(self, tracked: TrackedSignature, status) -> bool:
+        """Settle tracked from a status; False if it hasn't landed"""
+        if status is None:
+            return False
+        if status.err is not None:
+            self._fail(tracked, status.err)
+        elif (
+            status.confirmation_status == TransactionConfirmationStatus.Finalized
+            or status.confirmations is None
+        ):
+            self._confirm(tracked, status.slot)
+            self._finalize(tracked, status.slot)
+        elif status.confirmation_status == TransactionConfirmationStatus.Confirmed:
+            self._confirm(tracked, status.slot)
+        return True
+
+    async def _rebroadcast(self, tracked_list: List[TrackedSignature]):
+        semaphore = asyncio.Semaphore(self.rebroadcast_concurrency)
+        opts = TxOpts(skip_preflight=True, max_retries=0)
+
+        async def send(tracked: TrackedSignature):
+            async with semaphore:
+                tracked.last_sent = time.monotonic()
+                try:
+                    await self.client.send_raw_transaction(tracked.transaction, opts=opts)
+                except Exception as e:
+                    # Same signature, so a resend can never land twice; just try again later
+                    logging.debug(f"Rebroadcast of {tracked.signature} failed: {e!r}")
+
+        await asyncio.gather(*(send(tracked) for tracked in tracked_list))
+
+    def _confirm(self, tracked: TrackedSignature, slot: int):
+        if not tracked.confirmed.done():
+            tracked.confirmed.set_result(slot)
+            # Only polling is left to do, for finalization
+            self._unsubscribe(tracked)
+            self._notify(tracked, CONFIRMED)
+
+    def _finalize(self, tracked: TrackedSignature, slot: int):
+        if not tracked.finalized.done():
+            tracked.finalized.set_result(slot)
+            self._settle(tracked, FINALIZED)
+
+    def _fail(self, tracked: TrackedSignature, err):
+        error = TransactionFailedError(f"{tracked.signature} failed: {err}")
+        for future in (tracked.confirmed, tracked.finalized):
+            if not future.done():
+                future.set_exception(error)
+        self._settle(tracked, FAILED)
+
+    def _expire(self, tracked: TrackedSignature):
+        error = TransactionExpiredError(f"{tracked.signature} expired before landing")
+        for future in (tracked.confirmed, tracked.finalized):
+            if not future.done():
+                future.set_exception(error)
+        self._settle(tracked, EXPIRED)
+
+    def _settle(self, tracked: TrackedSignature, status: str):
+        if self.in_flight.pop(tracked.signature, None) is None:
+            return
+        self._unsubscribe(tracked)
+        self._notify(tracked, status)
+
+    @staticmethod
+    def _notify(tracked: TrackedSignature, status: str):
+        tracked.status = status
+        if tracked.callback:
+            try:
+                tracked.callback(tracked, status)
+            except Exception as e:
+                logging.error(f"Confirmation callback error: {e}")
@@ -0,0 +1,222 @@
+"""A local stand-in for a Solana RPC node, for exercising the endpoint pool.
+
+Serves the JSON-RPC methods the terminal uses from in-memory state,
+with adjustable latency, error rate and slot lag so that slow, flaky
+and stale endpoints can be simulated side by side. Websocket clients on
+the same URL get the pubsub subscription methods, with notifications
+sent by publish() and for transactions as they land:
+
+    python -m src.fake_rpc --port 8901 --latency 0.02 0.2 0.05 --error-rate 0 0 0.5
+
+starts three nodes on ports 8901-8903 and prints the matching
+config/rpc_endpoints.json entry.
+"""
+
+from aiohttp import web
+from solders.hash import Hash
+from solders.transaction import Transaction
+from typing import Any, Dict, List, Optional, Set, Tuple
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import random
+import time
+
+SLOT_SECONDS = 0.4
+
+
+class FakeRpcServer:
+    def __init__(self, port: int, latency: float = 0.0, error_rate: float = 0.0, slot_lag: int = 0):
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.slot_lag = slot_lag
+        # Answer everything with 503, as an overloaded or broken node would
+        self.down = False
+        # Accept sendTransaction but never land anything, as if it was dropped
+        self.drop_transactions = False
+        self.requests = 0
+        self.balances: Dict[str, int] = {}
+        self.signatures: Set[str] = set()
+        # Every landed transaction by signature, and how many sends were received
+        self.transactions: Dict[str, Transaction] = {}
+        self.sends = 0
+        # Pubsub subscriptions by id: (method, params, socket)
+        self.subscriptions: Dict[int, Tuple[str, List[Any], web.WebSocketResponse]] = {}
+        self._subscription_ids = itertools.count(1)
+        self._sockets: Set[web.WebSocketResponse] = set()
+        self._started = time.monotonic()
+        self._skipped = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def slot(self) -> int:
+        return 1000 + int((time.monotonic() - self._started) / SLOT_SECONDS) + self._skipped - self.slot_lag
+
+    def advance(self, slots: int):
+        """Jump the chain forward, e.g. past a blockhash's last valid block height"""
+        self._skipped += slots
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/", self._handle)
+        app.router.add_get("/", self._websocket)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+
+    async def disconnect(self):
+        """Drop every websocket client, as a node restart would"""
+        for ws in list(self._sockets):
+            await ws.close()
+
+    async def publish(self, method: str, target: Any, result: Any):
+        """Notify every `method` subscription whose first param is target"""
+        for subscription, (subscribed, params, ws) in list(self.subscriptions.items()):
+            if subscribed == method and params and params[0] == target and not ws.closed:
+                await ws.send_str(json.dumps({
+                    "jsonrpc": "2.0",
+                    "method": method.replace("Subscribe", "Notification"),
+                    "params": {"result": result, "subscription": subscription}
+                }))
+
+    async def stop(self):
+        await self.disconnect()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * random.uniform(0.8, 1.2))
+        if self.down or random.random() < self.error_rate:
+            return web.Response(status=503, text="unavailable")
+        body = await request.json()
+        if isinstance(body, list):
+            return web.json_response([self._call(call) for call in body])
+        response = self._call(body)
+        if body.get("method") == "sendTransaction" and response["result"] in self.signatures:
+            await self.publish("signatureSubscribe", response["result"], self._context({"err": None}))
+        return web.json_response(response)
+
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets.add(ws)
+        try:
+            async for frame in ws:
+                call = json.loads(frame.data)
+                method, params = call["method"], call.get("params", [])
+                if method.endswith("Unsubscribe"):
+                    result = self.subscriptions.pop(params[0], None) is not None
+                elif method.endswith("Subscribe"):
+                    result = next(self._subscription_ids)
+                    self.subscriptions[result] = (method, params, ws)
+                else:
+                    await ws.send_str(json.dumps(self._call(call)))
+                    continue
+                await ws.send_str(json.dumps({"jsonrpc": "2.0", "id": call.get("id"), "result": result}))
+        finally:
+            self._sockets.discard(ws)
+            for subscription, (_, _, owner) in list(self.subscriptions.items()):
+                if owner is ws:
+                    del self.subscriptions[subscription]
+        return ws
+
+    def _call(self, call: Dict[str, Any]) -> Dict[str, Any]:
+        method = getattr(self, f"_rpc_{call['method']}", None)
+        if method is None:
+            return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": "Method not found"}}
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": method(*call.get("params", []))}
+
+    def _context(self, value: Any) -> Dict[str, Any]:
+        return {"context": {"slot": self.slot}, "value": value}
+
+    def _rpc_getHealth(self, *_):
+        return "ok"
+
+    def _rpc_getSlot(self, *_):
+        return self.slot
+
+    def _rpc_getBlockHeight(self, *_):
+        return self.slot
+
+    def _rpc_getLatestBlockhash(self, *_):
+        return self._context({"blockhash": str(Hash.new_unique()), "lastValidBlockHeight": self.slot + 150})
+
+    def _rpc_getBalance(self, pubkey: str, *_):
+        return self._context(self.balances.get(pubkey, 0))
+
+    def _rpc_getMultipleAccounts(self, pubkeys, *_):
+        return self._context([
+            {
+                "lamports": self.balances[pubkey], "data": ["", "base64"], "owner": "11111111111111111111111111111111",
+                "executable": False, "rentEpoch": 0, "space": 0
+            } if pubkey in self.balances else None
+            for pubkey in pubkeys
+        ])
+
+    def _rpc_getSignatureStatuses(self, signatures, *_):
+        return self._context([
+            {
+                "slot": self.slot, "confirmations": None, "err": None,
+                "status": {"Ok": None}, "confirmationStatus": "finalized"
+            } if signature in self.signatures else None
+            for signature in signatures
+        ])
+
+    def _rpc_sendTransaction(self, encoded: str, *_):
+        transaction = Transaction.from_bytes(base64.b64decode(encoded))
+        signature = str(transaction.signatures[0])
+        self.sends += 1
+        if not self.drop_transactions:
+            self.signatures.add(signature)
+            self.transactions[signature] = transaction
+        return signature
+
+
+async def serve(port: int, latencies, error_rates, slot_lags):
+    count = max(len(latencies), len(error_rates), len(slot_lags))
+    servers = [
+        FakeRpcServer(
+            port + i,
+            latencies[i] if i < len(latencies) else 0.0,
+            error_rates[i] if i < len(error_rates) else 0.0,
+            slot_lags[i] if i < len(slot_lags) else 0
+        )
+        for i in range(count)
+    ]
+    for server in servers:
+        await server.start()
+        print(f"Fake RPC node on {server.url}: latency {server.latency}s, "
+              f"error rate {server.error_rate}, slot lag {server.slot_lag}")
+    print(json.dumps({"devnet": [server.url for server in servers]}))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for server in servers:
+            await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Solana RPC nodes for testing the endpoint pool")
+    parser.add_argument("--port", type=int, default=8901, help="port of the first node; the rest follow")
+    parser.add_argument("--latency", type=float, nargs="+", default=[0.0], help="seconds per request, per node")
+    parser.add_argument("--error-rate", type=float, nargs="+", default=[0.0], help="fraction answered 503, per node")
+    parser.add_argument("--slot-lag", type=int, nargs="+", default=[0], help="slots behind, per node")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.port, args.latency, args.error_rate, args.slot_lag))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
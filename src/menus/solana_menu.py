@@ -2,9 +2,15 @@
 
 import questionary
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
+from rich.progress import Progress
+from rich.table import Table
+from typing import List
 import logging
 import asyncio
+import os
+from src.bulk_transfer import BulkTransfer, FEE_PER_SIGNATURE, LAMPORTS_PER_SOL
 from src.solana_manager import SolanaManager
 from src.banner import clear_terminal_preserve_banner
 
@@ -19,6 +25,11 @@ class SolanaMenu:
         """
         self.solana_manager = solana_manager
         self.wallet_balance = "0.00"
+        # Kept current by the wallet's account subscription between explicit checks
+        solana_manager.balance_listeners.append(self._on_balance)
+
+    def _on_balance(self, balance: float):
+        self.wallet_balance = str(balance)
 
     def display_status(self):
         """Display the current status of the Solana wallet."""
@@ -58,10 +69,12 @@ class SolanaMenu:
         try:
             check_type = await questionary.select(
                 "Check balance for:",
-                choices=['My Wallet', 'Other Address']
+                choices=['My Wallet', 'Other Address', 'Multiple Addresses']
             ).ask_async()
             
-            if check_type == 'Other Address':
+            if check_type == 'Multiple Addresses':
+                await self.handle_multi_balance_check()
+            elif check_type == 'Other Address':
                 address = await questionary.text("Enter Solana address:").ask_async()
                 balance = await self.solana_manager.get_balance(address)
                 console.print(f"[green]Balance: {balance} SOL[/green]")
@@ -72,6 +85,40 @@ class SolanaMenu:
             logging.error(f"Error checking balance: {str(e)}")
             console.print(f"[red]Error checking balance: {str(e)}[/red]")
 
+    async def handle_multi_balance_check(self):
+        """Check many addresses at once, filling a table as results arrive."""
+        source = await questionary.text(
+            "Enter addresses (comma separated) or path to a file with one per line:"
+        ).ask_async()
+        addresses = self.read_addresses(source or "")
+        if not addresses:
+            console.print("[yellow]No addresses given.[/yellow]")
+            return
+
+        table = Table(title=f"Balances ({len(addresses)} addresses)")
+        table.add_column("Address", style="cyan")
+        table.add_column("Balance (SOL)", style="green", justify="right")
+        total = 0.0
+        with Live(table, console=console, refresh_per_second=8):
+            async for balances in self.solana_manager.get_balances(addresses):
+                for address, balance in balances.items():
+                    if balance is None:
+                        table.add_row(address, "[red]unavailable[/red]")
+                    else:
+                        total += balance
+                        table.add_row(address, f"{balance:.9f}")
+        console.print(f"[green]Total: {total:.9f} SOL[/green]")
+
+    @staticmethod
+    def read_addresses(source: str) -> List[str]:
+        """Addresses from a comma/whitespace separated list, or from a file if source is a path."""
+        source = source.strip()
+        if os.path.isfile(source):
+            with open(source) as f:
+                lines = [line.split("#")[0] for line in f]
+            source = " ".join(lines)
+        return [address for address in source.replace(",", " ").split() if address]
+
     async def handle_transfer(self):
         """Handle the workflow for transferring SOL from the current wallet."""
         try:
@@ -87,6 +134,47 @@ class SolanaMenu:
             logging.error(f"Error transferring SOL: {str(e)}")
             console.print(f"[red]Error transferring SOL: {str(e)}[/red]")
 
+    async def handle_bulk_transfer(self):
+        """Handle the workflow for paying many recipients from a CSV of recipient,amount rows."""
+        try:
+            if not self.solana_manager.keypair:
+                raise ValueError("Wallet not loaded")
+            path = await questionary.path("CSV file (recipient,amount in SOL):").ask_async()
+            bulk = BulkTransfer.from_csv(self.solana_manager, path)
+
+            counts = bulk.counts()
+            lamports, transactions = bulk.plan()
+            fees = transactions * FEE_PER_SIGNATURE
+            console.print(Panel(f"""
+[cyan]Bulk Transfer[/cyan]
+• Recipients: [yellow]{len(bulk.rows)}[/yellow] ([green]{counts.get('confirmed', 0)} already paid[/green], [red]{counts.get('invalid', 0)} invalid[/red])
+• To send: [green]{lamports / LAMPORTS_PER_SOL} SOL[/green] in [yellow]{transactions}[/yellow] transactions
+• Estimated fees: [yellow]{fees / LAMPORTS_PER_SOL} SOL[/yellow]
+• State file: [dim]{bulk.state_path}[/dim]
+""", title="Payout Plan"))
+            unsettled = sum(counts.get(status, 0) for status in ('pending', 'failed', 'submitted', 'sent'))
+            if not unsettled:
+                console.print("[yellow]Nothing left to send.[/yellow]")
+                return
+            if not await questionary.confirm("Send these payouts?").ask_async():
+                return
+
+            with Progress(console=console) as progress:
+                task = progress.add_task("Sending payouts...", total=counts.get('pending', 0) + counts.get('failed', 0))
+                counts = await bulk.run(lambda rows: progress.advance(task, rows))
+
+            unconfirmed = counts.get('pending', 0) + counts.get('submitted', 0) + counts.get('sent', 0)
+            console.print(f"[green]Confirmed: {counts.get('confirmed', 0)}[/green]  "
+                          f"[red]Failed: {counts.get('failed', 0)}[/red]  "
+                          f"[yellow]Unconfirmed: {unconfirmed}[/yellow]  "
+                          f"[dim]Invalid: {counts.get('invalid', 0)}[/dim]")
+            if counts.get('failed') or unconfirmed:
+                console.print("[yellow]Run Bulk Transfer again with the same file to retry.[/yellow]")
+            self.wallet_balance = str(await self.solana_manager.get_balance())
+        except Exception as e:
+            logging.error(f"Error in bulk transfer: {str(e)}")
+            console.print(f"[red]Error in bulk transfer: {str(e)}[/red]")
+
     async def handle_token_deployment(self):
         """Handle the workflow for deploying a new Solana token."""
         try:
@@ -167,6 +255,7 @@ class SolanaMenu:
                         'Load/Create Wallet',
                         'Check Balance',
                         'Transfer SOL',
+                        'Bulk Transfer',
                         'Request Airdrop (Devnet)',
                         'Deploy New Token',
                         'Save Wallet',
@@ -181,6 +270,7 @@ class SolanaMenu:
                     'Load/Create Wallet': self.handle_wallet_actions,
                     'Check Balance': self.handle_balance_check,
                     'Transfer SOL': self.handle_transfer,
+                    'Bulk Transfer': self.handle_bulk_transfer,
                     'Request Airdrop (Devnet)': self.handle_airdrop,
                     'Deploy New Token': self.handle_token_deployment,
                     'Save Wallet': self.handle_wallet_save
@@ -0,0 +1,170 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+from src.client import SolanaClient
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_next_attempt ON outbox (next_attempt, id);
+"""
+
+# (id, notification, attempts so far)
+Row = Tuple[int, Dict[str, Any], int]
+
+SENT, REJECTED, RETRY = "sent", "rejected", "retry"
+
+
+class NotificationOutbox:
+    """Server notifications, committed to a local SQLite queue before anything is sent.
+
+    add() returns as soon as the row is on disk, so callers never wait on
+    the server, and nothing is lost if the server is down or the CLI
+    exits. A background task sends due rows in batches, deletes the ones
+    the server accepted (or rejected as invalid) and reschedules the rest
+    with jittered exponential backoff. Rows left over at exit go out on
+    the next start.
+    """
+
+    def __init__(
+        self,
+        client: SolanaClient,
+        path: str = os.path.join("config", "outbox.db"),
+        batch_size: int = 100,
+        backoff: float = 1.0,
+        max_backoff: float = 300.0
+    ):
+        self.client = client
+        self.path = path
+        self.batch_size = batch_size
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # sqlite3 connections stay on the thread that created them
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+        self._db: Optional[sqlite3.Connection] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self._call(self._open)
+        self._task = asyncio.create_task(self._drain_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._call(self._close)
+
+    async def add(self, notification: Dict[str, Any]) -> int:
+        """Durably queue a notification and return its outbox id"""
+        row_id = await self._call(self._insert, json.dumps(notification))
+        self._wakeup.set()
+        return row_id
+
+    async def pending(self) -> int:
+        return await self._call(self._count)
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _drain_loop(self):
+        while True:
+            # Cleared before looking, so an add() during the query still wakes us
+            self._wakeup.clear()
+            rows = await self._call(self._due, time.time(), self.batch_size)
+            if rows:
+                outcomes = await self._deliver(rows)
+                await self._call(self._settle, rows, outcomes, time.time())
+                continue
+
+            next_due = await self._call(self._next_due)
+            timeout = max(0.0, next_due - time.time()) if next_due is not None else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, rows: List[Row]) -> List[str]:
+        """Send one batch and classify each row's result; rows without one are retried"""
+        # Always one batch request, even with the WebSocket open: a notify frame per row
+        # would spend the per-message rate limit, and a frame that times out can't be
+        # retried without risking a second delivery
+        outcomes = [RETRY] * len(rows)
+        try:
+            async for result in self.client.send_transaction_batch(
+                notification for _, notification, _ in rows
+            ):
+                if result.get("status") == "success":
+                    outcomes[result["index"]] = SENT
+                else:
+                    logging.error(f"Server rejected notification: {result.get('detail')}")
+                    outcomes[result["index"]] = REJECTED
+        except Exception as e:
+            # Results streamed before the failure still count
+            received = len(rows) - outcomes.count(RETRY)
+            logging.warning(f"Outbox delivery failed after {received} of {len(rows)} results: {e}")
+        return outcomes
+
+    def _retry_delay(self, attempts: int) -> float:
+        return min(self.max_backoff, self.backoff * (2 ** attempts)) * (0.5 + random.random())
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def _close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _insert(self, payload: str) -> int:
+        with self._db:
+            cursor = self._db.execute(
+                "INSERT INTO outbox (created_at, payload) VALUES (?, ?)", (time.time(), payload)
+            )
+        return cursor.lastrowid
+
+    def _count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def _due(self, now: float, limit: int) -> List[Row]:
+        rows = self._db.execute(
+            "SELECT id, payload, attempts FROM outbox WHERE next_attempt <= ? ORDER BY id LIMIT ?",
+            (now, limit)
+        ).fetchall()
+        return [(row_id, json.loads(payload), attempts) for row_id, payload, attempts in rows]
+
+    def _next_due(self) -> Optional[float]:
+        return self._db.execute("SELECT MIN(next_attempt) FROM outbox").fetchone()[0]
+
+    def _settle(self, rows: List[Row], outcomes: List[str], now: float):
+        done = [(row_id,) for (row_id, _, _), outcome in zip(rows, outcomes) if outcome != RETRY]
+        retry = [
+            (attempts + 1, now + self._retry_delay(attempts), row_id)
+            for (row_id, _, attempts), outcome in zip(rows, outcomes) if outcome == RETRY
+        ]
+        with self._db:
+            self._db.executemany("DELETE FROM outbox WHERE id = ?", done)
+            self._db.executemany(
+                "UPDATE outbox SET attempts = ?, next_attempt = ? WHERE id = ?", retry
+            )
+        if retry:
+            logging.warning(f"{len(retry)} notifications could not be delivered, will retry")
@@ -0,0 +1,156 @@
+"""Message schema and wire codecs shared by SolanaClient and the notification server"""
+
+from typing import Any, Dict, List, Optional, Union
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:  # JSON-only fallback
+    msgpack = None
+
+Frame = Union[str, bytes]
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+class TransactionMessage:
+    """A transaction notification, validated without pydantic on the hot path"""
+
+    __slots__ = ("wallet_address", "amount", "recipient", "phone_number", "type", "metadata")
+
+    def __init__(
+        self,
+        wallet_address: str,
+        amount: float,
+        recipient: str,
+        phone_number: Optional[str] = None,
+        type: str = "transfer",
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.wallet_address = wallet_address
+        self.amount = amount
+        self.recipient = recipient
+        self.phone_number = phone_number
+        self.type = type
+        self.metadata = metadata
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "TransactionMessage":
+        if not isinstance(data, dict):
+            raise ProtocolError("Transaction must be an object")
+        try:
+            wallet_address = data["wallet_address"]
+            amount = data["amount"]
+            recipient = data["recipient"]
+        except KeyError as e:
+            raise ProtocolError(f"Missing field: {e.args[0]}")
+
+        if not isinstance(wallet_address, str) or not isinstance(recipient, str):
+            raise ProtocolError("wallet_address and recipient must be strings")
+        if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+            raise ProtocolError("amount must be a number")
+
+        phone_number = data.get("phone_number")
+        if phone_number is not None and not isinstance(phone_number, str):
+            raise ProtocolError("phone_number must be a string")
+        transaction_type = data.get("type") or "transfer"
+        if not isinstance(transaction_type, str):
+            raise ProtocolError("type must be a string")
+        metadata = data.get("metadata")
+        if metadata is not None and not isinstance(metadata, dict):
+            raise ProtocolError("metadata must be an object")
+
+        return cls(wallet_address, float(amount), recipient, phone_number, transaction_type, metadata)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "wallet_address": self.wallet_address,
+            "amount": self.amount,
+            "recipient": self.recipient,
+            "phone_number": self.phone_number,
+            "type": self.type
+        }
+        if self.metadata:
+            data["metadata"] = self.metadata
+        return data
+
+
+class JsonCodec:
+    subprotocol = "ica.json.v1"
+    content_type = "application/json"
+    binary = False
+
+    def encode(self, message: Any) -> str:
+        return json.dumps(message)
+
+    def decode(self, frame: Frame) -> Any:
+        try:
+            return json.loads(frame)
+        except ValueError as e:
+            raise ProtocolError(f"Invalid JSON frame: {e}")
+
+    def batch_frame(self, encoded_events: List[str]) -> str:
+        """An event_batch frame built from already-encoded events"""
+        return '{"type": "event_batch", "events": ' + self.array_frame(encoded_events) + "}"
+
+    def array_frame(self, encoded_messages: List[str]) -> str:
+        """A top-level array of already-encoded messages"""
+        return "[" + ", ".join(encoded_messages) + "]"
+
+
+class MsgpackCodec:
+    subprotocol = "ica.msgpack.v1"
+    content_type = "application/x-msgpack"
+    binary = True
+
+    # {"type": "event_batch", "events": <array>} up to the array header
+    _BATCH_PREFIX = b"\x82\xa4type\xabevent_batch\xa6events"
+
+    def encode(self, message: Any) -> bytes:
+        return msgpack.packb(message, use_bin_type=True)
+
+    def decode(self, frame: Frame) -> Any:
+        if isinstance(frame, str):
+            raise ProtocolError("Expected a binary MessagePack frame")
+        try:
+            return msgpack.unpackb(frame, raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as e:
+            raise ProtocolError(f"Invalid MessagePack frame: {e}")
+
+    def batch_frame(self, encoded_events: List[bytes]) -> bytes:
+        return self._BATCH_PREFIX + self.array_frame(encoded_events)
+
+    def array_frame(self, encoded_messages: List[bytes]) -> bytes:
+        count = len(encoded_messages)
+        if count < 16:
+            header = bytes([0x90 | count])
+        elif count < 0x10000:
+            header = b"\xdc" + struct.pack(">H", count)
+        else:
+            header = b"\xdd" + struct.pack(">I", count)
+        return header + b"".join(encoded_messages)
+
+
+JSON = JsonCodec()
+MSGPACK = MsgpackCodec() if msgpack else None
+
+# Most preferred first
+CODECS = [codec for codec in (MSGPACK, JSON) if codec]
+
+
+def negotiate(offered: List[str]) -> Optional[JsonCodec]:
+    """Pick the best codec among the subprotocols a client offered, or None for plain JSON"""
+    for codec in CODECS:
+        if codec.subprotocol in offered:
+            return codec
+    return None
+
+
+def codec_for_content_type(content_type: str):
+    for codec in CODECS:
+        if codec.content_type in content_type:
+            return codec
+    return JSON
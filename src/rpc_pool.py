@@ -0,0 +1,268 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Commitment
+from solana.rpc.core import _ClientCore
+from solana.rpc.providers.async_http import AsyncHTTPProvider
+from solana.rpc.providers.core import _after_request_unparsed
+from solders.rpc.requests import Body
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import asyncio
+import httpx
+import json
+import logging
+import time
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Endpoint URL the current task's requests are pinned to, if any
+_PINNED: ContextVar[Optional[str]] = ContextVar("rpc_pool_pinned", default=None)
+
+
+class Endpoint:
+    """One RPC URL and its running health: EWMA latency and error rate"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.failures = 0  # consecutive
+        self.ejections = 0
+        self.ejected_until: Optional[float] = None
+        self.slot: Optional[int] = None
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_until is not None
+
+    def score(self) -> float:
+        """Expected time to answer one more request; lower is better"""
+        # Unmeasured endpoints look fast so they get tried
+        latency = self.latency if self.latency is not None else 0.0
+        return latency * (1 + self.in_flight) * (1 + 10 * self.error_rate)
+
+
+class EndpointPool:
+    """Scores RPC endpoints from real traffic and probes, and picks the healthiest.
+
+    Every request and probe updates an endpoint's latency and error rate
+    as exponentially weighted moving averages. After `eject_after`
+    consecutive failures an endpoint is ejected for `eject_for` seconds,
+    doubling on each repeat up to `max_eject_for`. Once that time is up
+    it is probed again, and any success re-admits it. A probe also fails
+    if the endpoint's slot is more than `max_slot_lag` behind the best
+    one seen, so a node that has fallen behind is ejected too.
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        alpha: float = 0.2,
+        eject_after: int = 3,
+        eject_for: float = 10.0,
+        max_eject_for: float = 300.0,
+        max_slot_lag: int = 50
+    ):
+        self.endpoints = [Endpoint(url) for url in dict.fromkeys(urls)]
+        if not self.endpoints:
+            raise ValueError("At least one RPC endpoint is required")
+        self.alpha = alpha
+        self.eject_after = eject_after
+        self.eject_for = eject_for
+        self.max_eject_for = max_eject_for
+        self.max_slot_lag = max_slot_lag
+        self.best_slot = 0
+
+    def get(self, url: Optional[str]) -> Optional[Endpoint]:
+        return next((endpoint for endpoint in self.endpoints if endpoint.url == url), None)
+
+    def pick(self, exclude: Iterable[Endpoint] = ()) -> Optional[Endpoint]:
+        """The best admitted endpoint not in exclude.
+
+        If all of them are ejected, the one due back soonest, so requests
+        are never refused outright. None once everything is excluded.
+        """
+        excluded = set(map(id, exclude))
+        candidates = [endpoint for endpoint in self.endpoints if id(endpoint) not in excluded]
+        if not candidates:
+            return None
+        admitted = [endpoint for endpoint in candidates if not endpoint.ejected]
+        if admitted:
+            return min(admitted, key=Endpoint.score)
+        return min(candidates, key=lambda endpoint: endpoint.ejected_until)
+
+    def due_for_probe(self) -> List[Endpoint]:
+        now = time.monotonic()
+        return [endpoint for endpoint in self.endpoints if not endpoint.ejected or endpoint.ejected_until <= now]
+
+    def record(self, endpoint: Endpoint, elapsed: float, ok: bool):
+        if endpoint.latency is None:
+            endpoint.latency = elapsed
+        else:
+            endpoint.latency += self.alpha * (elapsed - endpoint.latency)
+        endpoint.error_rate += self.alpha * ((0.0 if ok else 1.0) - endpoint.error_rate)
+
+        if ok:
+            endpoint.failures = 0
+            if endpoint.error_rate < 0.05:
+                endpoint.ejections = 0
+            if endpoint.ejected:
+                endpoint.ejected_until = None
+                logging.info(f"RPC endpoint {endpoint.url} re-admitted")
+            return
+        endpoint.failures += 1
+        if endpoint.failures >= self.eject_after and not endpoint.ejected:
+            self._eject(endpoint)
+
+    def record_probe(self, endpoint: Endpoint, elapsed: float, slot: Optional[int]):
+        """A probe answered (slot) or failed (None); success re-admits an ejected endpoint"""
+        ok = slot is not None
+        if ok:
+            endpoint.slot = slot
+            self.best_slot = max(self.best_slot, slot)
+            if self.best_slot - slot > self.max_slot_lag:
+                logging.warning(f"RPC endpoint {endpoint.url} is {self.best_slot - slot} slots behind")
+                ok = False
+        self.record(endpoint, elapsed, ok)
+        if not ok and endpoint.ejected and endpoint.ejected_until <= time.monotonic():
+            # Still failing after serving its ejection: back out for longer
+            self._eject(endpoint)
+
+    def _eject(self, endpoint: Endpoint):
+        duration = min(self.eject_for * 2 ** endpoint.ejections, self.max_eject_for)
+        endpoint.ejections += 1
+        endpoint.ejected_until = time.monotonic() + duration
+        logging.warning(f"RPC endpoint {endpoint.url} ejected for {duration:.0f}s after {endpoint.failures} failures")
+
+
+class PooledHTTPProvider(AsyncHTTPProvider):
+    """solana-py's HTTP provider, sending each request to the pool's best endpoint.
+
+    A connection error, timeout, 429 or 5xx counts against the endpoint
+    and the request is retried on the next best one, up to `attempts`
+    endpoints. Inside pinned() requests go to that one endpoint and are
+    never failed over: endpoints may lag each other by up to
+    `max_slot_lag` slots, so a send and the reads that decide whether it
+    landed have to see a single node's view of the chain.
+    """
+
+    def __init__(self, pool: EndpointPool, timeout: float = 10, attempts: int = 3, probe_interval: float = 15.0):
+        super().__init__(pool.endpoints[0].url, timeout=timeout)
+        self.pool = pool
+        self.attempts = attempts
+        self.probe_interval = probe_interval
+        self._probing: Optional[asyncio.Task] = None
+
+    def __str__(self) -> str:
+        return f"Async HTTP RPC pool of {len(self.pool.endpoints)} endpoints"
+
+    async def make_request_unparsed(self, body: Body) -> str:
+        return await self._post(self._before_request(body=body))
+
+    async def make_batch_request_unparsed(self, reqs: Tuple[Body, ...]) -> str:
+        return await self._post(self._before_batch_request(reqs))
+
+    async def _post(self, request_kwargs: Dict[str, Any]) -> str:
+        tried: List[Endpoint] = []
+        pinned = self.pool.get(_PINNED.get())
+        while True:
+            endpoint = pinned or self.pool.pick(exclude=tried)
+            tried.append(endpoint)
+            last_attempt = pinned is not None or len(tried) >= min(self.attempts, len(self.pool.endpoints))
+            endpoint.in_flight += 1
+            start = time.perf_counter()
+            try:
+                response = await self.session.post(**{**request_kwargs, "url": endpoint.url})
+            except httpx.TransportError:
+                self.pool.record(endpoint, time.perf_counter() - start, False)
+                if last_attempt:
+                    raise
+                continue
+            finally:
+                endpoint.in_flight -= 1
+            ok = response.status_code not in RETRY_STATUSES
+            self.pool.record(endpoint, time.perf_counter() - start, ok)
+            if ok or last_attempt:
+                return _after_request_unparsed(response)
+
+    async def start_probing(self):
+        if not self._probing:
+            self._probing = asyncio.create_task(self._probe_loop())
+
+    async def close(self) -> None:
+        if self._probing:
+            self._probing.cancel()
+            self._probing = None
+        await super().close()
+
+    async def probe(self):
+        """Check every endpoint that isn't serving out an ejection with a getSlot"""
+        await asyncio.gather(*(self._probe(endpoint) for endpoint in self.pool.due_for_probe()))
+
+    async def _probe(self, endpoint: Endpoint):
+        start = time.perf_counter()
+        slot = None
+        try:
+            response = await self.session.post(
+                endpoint.url,
+                headers={"Content-Type": "application/json"},
+                content=json.dumps({"jsonrpc": "2.0", "id": 1, "method": "getSlot"}),
+                timeout=min(self.timeout, 5.0)
+            )
+            if response.status_code == 200:
+                slot = response.json().get("result")
+        except (httpx.HTTPError, ValueError):
+            pass
+        self.pool.record_probe(endpoint, time.perf_counter() - start, slot if isinstance(slot, int) else None)
+
+    async def _probe_loop(self):
+        while True:
+            try:
+                await self.probe()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"RPC endpoint probe failed: {e}")
+            await asyncio.sleep(self.probe_interval)
+
+
+class PooledAsyncClient(AsyncClient):
+    """An AsyncClient whose requests are routed across an EndpointPool"""
+
+    def __init__(
+        self,
+        pool: EndpointPool,
+        commitment: Optional[Commitment] = None,
+        timeout: float = 10,
+        probe_interval: float = 15.0
+    ):
+        # AsyncClient.__init__ would open an httpx session of its own that nothing closes
+        _ClientCore.__init__(self, commitment)
+        self.pool = pool
+        self._provider = PooledHTTPProvider(pool, timeout=timeout, probe_interval=probe_interval)
+
+    async def start_probing(self):
+        await self._provider.start_probing()
+
+
+@contextmanager
+def pinned(client: AsyncClient, url: Optional[str] = None) -> Iterator[Optional[str]]:
+    """Send this task's requests through client to a single endpoint, without failover.
+
+    Pins to url, or to the best endpoint if url is None, unknown or
+    ejected, and yields the URL used; tasks started inside inherit the
+    pin. For a plain AsyncClient there is only one node, so this is a
+    no-op yielding None.
+    """
+    if not isinstance(client, PooledAsyncClient):
+        yield None
+        return
+    endpoint = client.pool.get(url)
+    if endpoint is None or endpoint.ejected:
+        endpoint = client.pool.pick()
+    token = _PINNED.set(endpoint.url)
+    try:
+        yield endpoint.url
+    finally:
+        _PINNED.reset(token)
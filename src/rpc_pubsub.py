@@ -0,0 +1,252 @@
+import aiohttp
+import asyncio
+import itertools
+import json
+import logging
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from src.tasks import spawn
+
+Handler = Callable[[Any], None]
+# (method, params as canonical JSON)
+Key = Tuple[str, str]
+
+
+class RpcError(Exception):
+    pass
+
+
+class _Channel:
+    """One node-side subscription, shared by every caller that asked for the same thing"""
+
+    __slots__ = ("method", "params", "handlers", "node_id", "opening")
+
+    def __init__(self, method: str, params: list):
+        self.method = method
+        self.params = params
+        self.handlers: List[Handler] = []
+        self.node_id: Optional[int] = None
+        self.opening: Optional[asyncio.Task] = None
+
+
+class Subscription:
+    """A caller's share of a node subscription; close() it when done"""
+
+    def __init__(self, pubsub: "RpcPubSub", key: Key, handler: Handler):
+        self.pubsub = pubsub
+        self.key = key
+        self.handler = handler
+        self.closed = False
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            await self.pubsub._release(self)
+
+
+class RpcPubSub:
+    """JSON-RPC over one websocket to the Solana node, shared by every subscription.
+
+    Identical subscriptions (same method and params) are reference counted
+    onto a single node subscription; the last close() unsubscribes it. The
+    connection is kept open with jittered-backoff reconnects, and every
+    live subscription is re-established on the new connection. Updates
+    missed while disconnected are not replayed, so on_disconnect and
+    on_connect hooks let owners fall back to polling and catch up.
+    """
+
+    def __init__(self, url: str, request_timeout: float = 10.0):
+        self.url = url
+        self.request_timeout = request_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ids = itertools.count(1)
+        # Request id -> (reply future, channel to route to if the reply is a subscription id)
+        self._requests: Dict[int, Tuple[asyncio.Future, Optional[_Channel]]] = {}
+        self._channels: Dict[Key, _Channel] = {}
+        self._by_node_id: Dict[int, _Channel] = {}
+        self._on_connect: List[Callable[[], Awaitable[None]]] = []
+        self._on_disconnect: List[Callable[[], None]] = []
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None and not self._ws.closed
+
+    @property
+    def subscriptions(self) -> int:
+        """Node subscriptions currently wanted, after sharing"""
+        return len(self._channels)
+
+    def on_connect(self, hook: Callable[[], Awaitable[None]]):
+        self._on_connect.append(hook)
+
+    def on_disconnect(self, hook: Callable[[], None]):
+        self._on_disconnect.append(hook)
+
+    async def start(self):
+        if not self._task:
+            self._session = aiohttp.ClientSession()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def call(self, method: str, params: list, channel: Optional[_Channel] = None) -> Any:
+        if not self.connected:
+            raise ConnectionError("RPC websocket not connected")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._requests[request_id] = (future, channel)
+        try:
+            await self._ws.send_str(json.dumps({
+                "jsonrpc": "2.0", "id": request_id, "method": method, "params": params
+            }))
+            return await asyncio.wait_for(future, self.request_timeout)
+        finally:
+            self._requests.pop(request_id, None)
+
+    async def subscribe(self, method: str, params: list, handler: Handler) -> Subscription:
+        """Route notifications for (method, params) to handler.
+
+        Returns once the node has acknowledged the subscription, or at once
+        while disconnected, in which case it is made on the next connect.
+        """
+        key = (method, json.dumps(params, sort_keys=True))
+        channel = self._channels.get(key)
+        if channel is None:
+            channel = self._channels[key] = _Channel(method, params)
+        channel.handlers.append(handler)
+        subscription = Subscription(self, key, handler)
+        if channel.node_id is None and self.connected:
+            try:
+                await self._open(channel)
+            except RpcError:
+                await subscription.close()
+                raise
+            except (ConnectionError, asyncio.TimeoutError):
+                pass  # made again on reconnect
+        return subscription
+
+    def account_subscribe(self, pubkey: str, handler: Handler, commitment: str = "confirmed") -> Awaitable[Subscription]:
+        return self.subscribe("accountSubscribe", [pubkey, {"encoding": "base64", "commitment": commitment}], handler)
+
+    def logs_subscribe(self, mentions: str, handler: Handler, commitment: str = "confirmed") -> Awaitable[Subscription]:
+        return self.subscribe("logsSubscribe", [{"mentions": [mentions]}, {"commitment": commitment}], handler)
+
+    async def _open(self, channel: _Channel):
+        if channel.node_id is not None:
+            return
+        # Concurrent subscribers of a new key share one request
+        if channel.opening is None:
+            channel.opening = asyncio.create_task(self.call(channel.method, channel.params, channel))
+        task = channel.opening
+        try:
+            await asyncio.shield(task)
+        finally:
+            if channel.opening is task and task.done():
+                channel.opening = None
+        if not channel.handlers and channel.node_id is not None:
+            # Everyone left while the request was in flight
+            await self._close_channel(channel)
+
+    async def _release(self, subscription: Subscription):
+        channel = self._channels.get(subscription.key)
+        if channel is None:
+            return
+        try:
+            channel.handlers.remove(subscription.handler)
+        except ValueError:
+            return
+        if not channel.handlers:
+            del self._channels[subscription.key]
+            await self._close_channel(channel)
+
+    async def _close_channel(self, channel: _Channel):
+        node_id, channel.node_id = channel.node_id, None
+        if node_id is None:
+            return
+        self._by_node_id.pop(node_id, None)
+        if self.connected:
+            try:
+                await self.call(channel.method.replace("Subscribe", "Unsubscribe"), [node_id])
+            except (ConnectionError, RpcError, asyncio.TimeoutError):
+                pass  # e.g. signatureSubscribe already ended itself
+
+    async def _resubscribe(self):
+        results = await asyncio.gather(
+            *(self._open(channel) for channel in list(self._channels.values())),
+            return_exceptions=True
+        )
+        failed = [result for result in results if isinstance(result, Exception)]
+        if failed:
+            logging.warning(f"{len(failed)} RPC subscriptions not restored: {failed[0]!r}")
+
+    async def _run(self):
+        delay = 0.5
+        while True:
+            try:
+                async with self._session.ws_connect(self.url, heartbeat=30) as ws:
+                    self._ws = ws
+                    delay = 0.5
+                    spawn(self._resubscribe())
+                    for hook in self._on_connect:
+                        spawn(hook())
+                    await self._read(ws)
+            except asyncio.CancelledError:
+                raise
+            except (aiohttp.ClientError, OSError, ValueError) as e:
+                logging.warning(f"RPC websocket error: {e}")
+            finally:
+                was_connected = self._ws is not None
+                self._ws = None
+                self._by_node_id.clear()
+                for channel in self._channels.values():
+                    channel.node_id = None
+                for future, _ in self._requests.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError("RPC websocket closed"))
+                if was_connected:
+                    for hook in self._on_disconnect:
+                        try:
+                            hook()
+                        except Exception as e:
+                            logging.error(f"RPC disconnect hook error: {e}")
+            await asyncio.sleep(delay * (0.5 + random.random()))
+            delay = min(delay * 2, 30.0)
+
+    async def _read(self, ws: aiohttp.ClientWebSocketResponse):
+        async for frame in ws:
+            if frame.type != aiohttp.WSMsgType.TEXT:
+                break
+            message = json.loads(frame.data)
+            if "id" in message:
+                future, channel = self._requests.get(message["id"], (None, None))
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    future.set_exception(RpcError(message["error"].get("message", message["error"])))
+                    continue
+                if channel is not None:
+                    # Routed here, before any notification for it can be read
+                    channel.node_id = message["result"]
+                    self._by_node_id[channel.node_id] = channel
+                future.set_result(message["result"])
+            elif "params" in message:
+                channel = self._by_node_id.get(message["params"].get("subscription"))
+                if channel is None:
+                    continue
+                for handler in list(channel.handlers):
+                    try:
+                        handler(message["params"]["result"])
+                    except Exception as e:
+                        logging.error(f"RPC subscription handler error: {e}")
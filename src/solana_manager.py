@@ -1,18 +1,31 @@
+from solders.instruction import Instruction
 from solders.keypair import Keypair
+from solders.message import Message
 from solders.pubkey import Pubkey as PublicKey
+from solders.signature import Signature
 from solders.system_program import TransferParams, transfer
+from solders.transaction import Transaction
 from solana.rpc.async_api import AsyncClient
-from solana.transaction import Transaction
 from solana.rpc.commitment import Confirmed
-from solana.rpc.types import TxOpts
+from solana.rpc.core import RPCException
+from solana.rpc.types import DataSliceOpts, TxOpts
 from spl.token.async_client import AsyncToken
 from spl.token.constants import TOKEN_PROGRAM_ID
 from rich.console import Console
 from rich.panel import Panel
-from typing import Optional, Dict
+from typing import AsyncIterator, Callable, Iterable, List, Optional, Dict, Tuple
+from src.balance_cache import BalanceCache
+from src.balance_feed import BalanceFeed
+from src.blockhash import BlockhashService
 from src.client import SolanaClient
+from src.confirmation import CONFIRMED, ConfirmationTracker, TrackedSignature
+from src.outbox import NotificationOutbox
+from src.protocol import TransactionMessage
+from src.rpc_pool import EndpointPool, PooledAsyncClient, pinned
+from src.rpc_pubsub import RpcPubSub, Subscription
 import base58
 import json
+import logging
 import os
 import asyncio
 import hashlib
@@ -20,34 +33,106 @@ import base64
 
 console = Console()
 
+# getMultipleAccounts accepts at most this many addresses per call
+MAX_ACCOUNTS_PER_REQUEST = 100
+
+NETWORK_URLS = {
+    "devnet": "https://api.devnet.solana.com",
+    "testnet": "https://api.testnet.solana.com",
+    "mainnet": "https://api.mainnet-beta.solana.com"
+}
+
 class SolanaManager:
-    def __init__(self, network: str = "devnet"):
+    def __init__(self, network: str = "devnet", endpoints_path: str = "config/rpc_endpoints.json"):
         self.network = network
-        self.client = AsyncClient(self._get_network_url())
+        self.endpoints_path = endpoints_path
+        # Requests go to whichever configured endpoint is currently healthiest
+        self.rpc_pool = EndpointPool(self._get_network_urls())
+        self.client: AsyncClient = PooledAsyncClient(self.rpc_pool)
         self.keypair: Optional[Keypair] = None
         self.api_client = SolanaClient()
+        self.balance_cache = BalanceCache(self._fetch_balance)
+        # Refreshed in the background so signing doesn't wait for getLatestBlockhash
+        self.blockhash = BlockhashService(self.client)
+        # One websocket to the RPC node for every subscription
+        self.pubsub = RpcPubSub(self._get_ws_url())
+        self.balance_feed = BalanceFeed(self.pubsub, self.balance_cache, self.client)
+        # Called with the loaded wallet's balance in SOL, and with signatures of transactions touching it
+        self.balance_listeners: List[Callable[[float], None]] = []
+        self.activity_listeners: List[Callable[[str], None]] = []
+        self._balance_watch: Optional[Subscription] = None
+        self._logs_watch: Optional[Subscription] = None
+        # Rebroadcasts sent transactions until they confirm or their blockhash expires
+        self.confirmations = ConfirmationTracker(self.client, self.pubsub)
+        # Server notifications are queued locally and sent in the background
+        self.outbox = NotificationOutbox(self.api_client)
         self.onion_mode = False
         self.onion_address = None
         
     def _get_network_url(self) -> str:
-        networks = {
-            "devnet": "https://api.devnet.solana.com",
-            "testnet": "https://api.testnet.solana.com",
-            "mainnet": "https://api.mainnet-beta.solana.com"
-        }
-        return networks.get(self.network, networks["devnet"])
+        return NETWORK_URLS.get(self.network, NETWORK_URLS["devnet"])
+
+    def _get_network_urls(self) -> List[str]:
+        """The cluster's endpoints from the config file, e.g. {"devnet": [url, ...]}, then the public one"""
+        urls = []
+        try:
+            if os.path.exists(self.endpoints_path):
+                with open(self.endpoints_path) as f:
+                    urls = list(json.load(f).get(self.network, []))
+        except Exception as e:
+            logging.error(f"Error loading RPC endpoints: {e}")
+        return urls + [self._get_network_url()]
+
+    def _get_ws_url(self) -> str:
+        # Subscriptions stay on the preferred (first configured) endpoint
+        url = self.rpc_pool.endpoints[0].url
+        return "ws" + url[len("http"):] if url.startswith("http") else url
     
     async def initialize(self):
         """Initialize API client connection"""
         await self.api_client.connect()
+        await self.outbox.start()
+        await self.client.start_probing()
+        await self.blockhash.start()
+        await self.pubsub.start()
+        await self.confirmations.start()
 
     async def cleanup(self):
         """Cleanup API client connection"""
         await self.api_client.close()
     
+    async def _watch_wallet(self):
+        """Follow the loaded wallet's balance and activity over the RPC websocket"""
+        if self._balance_watch:
+            await self.balance_feed.unwatch(self._balance_watch)
+            self._balance_watch = None
+        if self._logs_watch:
+            await self._logs_watch.close()
+            self._logs_watch = None
+        if not self.keypair:
+            return
+        pubkey = str(self.keypair.pubkey())
+        try:
+            self._balance_watch = await self.balance_feed.watch(pubkey, self._on_wallet_balance)
+            self._logs_watch = await self.pubsub.logs_subscribe(pubkey, self._on_wallet_logs)
+        except Exception as e:
+            # Balances are still fetched on demand
+            console.print(f"[yellow]Live wallet updates unavailable: {str(e)}[/yellow]")
+
+    def _on_wallet_balance(self, pubkey: str, lamports: int):
+        for listener in self.balance_listeners:
+            listener(lamports / 1e9)
+
+    def _on_wallet_logs(self, result: dict):
+        value = result.get("value") or {}
+        if value.get("signature"):
+            for listener in self.activity_listeners:
+                listener(value["signature"])
+
     async def create_wallet(self) -> Dict:
         try:
             self.keypair = Keypair()
+            await self._watch_wallet()
             wallet_info = {
                 "public_key": str(self.keypair.pubkey()),
                 "private_key": base58.b58encode(bytes(self.keypair.secret())).decode("ascii"),
@@ -67,6 +152,7 @@ class SolanaManager:
         try:
             secret_key = base58.b58decode(private_key)
             self.keypair = Keypair.from_bytes(list(secret_key))
+            await self._watch_wallet()
             public_key = str(self.keypair.pubkey())
             self.onion_address = self.wallet_to_onion(public_key)
             console.print(f"[green]Wallet loaded successfully: {public_key}[/green]")
@@ -100,11 +186,15 @@ class SolanaManager:
             console.print(f"[red]Error saving wallet: {str(e)}[/red]")
             raise
     
-    async def get_balance(self, public_key: Optional[str] = None) -> float:
+    async def _fetch_balance(self, pubkey: str, commitment: str) -> int:
+        response = await self.client.get_balance(PublicKey.from_string(pubkey), commitment=commitment)
+        return response.value
+
+    async def get_balance(self, public_key: Optional[str] = None, refresh: bool = False) -> float:
         try:
             pubkey = PublicKey.from_string(public_key or str(self.keypair.pubkey()) if self.keypair else "")
-            response = await self.client.get_balance(pubkey, commitment=Confirmed)
-            return response.value / 1e9
+            lamports = await self.balance_cache.get(str(pubkey), Confirmed, refresh=refresh)
+            return lamports / 1e9
         except ValueError as ve:
             if "No public key provided" in str(ve):
                 console.print("[red]No public key provided and no wallet loaded.[/red]")
@@ -115,6 +205,70 @@ class SolanaManager:
             console.print(f"[red]Error getting balance: {str(e)}[/red]")
             raise
     
+    async def get_balances(
+        self,
+        public_keys: Iterable[str],
+        chunk_size: int = MAX_ACCOUNTS_PER_REQUEST,
+        concurrency: int = 4
+    ) -> AsyncIterator[Dict[str, Optional[float]]]:
+        """Balances for many addresses, yielded a chunk at a time as each RPC call returns.
+
+        Addresses go out in getMultipleAccounts calls of up to chunk_size,
+        at most `concurrency` at once. Invalid addresses, and those in a
+        chunk whose call failed, come back as None.
+        """
+        valid: List[PublicKey] = []
+        invalid: Dict[str, Optional[float]] = {}
+        for address in dict.fromkeys(public_keys):
+            try:
+                valid.append(PublicKey.from_string(address))
+            except ValueError:
+                invalid[address] = None
+        if invalid:
+            yield invalid
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_chunk(chunk: List[PublicKey]) -> Dict[str, Optional[float]]:
+            async with semaphore:
+                try:
+                    # Zero-length data slice: only lamports are needed, not account data
+                    response = await self.client.get_multiple_accounts(
+                        chunk, commitment=Confirmed, data_slice=DataSliceOpts(offset=0, length=0)
+                    )
+                except Exception as e:
+                    console.print(f"[red]Error getting balances for {len(chunk)} addresses: {str(e)}[/red]")
+                    return {str(pubkey): None for pubkey in chunk}
+            balances = {}
+            for pubkey, account in zip(chunk, response.value):
+                lamports = account.lamports if account else 0
+                self.balance_cache.set(str(pubkey), Confirmed, lamports)
+                balances[str(pubkey)] = lamports / 1e9
+            return balances
+
+        chunks = [valid[i:i + chunk_size] for i in range(0, len(valid), chunk_size)]
+        for next_done in asyncio.as_completed([fetch_chunk(chunk) for chunk in chunks]):
+            yield await next_done
+
+    async def build_transaction(self, instructions: List[Instruction]) -> Tuple[Transaction, int]:
+        """Sign with the wallet against the prefetched blockhash.
+
+        Returns the transaction and the last block height at which it can land.
+        """
+        blockhash, last_valid_block_height = await self.blockhash.get()
+        message = Message.new_with_blockhash(instructions, self.keypair.pubkey(), blockhash)
+        return Transaction([self.keypair], message, blockhash), last_valid_block_height
+
+    async def signature_seen(self, signature: Signature) -> bool:
+        """Whether any record of the signature exists, searching past the recent status cache"""
+        try:
+            response = await self.client.get_signature_statuses([signature], search_transaction_history=True)
+        except Exception as e:
+            # Can't rule it out, so treat it as possibly landed
+            logging.warning(f"Signature history check for {signature} failed: {e!r}")
+            return True
+        return response.value[0] is not None
+
     async def transfer_sol(self, to_pubkey: str, amount: float, phone_number: Optional[str] = None) -> str:
         try:
             if not self.keypair:
@@ -123,33 +277,40 @@ class SolanaManager:
             lamports = int(amount * 1e9)
             transfer_params = TransferParams(
                 from_pubkey=self.keypair.pubkey(),
-                to_pubkey=PublicKey(to_pubkey),
+                to_pubkey=PublicKey.from_string(to_pubkey),
                 lamports=lamports
             )
             transfer_ix = transfer(transfer_params)
             
-            recent_blockhash = (await self.client.get_recent_blockhash(Confirmed))["result"]["value"]["blockhash"]
-            
-            transaction = Transaction()
-            transaction.recent_blockhash = recent_blockhash
-            transaction.add(transfer_ix)
-            transaction.sign(self.keypair)
-            
             opts = TxOpts(skip_preflight=False)
-            result = await self.client.send_transaction(
-                transaction,
-                self.keypair,
-                opts=opts
-            )
+            # The send, and every later read about whether it landed, go to one node
+            with pinned(self.client) as endpoint:
+                transaction, last_valid_block_height = await self.build_transaction([transfer_ix])
+                try:
+                    result = await self.client.send_transaction(transaction, opts=opts)
+                except RPCException as e:
+                    if "Blockhash not found" not in str(e) or await self.signature_seen(transaction.signatures[0]):
+                        raise
+                    # Refused by preflight on the only node it was sent to; sign against a fresh blockhash
+                    self.blockhash.invalidate()
+                    transaction, last_valid_block_height = await self.build_transaction([transfer_ix])
+                    result = await self.client.send_transaction(transaction, opts=opts)
             
-            signature = result["result"]
+            signature = str(result.value)
+            self.balance_cache.invalidate(str(self.keypair.pubkey()))
+            self.balance_cache.invalidate(to_pubkey)
+            self.confirmations.track(
+                signature, bytes(transaction), last_valid_block_height,
+                callback=self._on_transfer_status(to_pubkey), endpoint=endpoint
+            )
             
-            await self.api_client.send_transaction(
+            # The transfer is done once it has a signature; the server hears about it later
+            await self.outbox.add(TransactionMessage(
                 str(self.keypair.pubkey()),
                 amount,
                 to_pubkey,
                 phone_number
-            )
+            ).to_dict())
             
             console.print(f"[green]Transaction sent! Signature: {signature}[/green]")
             if self.onion_mode:
@@ -160,6 +321,16 @@ class SolanaManager:
             console.print(f"[red]Error transferring SOL: {str(e)}[/red]")
             raise
 
+    def _on_transfer_status(self, to_pubkey: str):
+        sender = str(self.keypair.pubkey())
+
+        def on_status(tracked: TrackedSignature, status: str):
+            # Balances read between sending and confirming may predate the transfer
+            if status == CONFIRMED:
+                self.balance_cache.invalidate(sender)
+                self.balance_cache.invalidate(to_pubkey)
+        return on_status
+
     async def airdrop(self, amount: float = 1.0) -> bool:
         try:
             if not self.keypair:
@@ -175,12 +346,12 @@ class SolanaManager:
                 Confirmed
             )
             
-            if "result" in result:
-                console.print(f"[green]Airdrop successful! Signature: {result['result']}[/green]")
-                if self.onion_mode:
-                    console.print(f"[cyan]Airdrop routed through Onion Network: {self.onion_address}[/cyan]")
-                return True
-            return False
+            # RPC errors raise, so a response always carries the airdrop's signature
+            self.balance_cache.invalidate(str(self.keypair.pubkey()))
+            console.print(f"[green]Airdrop successful! Signature: {result.value}[/green]")
+            if self.onion_mode:
+                console.print(f"[cyan]Airdrop routed through Onion Network: {self.onion_address}[/cyan]")
+            return True
             
         except Exception as e:
             console.print(f"[red]Error requesting airdrop: {str(e)}[/red]")
@@ -199,6 +370,8 @@ class SolanaManager:
                 decimals,
                 TOKEN_PROGRAM_ID
             )
+            # Paid for the mint account and fees
+            self.balance_cache.invalidate(str(self.keypair.pubkey()))
             
             token_data = {
                 "name": name,
@@ -209,14 +382,14 @@ class SolanaManager:
             }
             
             # Notify server about token creation
-            await self.api_client.send_transaction(
+            await self.outbox.add(TransactionMessage(
                 str(self.keypair.pubkey()),
                 0,
                 str(self.keypair.pubkey()),
                 None,
-                transaction_type="token_creation",
+                type="token_creation",
                 metadata=token_data
-            )
+            ).to_dict())
             
             console.print(Panel(f"""
     [green]Token Created Successfully![/green]
@@ -234,5 +407,9 @@ class SolanaManager:
         # In solana_manager.py
     async def cleanup(self):
         """Cleanup API client connection"""
+        await self.confirmations.stop()
+        await self.pubsub.stop()
+        await self.blockhash.stop()
+        await self.outbox.stop()
         await self.api_client.close()
         await self.client.close()  # Close the AsyncClient if it's open
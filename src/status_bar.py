@@ -15,6 +15,23 @@ class StatusBar:
         self.active_contracts = 0
         self.wallet_balance = "0.00"
         self.network_status = "CONNECTED"
+        self.last_activity = "-"
+        self.last_update = datetime.now()
+        self.solana_manager = None
+        self._task = None
+
+    def attach(self, solana_manager):
+        """Show the loaded wallet's balance and activity as the RPC node pushes them"""
+        self.solana_manager = solana_manager
+        solana_manager.balance_listeners.append(self.set_balance)
+        solana_manager.activity_listeners.append(self.set_activity)
+
+    def set_balance(self, balance: float):
+        self.wallet_balance = f"{balance:.4f}"
+        self.last_update = datetime.now()
+
+    def set_activity(self, signature: str):
+        self.last_activity = f"{signature[:8]}...{signature[-8:]}"
         self.last_update = datetime.now()
 
     def create_status_panel(self) -> Panel:
@@ -25,15 +42,23 @@ class StatusBar:
 • Network: [green]{self.network_status}[/green]
 • Active Contracts: [cyan]{self.active_contracts}[/cyan]
 • Wallet Balance: [green]{self.wallet_balance} SOL[/green]
+• Last Activity: [cyan]{self.last_activity}[/cyan]
 • Last Update: [dim]{self.last_update.strftime('%H:%M:%S')}[/dim]"""
         
         return Panel(status_content, title="[bold cyan]ICA Terminal Status[/bold cyan]", border_style="cyan")
 
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.update_status())
+
     async def update_status(self):
         """Update system status information"""
         while True:
             self.cpu_percent = psutil.cpu_percent()
             self.memory_percent = psutil.virtual_memory().percent
+            if self.solana_manager:
+                # Without the websocket, balances are only as fresh as the last poll
+                self.network_status = "LIVE" if self.solana_manager.pubsub.connected else "POLLING"
             self.last_update = datetime.now()
             await asyncio.sleep(1)
 
@@ -43,11 +68,13 @@ class StatusBar:
         layout.update(self.create_status_panel())
         return layout
 
-async def create_status_bar():
+async def create_status_bar(solana_manager=None):
     """Create and return a new status bar instance"""
     status_bar = StatusBar()
+    if solana_manager:
+        status_bar.attach(solana_manager)
     # Start the update task in the background
-    asyncio.create_task(status_bar.update_status())
+    status_bar.start()
     return status_bar
 
 if __name__ == "__main__":
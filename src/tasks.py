@@ -0,0 +1,13 @@
+from typing import Coroutine, Set
+import asyncio
+
+# The event loop only keeps weak references to tasks; these are the strong ones
+_background: Set[asyncio.Task] = set()
+
+
+def spawn(coro: Coroutine) -> asyncio.Task:
+    """Run a coroutine in the background without it being garbage-collected mid-flight"""
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
@@ -0,0 +1,281 @@
+import aiohttp
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+# Called after every attempt with (method, path, status or None on error, seconds)
+TimingHook = Callable[[str, str, Optional[int], float], None]
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised without touching the network while the server is considered down"""
+
+
+class CircuitBreaker:
+    """Fails calls fast after repeated server failures.
+
+    Closed: calls go through. After failure_threshold consecutive failures
+    it opens and rejects calls for reset_timeout seconds, then lets a
+    single trial call through (half-open); its outcome closes or reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release(self):
+        """A call ended without saying anything about the server, e.g. it was cancelled"""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logging.warning(f"Notification server circuit opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+
+class Response:
+    """A fully read response, so retries and hedges never hold a connection"""
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class HttpTransport:
+    """Pooled HTTP calls to the notification server with deadlines, retries and a circuit breaker.
+
+    The timeout is a deadline for the whole call, retries included.
+    Idempotent calls are retried with jittered exponential backoff on
+    connection errors, timeouts and 429/502/503/504; with hedge_after set
+    they also race a second attempt if the first is slow.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 5.0,
+        connect_timeout: float = 2.0,
+        retries: int = 2,
+        backoff: float = 0.2,
+        hedge_after: Optional[float] = None,
+        limit_per_host: int = 20,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self.limit_per_host = limit_per_host
+        self.breaker = breaker or CircuitBreaker()
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.hooks: List[TimingHook] = []
+
+    async def start(self):
+        if self.session:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+            enable_cleanup_closed=True
+        )
+        # No session-wide total: long-lived WebSockets share this session
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout)
+        )
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def add_hook(self, hook: TimingHook):
+        self.hooks.append(hook)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None,
+        hedge: Optional[bool] = None,
+        **kwargs
+    ) -> Response:
+        """Make a call and return the response, whatever its status.
+
+        Raises CircuitOpenError while the breaker is open, and the last
+        error if every attempt failed before the deadline.
+        """
+        await self.start()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempts = self.retries + 1 if idempotent else 1
+        hedged = idempotent and self.hedge_after is not None and hedge is not False
+
+        for attempt in range(attempts):
+            remaining = deadline - loop.time()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"{method} {path} deadline exceeded")
+                if hedged:
+                    response = await self._hedged(method, path, remaining, kwargs)
+                else:
+                    response = await self._attempt(method, path, remaining, kwargs)
+            except CircuitOpenError:
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+                if attempt == attempts - 1 or not await self._wait_to_retry(attempt, deadline):
+                    raise
+                continue
+
+            if response.status not in RETRY_STATUSES or attempt == attempts - 1:
+                return response
+            if not await self._wait_to_retry(attempt, deadline, response.headers.get("Retry-After")):
+                return response
+
+    @asynccontextmanager
+    async def stream(
+        self, method: str, path: str, timeout: Optional[float] = None, **kwargs
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """A single attempt whose body is read incrementally by the caller"""
+        await self.start()
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Notification server unavailable, not calling {path}")
+        start = time.perf_counter()
+        status = None
+        try:
+            async with self.session.request(
+                method, self.base_url + path,
+                timeout=aiohttp.ClientTimeout(total=timeout or self.timeout),
+                **kwargs
+            ) as response:
+                status = response.status
+                yield response
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        finally:
+            self._record(method, path, status, time.perf_counter() - start)
+        if status is not None and status >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    async def _attempt(self, method: str, path: str, timeout: float, kwargs: Dict[str, Any]) -> Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Notification server unavailable, not calling {path}")
+        start = time.perf_counter()
+        status = None
+        try:
+            async with self.session.request(
+                method, self.base_url + path, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs
+            ) as response:
+                status = response.status
+                body = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # A hedge that lost the race says nothing about the server's health
+            self.breaker.release()
+            raise
+        finally:
+            self._record(method, path, status, time.perf_counter() - start)
+        if status >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return Response(status, dict(response.headers), body)
+
+    async def _hedged(self, method: str, path: str, timeout: float, kwargs: Dict[str, Any]) -> Response:
+        """Start a second attempt if the first hasn't answered after hedge_after; first success wins"""
+        if timeout <= self.hedge_after:
+            return await self._attempt(method, path, timeout, kwargs)
+        first = asyncio.create_task(self._attempt(method, path, timeout, kwargs))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+        if done:
+            return first.result()
+        tasks = {first, asyncio.create_task(self._attempt(method, path, timeout - self.hedge_after, kwargs))}
+        try:
+            error: Optional[BaseException] = None
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    return await next_done
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                    error = e
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _wait_to_retry(self, attempt: int, deadline: float, retry_after: Optional[str] = None) -> bool:
+        """Back off before the next attempt; False if it wouldn't start before the deadline"""
+        delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        remaining = deadline - asyncio.get_running_loop().time()
+        if delay >= remaining:
+            return False
+        await asyncio.sleep(delay)
+        return True
+
+    def _record(self, method: str, path: str, status: Optional[int], elapsed: float):
+        for hook in self.hooks:
+            try:
+                hook(method, path, status, elapsed)
+            except Exception as e:
+                logging.error(f"Transport hook error: {e}")
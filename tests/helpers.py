@@ -0,0 +1,121 @@
+from aiohttp import web
+from typing import Any, Dict, List, Optional, Set
+import asyncio
+import json
+import socket
+
+from src.protocol import JSON, codec_for_content_type
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def eventually(condition, timeout: float = 3.0):
+    """Wait for condition() to become true, failing the test after timeout seconds"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition never became true")
+        await asyncio.sleep(0.01)
+
+
+class FakeApiServer:
+    """The notification endpoints of the server, recording what it receives"""
+
+    def __init__(self):
+        self.port = free_port()
+        self.posts: List[Dict[str, Any]] = []
+        self.notifies: List[Dict[str, Any]] = []
+        self.batches: List[List[Dict[str, Any]]] = []
+        # Drop the connection after streaming this many batch results, once
+        self.cut_batch_after: Optional[int] = None
+        # Sent to every WebSocket client as it connects
+        self.greeting: List[Any] = []
+        # Answer notify frames; off, as if the server died mid-request
+        self.reply_to_notify = True
+        # Status codes and delays for the next POST /transaction or GET /transactions calls
+        self.statuses: List[int] = []
+        self.delays: List[float] = []
+        self.delay = 0.0
+        self.requests = 0
+        self._sockets: Set[web.WebSocketResponse] = set()
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/transaction", self._transaction)
+        app.router.add_get("/transactions", self._history)
+        app.router.add_post("/transactions/batch", self._batch)
+        app.router.add_get("/ws/{client_id}", self._websocket)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+
+    async def disconnect(self):
+        """Close every WebSocket, as a server restart would"""
+        for ws in list(self._sockets):
+            await ws.close()
+
+    async def stop(self):
+        await self.disconnect()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _transaction(self, request: web.Request) -> web.Response:
+        self.posts.append(await request.json())
+        return await self._respond({})
+
+    async def _history(self, request: web.Request) -> web.Response:
+        return await self._respond({"transactions": self.posts, "next_cursor": None})
+
+    async def _respond(self, body: Dict[str, Any]) -> web.Response:
+        self.requests += 1
+        delay = self.delays.pop(0) if self.delays else self.delay
+        if delay:
+            await asyncio.sleep(delay)
+        status = self.statuses.pop(0) if self.statuses else 200
+        body = {"status": "success" if status == 200 else "error", **body}
+        return web.json_response(body, status=status, headers={"Retry-After": "0"} if status == 429 else None)
+
+    async def _batch(self, request: web.Request) -> web.StreamResponse:
+        records = codec_for_content_type(request.content_type).decode(await request.read())
+        self.batches.append(records)
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        for index, record in enumerate(records):
+            if index == self.cut_batch_after:
+                self.cut_batch_after = None
+                request.transport.close()
+                return response
+            status = "success" if record.get("amount", 0) > 0 else "error"
+            await response.write(json.dumps({"index": index, "status": status}).encode() + b"\n")
+        await response.write_eof()
+        return response
+
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(protocols=(JSON.subprotocol,))
+        await ws.prepare(request)
+        self._sockets.add(ws)
+        try:
+            for message in self.greeting:
+                await ws.send_str(json.dumps(message))
+            async for frame in ws:
+                message = json.loads(frame.data)
+                if message.get("type") != "notify":
+                    continue
+                self.notifies.append(message)
+                if self.reply_to_notify:
+                    await ws.send_str(json.dumps({
+                        "type": "notify_result", "request_id": message["request_id"], "status": "success"
+                    }))
+        finally:
+            self._sockets.discard(ws)
+        return ws
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The server imports its modules by bare name, as when run from server/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "server")))
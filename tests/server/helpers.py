@@ -0,0 +1,15 @@
+import json
+
+
+class FakeWebSocket:
+    """What the broadcaster needs from a Starlette WebSocket, recording the frames sent"""
+
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    async def send_text(self, frame: str):
+        self.sent.append(json.loads(frame))
+
+    async def close(self):
+        self.closed = True
@@ -0,0 +1,197 @@
+from typing import Dict, Optional
+import aiohttp
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+directory = tempfile.TemporaryDirectory()
+os.environ.update({
+    "SMS_TRANSPORT": "fake",
+    "EVENT_LOG_PATH": os.path.join(directory.name, "events.log"),
+    "JOURNAL_PATH": os.path.join(directory.name, "transactions.db"),
+})
+
+import main
+import uvicorn
+
+from tests.helpers import free_port
+
+# main keeps its queues and tasks at module level, so every test shares one loop and one server
+runner: asyncio.Runner
+server: uvicorn.Server
+serving: asyncio.Task
+URL = ""
+
+
+def setUpModule():
+    global runner
+    runner = asyncio.Runner()
+    runner.run(start_server())
+
+
+def tearDownModule():
+    runner.run(stop_server())
+    runner.close()
+    directory.cleanup()
+
+
+async def start_server():
+    global server, serving, URL
+    port = free_port()
+    URL = f"http://127.0.0.1:{port}"
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+
+async def stop_server():
+    server.should_exit = True
+    await serving
+
+
+def transfer(amount: float = 1.0, wallet: str = "wallet") -> dict:
+    return {"wallet_address": wallet, "amount": amount, "recipient": "recipient", "phone_number": None}
+
+
+class ApiTest(unittest.TestCase):
+    def setUp(self):
+        # Fresh limits for every test
+        main.rate_limiter.limiters.clear()
+        self.session = self.run_async(self._session())
+
+    def tearDown(self):
+        self.run_async(self.session.close())
+
+    @staticmethod
+    async def _session() -> aiohttp.ClientSession:
+        return aiohttp.ClientSession()
+
+    def run_async(self, coro):
+        return runner.run(coro)
+
+    async def post(self, amount: float, wallet: str = "wallet"):
+        async with self.session.post(f"{URL}/transaction", json=transfer(amount, wallet)) as response:
+            self.assertEqual(response.status, 200)
+
+
+class RequestTimingTest(ApiTest):
+    def timing(self, method: str, route: str, status: int):
+        return main.HTTP_REQUEST_SECONDS.labels(method, route, status)
+
+    def test_labels_by_route_template(self):
+        async def check():
+            count = self.timing("POST", "/transaction", 200).count
+            unmatched = self.timing("GET", "unmatched", 404).count
+            await self.post(1)
+            async with self.session.get(f"{URL}/transaction/no-such-route") as response:
+                self.assertEqual(response.status, 404)
+            self.assertEqual(self.timing("POST", "/transaction", 200).count, count + 1)
+            self.assertEqual(self.timing("GET", "unmatched", 404).count, unmatched + 1)
+
+        self.run_async(check())
+
+    def test_batch_is_timed_to_the_end_of_its_stream(self):
+        async def slow_results(records):
+            yield "{}\n"
+            await asyncio.sleep(0.2)
+            yield "{}\n"
+
+        async def check():
+            timing = self.timing("POST", "/transactions/batch", 200)
+            total = timing.sum
+            original, main.process_batch = main.process_batch, slow_results
+            try:
+                async with self.session.post(f"{URL}/transactions/batch", json=[transfer()]) as response:
+                    await response.read()
+            finally:
+                main.process_batch = original
+            self.assertGreaterEqual(timing.sum - total, 0.2)
+
+        self.run_async(check())
+
+    def test_other_routes_are_not_timed(self):
+        async def check():
+            async with self.session.get(f"{URL}/metrics") as response:
+                self.assertNotIn('route="/metrics"', await response.text())
+
+        self.run_async(check())
+
+
+class SseTest(ApiTest):
+    async def open(self, query: str = "", headers: Optional[Dict[str, str]] = None) -> aiohttp.ClientResponse:
+        response = await self.session.get(f"{URL}/events{query}", headers=headers)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.headers["Content-Type"].split(";")[0], "text/event-stream")
+        # Registered once the stream has started; wait for that before publishing
+        await asyncio.sleep(0.05)
+        return response
+
+    async def next_event(self, response: aiohttp.ClientResponse):
+        """(id, data) of the next event, skipping keepalive comments"""
+        event_id, data = None, None
+        while True:
+            line = (await asyncio.wait_for(response.content.readline(), 2)).decode().rstrip("\n")
+            if line.startswith("id: "):
+                event_id = int(line[4:])
+            elif line.startswith("data: "):
+                data = json.loads(line[6:])
+            elif not line and data is not None:
+                return event_id, data
+
+    def test_streams_only_subscribed_wallets(self):
+        async def check():
+            response = await self.open("?wallets=wallet")
+            await self.post(1, wallet="someone-else")
+            await self.post(2)
+            event_id, event = await self.next_event(response)
+            self.assertEqual(event["data"]["amount"], 2)
+            self.assertEqual(event_id, event["seq"])
+            response.close()
+
+        self.run_async(check())
+
+    def test_resumes_after_last_event_id(self):
+        async def check():
+            await self.post(1)
+            first = main.event_log.last_seq
+            await self.post(2)
+            await self.post(3)
+            response = await self.open("?wallets=wallet", headers={"Last-Event-ID": str(first)})
+            replayed = [await self.next_event(response) for _ in range(2)]
+            self.assertEqual([event_id for event_id, _ in replayed], [first + 1, first + 2])
+            self.assertEqual([event["data"]["amount"] for _, event in replayed], [2, 3])
+
+            # Live events follow the replay
+            await self.post(4)
+            _, event = await self.next_event(response)
+            self.assertEqual(event["data"]["amount"], 4)
+            response.close()
+
+        self.run_async(check())
+
+    def test_bad_last_event_id_is_rejected(self):
+        async def check():
+            async with self.session.get(f"{URL}/events", headers={"Last-Event-ID": "soon"}) as response:
+                self.assertEqual(response.status, 400)
+
+        self.run_async(check())
+
+    def test_closed_stream_is_unregistered(self):
+        async def check():
+            response = await self.open("?client_id=leaving")
+            self.assertIn("sse:leaving", main.broadcaster.connections)
+            response.close()
+            for _ in range(100):
+                if "sse:leaving" not in main.broadcaster.connections:
+                    return
+                await asyncio.sleep(0.01)
+            self.fail("SSE connection still registered after the client left")
+
+        self.run_async(check())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import asyncio
+import unittest
+
+from broadcaster import Broadcaster, event_topic, wallet_topic
+from tests.server.helpers import FakeWebSocket
+
+
+class BroadcasterTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.broadcaster = Broadcaster()
+
+    async def asyncTearDown(self):
+        for conn in list(self.broadcaster.connections.values()):
+            self.broadcaster.unregister(conn)
+
+    def register(self, client_id: str, firehose: bool = True):
+        return self.broadcaster.register(client_id, FakeWebSocket(), firehose=firehose)
+
+    async def test_unsubscribed_clients_get_everything(self):
+        conn = self.register("a")
+        topics = [wallet_topic("w"), event_topic("transfer")]
+        self.assertTrue(self.broadcaster.wants(conn, topics))
+        self.assertEqual(self.broadcaster.publish({"type": "x"}, topics), 1)
+        await asyncio.sleep(0.01)
+        self.assertEqual(conn.websocket.sent, [{"type": "x"}])
+
+    async def test_subscribed_clients_get_only_their_topics(self):
+        conn = self.register("a")
+        self.broadcaster.subscribe(conn, [wallet_topic("w")])
+        self.assertTrue(self.broadcaster.wants(conn, [wallet_topic("w")]))
+        self.assertFalse(self.broadcaster.wants(conn, [wallet_topic("other")]))
+        self.assertEqual(self.broadcaster.publish({"type": "x"}, [wallet_topic("other")]), 0)
+
+    async def test_wants_agrees_with_routing_without_firehose(self):
+        conn = self.register("a", firehose=False)
+        topics = [wallet_topic("w")]
+        self.assertFalse(self.broadcaster.wants(conn, topics))
+        self.assertNotIn(conn, self.broadcaster.recipients(topics))
+
+        self.broadcaster.subscribe(conn, topics)
+        self.assertTrue(self.broadcaster.wants(conn, topics))
+        self.assertIn(conn, self.broadcaster.recipients(topics))
+
+        # Back to no subscriptions: still nothing, as it never asked for the firehose
+        self.broadcaster.unsubscribe(conn, topics)
+        self.assertFalse(self.broadcaster.wants(conn, topics))
+        self.assertNotIn(conn, self.broadcaster.recipients(topics))
+
+    async def test_unregister_closes_the_socket(self):
+        conn = self.register("a")
+        self.broadcaster.unregister(conn)
+        await asyncio.sleep(0)
+        self.assertTrue(conn.websocket.closed)
+        self.assertNotIn("a", self.broadcaster.connections)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+
+from event_log import EventLog, _seek_after
+
+
+def events(count: int):
+    return [({"type": "new_transaction", "n": i}, [f"wallet:{i}"]) for i in range(count)]
+
+
+class EventLogDiskTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "events.log")
+        self.log = EventLog(self.path)
+        # Seqs 1-5 end up in the previous segment, 6-10 in the current one
+        self.log.stamp(events(5))
+        self.log.max_segment_bytes = 1
+        self.log.stamp(events(5))
+        self.log.max_segment_bytes = 64 * 1024 * 1024
+        self.log.close()
+
+    def tearDown(self):
+        self.log.close()
+        self.directory.cleanup()
+
+    def seqs(self, after_seq: int, until_seq: int):
+        return [seq for seq, _, _ in self.log.read_from_disk(after_seq, until_seq)]
+
+    def test_segments_are_split(self):
+        with open(f"{self.path}.1", "rb") as f:
+            self.assertEqual([json.loads(line)["seq"] for line in f], [1, 2, 3, 4, 5])
+
+    def test_reads_across_both_segments(self):
+        self.assertEqual(self.seqs(0, 10), list(range(1, 11)))
+        self.assertEqual(self.seqs(3, 8), [4, 5, 6, 7, 8])
+
+    def test_after_seq_boundaries(self):
+        # The last seq of the previous segment, the first of the current one, and the very last
+        self.assertEqual(self.seqs(5, 10), [6, 7, 8, 9, 10])
+        self.assertEqual(self.seqs(6, 10), [7, 8, 9, 10])
+        self.assertEqual(self.seqs(9, 10), [10])
+        self.assertEqual(self.seqs(10, 10), [])
+        self.assertEqual(self.seqs(4, 4), [])
+        self.assertEqual(self.seqs(4, 5), [5])
+
+    def test_seek_lands_on_the_first_line_past_after_seq(self):
+        for path, seqs in ((f"{self.path}.1", range(1, 6)), (self.path, range(6, 11))):
+            with open(path, "rb") as f:
+                for after_seq in range(0, 12):
+                    _seek_after(f, after_seq)
+                    line = f.readline()
+                    expected = next((seq for seq in seqs if seq > after_seq), None)
+                    self.assertEqual(json.loads(line)["seq"] if line else None, expected, (path, after_seq))
+
+    def test_torn_tail(self):
+        with open(self.path, "ab") as f:
+            f.write(b'{"seq": 11, "event": {"ty')
+        # Complete lines before the tear still seek and read normally
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(self.seqs(7, 10), [8, 9, 10])
+        with open(self.path, "rb") as f:
+            _seek_after(f, 10)
+            self.assertEqual(f.readline(), b'{"seq": 11, "event": {"ty')
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(self.seqs(10, 11), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
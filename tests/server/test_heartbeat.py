@@ -0,0 +1,68 @@
+import asyncio
+import time
+import unittest
+
+from broadcaster import Broadcaster
+from heartbeat import WS_REAPED, HeartbeatMonitor, TimerWheel
+from tests.server.helpers import FakeWebSocket
+
+
+class TimerWheelTest(unittest.TestCase):
+    def test_items_fire_on_their_tick(self):
+        wheel = TimerWheel(tick=1, slots=5)
+        wheel.schedule("a", 1)
+        wheel.schedule("b", 2.5)
+        self.assertEqual(wheel.advance(), {"a"})
+        self.assertEqual(wheel.advance(), set())
+        self.assertEqual(wheel.advance(), {"b"})
+
+    def test_delays_are_capped_at_one_revolution(self):
+        wheel = TimerWheel(tick=1, slots=3)
+        wheel.schedule("a", 100)
+        self.assertEqual([wheel.advance(), wheel.advance()], [set(), {"a"}])
+
+
+class HeartbeatMonitorTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.broadcaster = Broadcaster()
+        self.monitor = HeartbeatMonitor(self.broadcaster, ping_interval=0.1, idle_timeout=0.25, tick=0.02)
+        await self.monitor.start()
+
+    async def asyncTearDown(self):
+        await self.monitor.stop()
+        for conn in list(self.broadcaster.connections.values()):
+            self.broadcaster.unregister(conn)
+
+    def connect(self, client_id: str):
+        conn = self.broadcaster.register(client_id, FakeWebSocket())
+        self.monitor.track(conn)
+        return conn
+
+    async def test_quiet_client_is_pinged_then_reaped(self):
+        reaped = WS_REAPED.value
+        conn = self.connect("quiet")
+        await asyncio.sleep(0.15)
+        self.assertEqual([frame["type"] for frame in conn.websocket.sent], ["ping"])
+        self.assertFalse(conn.closed)
+
+        await asyncio.sleep(0.2)
+        self.assertTrue(conn.closed)
+        self.assertNotIn("quiet", self.broadcaster.connections)
+        self.assertEqual(WS_REAPED.value, reaped + 1)
+
+    async def test_active_client_is_left_alone(self):
+        conn = self.connect("active")
+        for _ in range(8):
+            await asyncio.sleep(0.05)
+            conn.last_seen = time.monotonic()
+        self.assertFalse(conn.closed)
+        self.assertEqual(conn.websocket.sent, [])
+
+    async def test_disabled_when_both_intervals_are_zero(self):
+        monitor = HeartbeatMonitor(self.broadcaster, ping_interval=0, idle_timeout=0)
+        await monitor.start()
+        self.assertIsNone(monitor._task)
+
+
+if __name__ == "__main__":
+    unittest.main()
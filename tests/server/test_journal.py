@@ -0,0 +1,80 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from journal import TransactionJournal
+
+
+class TransactionJournalTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = TransactionJournal(os.path.join(self.directory.name, "transactions.db"))
+        await self.journal.start()
+
+    async def asyncTearDown(self):
+        await self.journal.stop()
+        self.directory.cleanup()
+
+    async def test_pages_newest_first(self):
+        for amount in range(5):
+            self.journal.append("a", "b", amount, "transfer")
+        await self.journal.queue.join()
+
+        rows, cursor = await self.journal.query(limit=3)
+        self.assertEqual([row["amount"] for row in rows], [4, 3, 2])
+        rows, cursor = await self.journal.query(cursor=cursor, limit=3)
+        self.assertEqual([row["amount"] for row in rows], [1, 0])
+        self.assertIsNone(cursor)
+
+    async def test_wallet_matches_sender_or_recipient(self):
+        self.journal.append("a", "b", 1, "transfer")
+        self.journal.append("c", "a", 2, "transfer", {"memo": "x"})
+        self.journal.append("c", "d", 3, "transfer")
+        await self.journal.queue.join()
+
+        rows, _ = await self.journal.query("a")
+        self.assertEqual([row["amount"] for row in rows], [2, 1])
+        self.assertEqual(rows[0]["metadata"], {"memo": "x"})
+
+    async def test_stop_flushes_the_queue(self):
+        for amount in range(3):
+            self.journal.append("a", "b", amount, "transfer")
+        await self.journal.stop()
+        await self.journal.start()
+        rows, _ = await self.journal.query()
+        self.assertEqual(len(rows), 3)
+
+    async def test_stop_gives_up_on_a_stuck_writer_and_logs_what_is_left(self):
+        release = threading.Event()
+        insert = self.journal._insert
+
+        def stuck_insert(rows):
+            release.wait(5)
+            insert(rows)
+
+        self.journal._insert = stuck_insert
+        self.journal.append("a", "b", 1, "transfer")
+        await asyncio.sleep(0.05)
+        self.journal.append("a", "b", 2, "transfer")
+
+        started = time.monotonic()
+        with self.assertLogs(level="ERROR") as logs:
+            stopping = self.journal.stop(timeout=0.1)
+            threading.Timer(0.3, release.set).start()
+            await stopping
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertIn("1 transactions unwritten", logs.output[0])
+        self.assertIn('"a", "b", 2, "transfer"', logs.output[1])
+        self.assertEqual(self.journal.queue.qsize(), 0)
+
+        # The row the writer was holding still made it
+        await self.journal.start()
+        rows, _ = await self.journal.query()
+        self.assertEqual([row["amount"] for row in rows], [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
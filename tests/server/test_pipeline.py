@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+
+from pipeline import MESSAGE_SECONDS, MessagePipeline
+
+
+class MessagePipelineTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.replies = []
+        self.started = []
+
+    async def reply(self, response: dict):
+        self.replies.append(response)
+
+    async def handler(self, data: dict):
+        self.started.append(data["n"])
+        await asyncio.sleep(data.get("delay", 0))
+        if data.get("fail"):
+            raise ValueError("bad message")
+        return {"type": "done", "n": data["n"]}
+
+    def pipeline(self, **kwargs) -> MessagePipeline:
+        pipeline = MessagePipeline(self.handler, self.reply, **kwargs)
+        self.addCleanup(pipeline.cancel)
+        return pipeline
+
+    async def drain(self, count: int):
+        while len(self.replies) < count:
+            await asyncio.sleep(0.01)
+
+    async def test_unkeyed_messages_run_concurrently_and_reply_by_request_id(self):
+        pipeline = self.pipeline()
+        await pipeline.submit({"n": 1, "delay": 0.1, "request_id": "a"})
+        await pipeline.submit({"n": 2, "request_id": "b"})
+        await self.drain(2)
+        self.assertEqual(
+            [(r["n"], r["request_id"]) for r in self.replies], [(2, "b"), (1, "a")]
+        )
+
+    async def test_same_key_runs_in_arrival_order(self):
+        pipeline = self.pipeline()
+        await pipeline.submit({"n": 1, "delay": 0.1}, key="wallet")
+        await pipeline.submit({"n": 2}, key="wallet")
+        await pipeline.submit({"n": 3}, key="other")
+        await self.drain(3)
+        self.assertEqual([r["n"] for r in self.replies], [3, 1, 2])
+
+    async def test_submit_waits_while_full(self):
+        pipeline = self.pipeline(max_in_flight=2)
+        await pipeline.submit({"n": 1, "delay": 0.1})
+        await pipeline.submit({"n": 2, "delay": 0.1})
+        third = asyncio.create_task(pipeline.submit({"n": 3}))
+        await asyncio.sleep(0.05)
+        self.assertFalse(third.done())
+        await third
+        await self.drain(3)
+        self.assertEqual(len(self.replies), 3)
+
+    async def test_handler_error_becomes_an_error_reply(self):
+        pipeline = self.pipeline()
+        with self.assertLogs(level="ERROR"):
+            await pipeline.submit({"n": 1, "fail": True, "request_id": "a"})
+            await self.drain(1)
+        self.assertEqual(self.replies, [{"type": "error", "message": "bad message", "request_id": "a"}])
+
+    async def test_unknown_types_share_one_timing_label(self):
+        pipeline = self.pipeline(message_types=("notify",))
+        known = MESSAGE_SECONDS.labels("notify").count
+        other = MESSAGE_SECONDS.labels("other").count
+        for message_type in ("notify", "made-up", 42):
+            await pipeline.submit({"n": 1, "type": message_type})
+        await self.drain(3)
+        self.assertEqual(MESSAGE_SECONDS.labels("notify").count, known + 1)
+        self.assertEqual(MESSAGE_SECONDS.labels("other").count, other + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
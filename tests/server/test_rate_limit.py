@@ -0,0 +1,82 @@
+from unittest import mock
+import unittest
+
+from rate_limit import RateLimiter, TokenBucketLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TokenBucketLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("rate_limit.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.limiter = TokenBucketLimiter(rate=1, burst=2)
+
+    def test_burst_then_rate(self):
+        for _ in range(2):
+            self.assertEqual(self.limiter.wait_time("a"), 0)
+            self.limiter.consume("a")
+        self.assertEqual(self.limiter.wait_time("a"), 1)
+        self.clock.now += 1
+        self.assertEqual(self.limiter.wait_time("a"), 0)
+
+    def test_cost_over_burst_is_admitted_when_full_and_leaves_debt(self):
+        self.assertEqual(self.limiter.wait_time("a", 10), 0)
+        self.limiter.consume("a", 10)
+        self.assertEqual(self.limiter.wait_time("a"), 9)
+
+    def test_debt_survives_idle_eviction(self):
+        self.limiter.consume("a", 10)
+        # Long enough for a bucket that started full and empty to refill, not to pay off the debt
+        self.clock.now += 3
+        for key in ("b", "c", "d"):
+            self.limiter.consume(key)
+        self.assertEqual(self.limiter.wait_time("a"), 6)
+
+        self.assertEqual(len(self.limiter), 4)
+
+        # Paid off: the next calls evict it along with the other idle buckets
+        self.clock.now += 9
+        self.limiter.consume("e")
+        self.limiter.consume("e")
+        self.assertEqual(len(self.limiter), 1)
+        self.assertEqual(self.limiter.wait_time("a"), 0)
+
+    def test_free_check_of_a_full_bucket(self):
+        # A full bucket is evicted as soon as it is touched, leaving nothing to evict next
+        self.limiter.consume("a", 0)
+        self.limiter.consume("a", 0)
+        self.assertEqual(len(self.limiter), 0)
+        self.assertEqual(self.limiter.wait_time("a", 2), 0)
+
+    def test_over_max_keys_evicts_the_oldest(self):
+        limiter = TokenBucketLimiter(rate=1, burst=2, max_keys=2)
+        for key in ("a", "b", "c"):
+            limiter.consume(key, 10)
+        self.assertEqual(len(limiter), 2)
+        self.assertEqual(limiter.wait_time("a"), 0)
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_rejected_request_consumes_from_no_key(self):
+        limiter = RateLimiter({"transaction": "1/1"})
+        self.assertEqual(limiter.check("transaction", ["client", "wallet"]), 0)
+        self.assertGreater(limiter.check("transaction", ["other", "wallet"]), 0)
+        self.assertEqual(limiter.check("transaction", ["other"]), 0)
+
+    def test_unlisted_route_is_unlimited(self):
+        limiter = RateLimiter({"transaction": "1/1"})
+        for _ in range(5):
+            self.assertEqual(limiter.check("events", ["client"]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
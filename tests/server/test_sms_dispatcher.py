@@ -0,0 +1,86 @@
+import asyncio
+import unittest
+
+from sms_dispatcher import SMS_FAILED, SMS_REJECTED, SMS_SENT, FakeSmsTransport, SmsDispatcher
+
+
+class SmsDispatcherTest(unittest.IsolatedAsyncioTestCase):
+    async def dispatcher(self, transport: FakeSmsTransport, **kwargs) -> SmsDispatcher:
+        options = {"coalesce_window": 0.1, "backoff": 0.01, **kwargs}
+        dispatcher = SmsDispatcher(transport, **options)
+        await dispatcher.start()
+        self.addAsyncCleanup(dispatcher.stop)
+        return dispatcher
+
+    async def test_burst_for_one_number_goes_out_as_one_digest(self):
+        transport = FakeSmsTransport()
+        dispatcher = await self.dispatcher(transport)
+        for i in range(3):
+            self.assertTrue(dispatcher.enqueue("+1555", f"payment {i}"))
+        dispatcher.enqueue("+1666", "hello")
+        await dispatcher.queue.join()
+
+        self.assertEqual(sorted(transport.sent), [
+            ("+1555", "3 new notifications:\npayment 0\npayment 1\npayment 2"),
+            ("+1666", "hello"),
+        ])
+
+    async def test_long_digest_is_truncated(self):
+        transport = FakeSmsTransport()
+        dispatcher = await self.dispatcher(transport, max_digest_lines=2)
+        for i in range(5):
+            dispatcher.enqueue("+1555", f"payment {i}")
+        await dispatcher.queue.join()
+
+        self.assertEqual(transport.sent, [("+1555", "5 new notifications:\npayment 0\npayment 1\n...and 3 more")])
+
+    async def test_message_after_a_digest_went_out_starts_a_new_one(self):
+        transport = FakeSmsTransport()
+        dispatcher = await self.dispatcher(transport)
+        dispatcher.enqueue("+1555", "first")
+        await dispatcher.queue.join()
+        dispatcher.enqueue("+1555", "second")
+        await dispatcher.queue.join()
+
+        self.assertEqual(transport.sent, [("+1555", "first"), ("+1555", "second")])
+
+    async def test_transient_failures_are_retried(self):
+        transport = FakeSmsTransport(fail_times=2)
+        dispatcher = await self.dispatcher(transport, max_retries=3)
+        sent = SMS_SENT.value
+        dispatcher.enqueue("+1555", "payment")
+        await dispatcher.queue.join()
+
+        self.assertEqual(transport.sent, [("+1555", "payment")])
+        self.assertEqual(SMS_SENT.value, sent + 1)
+
+    async def test_message_is_dropped_after_the_last_retry(self):
+        transport = FakeSmsTransport(fail_times=10)
+        dispatcher = await self.dispatcher(transport, max_retries=2)
+        failed = SMS_FAILED.value
+        dispatcher.enqueue("+1555", "payment")
+        await dispatcher.queue.join()
+
+        self.assertEqual(transport.sent, [])
+        # One try and two retries
+        self.assertEqual(transport.fail_times, 7)
+        self.assertEqual(SMS_FAILED.value, failed + 1)
+
+    async def test_full_queue_rejects_new_numbers_but_still_coalesces(self):
+        transport = FakeSmsTransport()
+        dispatcher = await self.dispatcher(transport, max_queue=1, workers=1, coalesce_window=0.2)
+        rejected = SMS_REJECTED.value
+        self.assertTrue(dispatcher.enqueue("+1555", "one"))
+        # The worker took the first number off the queue and is waiting out the window
+        await asyncio.sleep(0.05)
+        self.assertTrue(dispatcher.enqueue("+1666", "two"))
+        self.assertFalse(dispatcher.enqueue("+1777", "three"))
+        self.assertTrue(dispatcher.enqueue("+1666", "four"))
+        await dispatcher.queue.join()
+
+        self.assertEqual(SMS_REJECTED.value, rejected + 1)
+        self.assertEqual(sorted(transport.sent), [("+1555", "one"), ("+1666", "2 new notifications:\ntwo\nfour")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+from solana.rpc.async_api import AsyncClient
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey as PublicKey
+import asyncio
+import os
+import tempfile
+import unittest
+
+from src.balance_cache import BalanceCache
+from src.blockhash import BlockhashService
+from src.bulk_transfer import (
+    CONFIRMED, FAILED, INVALID, PACKET_DATA_SIZE, PENDING, SUBMITTED, BulkTransfer, parse_row, transaction_size
+)
+from src.confirmation import ConfirmationTracker
+from src.fake_rpc import FakeRpcServer
+from src.solana_manager import SolanaManager
+from tests.helpers import free_port
+
+
+class Manager:
+    """The parts of SolanaManager a bulk transfer uses, pointed at one fake node"""
+
+    build_transaction = SolanaManager.build_transaction
+    signature_seen = SolanaManager.signature_seen
+
+    def __init__(self, url: str):
+        self.keypair = Keypair()
+        self.client = AsyncClient(url)
+        self.blockhash = BlockhashService(self.client)
+        self.confirmations = ConfirmationTracker(self.client, poll_interval=0.05, rebroadcast_interval=0.05)
+        self.balance_cache = BalanceCache(self._fetch_balance)
+
+    async def _fetch_balance(self, pubkey, commitment) -> int:
+        return (await self.client.get_balance(PublicKey.from_string(pubkey), commitment)).value
+
+
+def payouts(count: int):
+    return [(str(PublicKey.new_unique()), "0.001") for _ in range(count)]
+
+
+def paid(server: FakeRpcServer):
+    """Lamports per recipient across every transaction that landed"""
+    totals = {}
+    for transaction in server.transactions.values():
+        keys = transaction.message.account_keys
+        for instruction in transaction.message.instructions:
+            recipient = str(keys[instruction.accounts[1]])
+            totals[recipient] = totals.get(recipient, 0) + int.from_bytes(bytes(instruction.data)[4:12], "little")
+    return totals
+
+
+class BulkTransferTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeRpcServer(free_port())
+        await self.server.start()
+        self.manager = Manager(self.server.url)
+        await self.manager.confirmations.start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.state_path = os.path.join(self.directory.name, "payouts.state.jsonl")
+
+    async def asyncTearDown(self):
+        await self.manager.confirmations.stop()
+        await self.manager.client.close()
+        await self.server.stop()
+        self.directory.cleanup()
+
+    def bulk(self, rows, **kwargs) -> BulkTransfer:
+        return BulkTransfer(self.manager, rows, self.state_path, **kwargs)
+
+    async def test_packs_transfers_up_to_packet_size(self):
+        bulk = self.bulk(payouts(200))
+        payer = self.manager.keypair.pubkey()
+        batches = list(bulk._pack(bulk.pending()))
+
+        self.assertGreater(len(batches), 1)
+        self.assertEqual([row for batch in batches for row in batch], bulk.rows)
+        for batch, following in zip(batches, batches[1:] + [None]):
+            transaction, _ = await self.manager.build_transaction([row.instruction(payer) for row in batch])
+            self.assertLessEqual(len(bytes(transaction)), PACKET_DATA_SIZE)
+            if following:
+                # Full: one more transfer would not fit
+                instructions = [row.instruction(payer) for row in batch + following[:1]]
+                self.assertGreater(transaction_size(instructions, payer), PACKET_DATA_SIZE)
+
+    async def test_run_pays_everyone_once(self):
+        rows = payouts(100)
+        bulk = self.bulk(rows)
+        counts = await bulk.run()
+
+        self.assertEqual(counts, {CONFIRMED: 100})
+        self.assertEqual(paid(self.server), {recipient: 1_000_000 for recipient, _ in rows})
+        self.assertEqual(len(self.server.transactions), len({row.signature for row in bulk.rows}))
+
+    async def test_resume_after_submitted(self):
+        rows = payouts(60)
+        bulk = self.bulk(rows)
+        landed, lost = list(bulk._pack(bulk.pending()))[:2]
+        payer = self.manager.keypair.pubkey()
+
+        # Interrupted after writing both signatures: the first batch reached the node, the second never did
+        transaction, last_valid_block_height = await self.manager.build_transaction(
+            [row.instruction(payer) for row in landed]
+        )
+        bulk._record(landed, SUBMITTED, str(transaction.signatures[0]), last_valid_block_height)
+        await self.manager.client.send_transaction(transaction)
+        transaction, _ = await self.manager.build_transaction([row.instruction(payer) for row in lost])
+        bulk._record(lost, SUBMITTED, str(transaction.signatures[0]), self.server.slot - 1)
+        sends = self.server.sends
+
+        resumed = self.bulk(rows)
+        self.assertEqual(resumed.counts()[SUBMITTED], len(landed) + len(lost))
+        counts = await resumed.run()
+
+        self.assertEqual(counts, {CONFIRMED: 60})
+        self.assertEqual(paid(self.server), {recipient: 1_000_000 for recipient, _ in rows})
+        # Only the lost batch and any rows never submitted were sent
+        self.assertEqual(self.server.sends - sends, len(list(resumed._pack(resumed.rows[len(landed):]))))
+
+    async def test_expired_batches_return_to_pending(self):
+        self.server.drop_transactions = True
+        rows = payouts(50)
+        bulk = self.bulk(rows, max_rounds=1)
+        run = asyncio.create_task(bulk.run())
+        while not self.server.sends:
+            await asyncio.sleep(0.01)
+        self.server.advance(200)
+
+        self.assertEqual(await run, {PENDING: 50})
+        self.assertEqual(paid(self.server), {})
+
+        self.server.drop_transactions = False
+        self.assertEqual(await self.bulk(rows).run(), {CONFIRMED: 50})
+        self.assertEqual(paid(self.server), {recipient: 1_000_000 for recipient, _ in rows})
+
+    async def test_failed_rows_are_sent_again(self):
+        rows = payouts(10)
+        bulk = self.bulk(rows)
+        bulk._record(bulk.rows, FAILED, error="rejected")
+
+        rerun = self.bulk(rows)
+        self.assertEqual(rerun.plan(), (10 * 1_000_000, 1))
+        self.assertEqual(await rerun.run(), {CONFIRMED: 10})
+
+    async def test_state_of_another_list_is_refused(self):
+        self.bulk(payouts(10))
+        with self.assertRaises(ValueError):
+            self.bulk(payouts(10))
+
+
+class ParseRowTest(unittest.TestCase):
+    def test_amounts(self):
+        recipient = str(PublicKey.new_unique())
+        self.assertEqual(parse_row(0, recipient, "1.5").lamports, 1_500_000_000)
+        for amount, error in [
+            ("0", "amount must be positive"),
+            ("-1", "amount must be positive"),
+            ("abc", "invalid amount"),
+            ("inf", "invalid amount"),
+            ("nan", "invalid amount"),
+            ("1e30", "amount too large"),
+        ]:
+            row = parse_row(0, recipient, amount)
+            self.assertEqual((row.status, row.error), (INVALID, error), amount)
+
+
+if __name__ == "__main__":
+    unittest.main()
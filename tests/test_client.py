@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+
+from src.client import SolanaClient
+from tests.helpers import FakeApiServer
+
+
+class SolanaClientTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeApiServer()
+        await self.server.start()
+        self.client = SolanaClient(self.server.url, request_timeout=0.5)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.stop()
+
+    async def open_channel(self):
+        await self.client.connect()
+        self.client._open_channel()
+        for _ in range(100):
+            if self.client.channel_open:
+                return
+            await asyncio.sleep(0.01)
+        self.fail("Notification channel never opened")
+
+    async def test_connect_leaves_the_channel_closed(self):
+        await self.client.connect()
+        await asyncio.sleep(0.05)
+        self.assertFalse(self.client.channel_open)
+
+    async def test_first_notification_goes_over_http_and_opens_the_channel(self):
+        reply = await self.client.send_transaction("wallet", 1.0, "recipient")
+        self.assertEqual(reply["status"], "success")
+        self.assertEqual(len(self.server.posts), 1)
+        await self.open_channel()
+
+        reply = await self.client.send_transaction("wallet", 2.0, "recipient")
+        self.assertEqual(reply["type"], "notify_result")
+        self.assertEqual(len(self.server.posts), 1)
+        self.assertEqual(self.server.notifies[0]["transaction"]["amount"], 2.0)
+
+    async def test_unanswered_notification_is_not_resent(self):
+        self.server.reply_to_notify = False
+        await self.open_channel()
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.client.send_transaction("wallet", 1.0, "recipient")
+        self.assertEqual(len(self.server.notifies), 1)
+        self.assertEqual(self.server.posts, [])
+
+    async def test_notification_lost_with_the_channel_is_not_resent(self):
+        self.server.reply_to_notify = False
+        await self.open_channel()
+        self.assertIsNone(await self.client.send_transaction("wallet", 1.0, "recipient", wait=False))
+        while not self.server.notifies:
+            await asyncio.sleep(0.01)
+        await self.server.disconnect()
+        await asyncio.sleep(0.1)
+        self.assertFalse(self.client.channel_open)
+        self.assertEqual(len(self.server.notifies), 1)
+        self.assertEqual(self.server.posts, [])
+
+    async def test_non_dict_frames_are_skipped(self):
+        self.server.greeting = ["hello", 42, [None, {"type": "ping"}]]
+        await self.open_channel()
+        reply = await self.client.send_transaction("wallet", 1.0, "recipient")
+        self.assertEqual(reply["type"], "notify_result")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+from solana.rpc.async_api import AsyncClient
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.message import Message
+from solders.pubkey import Pubkey as PublicKey
+from solders.system_program import TransferParams, transfer
+from solders.transaction import Transaction
+import asyncio
+import unittest
+
+from src.confirmation import CONFIRMED, EXPIRED, FINALIZED, ConfirmationTracker, TransactionExpiredError
+from src.fake_rpc import FakeRpcServer
+from src.rpc_pool import EndpointPool, PooledAsyncClient, pinned
+from src.rpc_pubsub import RpcPubSub
+from tests.helpers import eventually, free_port
+
+
+def payment() -> Transaction:
+    keypair = Keypair()
+    blockhash = Hash.new_unique()
+    instruction = transfer(TransferParams(from_pubkey=keypair.pubkey(), to_pubkey=PublicKey.new_unique(), lamports=1))
+    return Transaction([keypair], Message.new_with_blockhash([instruction], keypair.pubkey(), blockhash), blockhash)
+
+
+class ConfirmationTrackerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeRpcServer(free_port())
+        await self.server.start()
+        self.client = AsyncClient(self.server.url)
+        self.tracker = ConfirmationTracker(self.client, poll_interval=0.05, rebroadcast_interval=0.05, expiry_margin=20)
+        self.statuses = []
+
+    async def asyncTearDown(self):
+        await self.tracker.stop()
+        await self.client.close()
+        await self.server.stop()
+
+    async def track_dropped(self):
+        """Send a transaction the node accepts but never lands"""
+        self.server.drop_transactions = True
+        transaction = payment()
+        await self.client.send_transaction(transaction)
+        return self.tracker.track(
+            str(transaction.signatures[0]), bytes(transaction), self.server.slot + 5,
+            callback=lambda tracked, status: self.statuses.append(status)
+        )
+
+    async def test_rebroadcasts_until_landed(self):
+        tracked = await self.track_dropped()
+        await self.tracker.poll()
+        self.server.drop_transactions = False
+        await asyncio.sleep(0.06)
+        await self.tracker.poll()
+        await self.tracker.poll()
+        self.assertTrue(tracked.finalized.done())
+        self.assertEqual(self.statuses[-1], FINALIZED)
+        self.assertGreaterEqual(self.server.sends, 2)
+
+    async def test_expires_once_past_the_margin(self):
+        tracked = await self.track_dropped()
+        await self.tracker.start()
+
+        # Past the last valid block height but within the margin: still in flight
+        self.server.advance(10)
+        await asyncio.sleep(0.2)
+        self.assertFalse(tracked.confirmed.done())
+        self.assertIn(tracked.signature, self.tracker.in_flight)
+
+        self.server.advance(20)
+        with self.assertRaises(TransactionExpiredError):
+            await asyncio.wait_for(tracked.confirmed, 2)
+        self.assertEqual(self.statuses, [EXPIRED])
+        self.assertNotIn(tracked.signature, self.tracker.in_flight)
+
+    async def test_no_rebroadcast_past_the_last_valid_block_height(self):
+        tracked = await self.track_dropped()
+        self.server.advance(10)
+        sends = self.server.sends
+        await asyncio.sleep(0.06)
+        await self.tracker.poll()
+        self.assertEqual(self.server.sends, sends)
+        self.assertIn(tracked.signature, self.tracker.in_flight)
+
+
+class PubSubConfirmationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeRpcServer(free_port())
+        await self.server.start()
+        self.client = AsyncClient(self.server.url)
+        self.pubsub = RpcPubSub(self.server.url.replace("http", "ws", 1))
+        await self.pubsub.start()
+        await eventually(lambda: self.pubsub.connected)
+        # Polls too rarely to matter: only the notification can confirm
+        self.tracker = ConfirmationTracker(self.client, self.pubsub, poll_interval=60)
+        self.statuses = []
+
+    async def asyncTearDown(self):
+        await self.pubsub.stop()
+        await self.client.close()
+        await self.server.stop()
+
+    async def test_confirmed_by_notification(self):
+        self.server.drop_transactions = True
+        transaction = payment()
+        await self.client.send_transaction(transaction)
+        tracked = self.tracker.track(
+            str(transaction.signatures[0]), bytes(transaction), self.server.slot + 150,
+            callback=lambda tracked, status: self.statuses.append(status)
+        )
+        await eventually(lambda: self.server.subscriptions)
+
+        self.server.drop_transactions = False
+        await self.client.send_raw_transaction(bytes(transaction))
+        await asyncio.wait_for(tracked.confirmed, 2)
+        self.assertEqual(self.statuses, [CONFIRMED])
+        # Finalization is left to polling, without the subscription
+        self.assertFalse(tracked.finalized.done())
+        await eventually(lambda: not self.server.subscriptions)
+
+
+class PinnedConfirmationTest(unittest.IsolatedAsyncioTestCase):
+    """Two nodes that don't share transactions, as a lagging node doesn't yet"""
+
+    async def asyncSetUp(self):
+        self.sender, self.other = FakeRpcServer(free_port()), FakeRpcServer(free_port())
+        for server in (self.sender, self.other):
+            await server.start()
+        self.pool = EndpointPool([self.sender.url, self.other.url], eject_for=10)
+        self.client = PooledAsyncClient(self.pool, timeout=2)
+        self.tracker = ConfirmationTracker(self.client, poll_interval=0.05, expiry_margin=20)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        for server in (self.sender, self.other):
+            await server.stop()
+
+    async def test_reads_follow_the_sending_endpoint(self):
+        transaction = payment()
+        with pinned(self.client, self.sender.url) as endpoint:
+            await self.client.send_transaction(transaction)
+        self.assertEqual(endpoint, self.sender.url)
+        tracked = self.tracker.track(
+            str(transaction.signatures[0]), bytes(transaction), self.sender.slot + 5, endpoint=endpoint
+        )
+        # The other node is far past the blockhash and has never seen the signature
+        self.other.advance(1000)
+        for _ in range(5):
+            await self.tracker.poll()
+        self.assertTrue(tracked.finalized.done())
+        self.assertIsNotNone(tracked.finalized.result())
+        self.assertEqual(self.other.sends, 0)
+
+    async def test_pinned_requests_do_not_fail_over(self):
+        self.sender.down = True
+        with pinned(self.client, self.sender.url):
+            with self.assertRaises(Exception):
+                await self.client.get_block_height()
+        self.assertEqual(self.other.requests, 0)
+
+    async def test_unknown_endpoint_falls_back_to_the_pool(self):
+        with pinned(self.client, "http://127.0.0.1:1") as endpoint:
+            self.assertIn(endpoint, (self.sender.url, self.other.url))
+            await self.client.get_block_height()
+
+
+if __name__ == "__main__":
+    unittest.main()
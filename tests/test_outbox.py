@@ -0,0 +1,85 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from src.client import SolanaClient
+from src.outbox import REJECTED, RETRY, SENT, NotificationOutbox
+from tests.helpers import FakeApiServer
+
+
+def notification(amount: float) -> dict:
+    return {"wallet_address": "wallet", "amount": amount, "recipient": "recipient", "type": "transfer"}
+
+
+class NotificationOutboxTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeApiServer()
+        await self.server.start()
+        self.client = SolanaClient(self.server.url, request_timeout=1)
+        self.directory = tempfile.TemporaryDirectory()
+        self.outbox = NotificationOutbox(
+            self.client, os.path.join(self.directory.name, "outbox.db"), backoff=0.01, max_backoff=0.05
+        )
+
+    async def asyncTearDown(self):
+        await self.outbox.stop()
+        await self.client.close()
+        await self.server.stop()
+        self.directory.cleanup()
+
+    async def queue(self, *amounts: float):
+        """Queue rows before the drain loop runs, so they go out as one batch"""
+        await self.outbox._call(self.outbox._open)
+        for amount in amounts:
+            await self.outbox.add(notification(amount))
+        await self.outbox._call(self.outbox._close)
+
+    async def drained(self):
+        for _ in range(200):
+            if not await self.outbox.pending():
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f"{await self.outbox.pending()} notifications never delivered")
+
+    async def test_delivers_queued_rows_in_one_batch(self):
+        await self.queue(1, 2, 3)
+        await self.outbox.start()
+        await self.drained()
+        self.assertEqual([[row["amount"] for row in batch] for batch in self.server.batches], [[1, 2, 3]])
+
+    async def test_rejected_rows_are_not_retried(self):
+        await self.queue(1, 0)
+        await self.outbox.start()
+        await self.drained()
+        self.assertEqual(len(self.server.batches), 1)
+
+    async def test_undelivered_rows_stay_queued(self):
+        await self.server.stop()
+        self.outbox.backoff = 10
+        await self.outbox.start()
+        await self.outbox.add(notification(1))
+        await asyncio.sleep(0.1)
+        self.assertEqual(await self.outbox.pending(), 1)
+        self.assertGreater(await self.outbox._call(self.outbox._next_due), time.time())
+
+    async def test_results_before_a_failure_are_kept(self):
+        await self.client.connect()
+        self.server.cut_batch_after = 2
+        rows = [(i, notification(amount), 0) for i, amount in enumerate((1, 0, 3, 4))]
+        self.assertEqual(await self.outbox._deliver(rows), [SENT, REJECTED, RETRY, RETRY])
+
+    async def test_only_rows_without_a_result_are_resent(self):
+        await self.queue(1, 2, 3, 4, 5)
+        self.server.cut_batch_after = 2
+        await self.outbox.start()
+        await self.drained()
+        first, *retries = self.server.batches
+        self.assertEqual(len(first), 5)
+        # Each retried row has its own jittered backoff, so they may go out in separate batches
+        self.assertEqual(sorted(row["amount"] for batch in retries for row in batch), [3, 4, 5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+from solders.pubkey import Pubkey as PublicKey
+import asyncio
+import time
+import unittest
+
+from src.fake_rpc import FakeRpcServer
+from src.rpc_pool import EndpointPool, PooledAsyncClient
+from tests.helpers import free_port
+
+
+class EndpointPoolTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.servers = [FakeRpcServer(free_port()), FakeRpcServer(free_port())]
+        for server in self.servers:
+            await server.start()
+        self.pool = EndpointPool([server.url for server in self.servers], eject_for=10)
+        self.client = PooledAsyncClient(self.pool, timeout=2)
+        self.pubkey = PublicKey.new_unique()
+        for server in self.servers:
+            server.balances[str(self.pubkey)] = 7
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        for server in self.servers:
+            await server.stop()
+
+    async def balance(self) -> int:
+        return (await self.client.get_balance(self.pubkey)).value
+
+    async def test_prefers_the_faster_endpoint(self):
+        slow, fast = self.servers
+        slow.latency = 0.1
+        for _ in range(20):
+            await self.balance()
+        self.assertGreater(fast.requests, slow.requests)
+
+    async def test_failing_endpoint_is_ejected(self):
+        down = self.servers[0]
+        down.down = True
+        pool = EndpointPool([down.url], eject_for=10)
+        client = PooledAsyncClient(pool, timeout=2)
+        try:
+            for _ in range(pool.eject_after):
+                self.assertFalse(pool.endpoints[0].ejected)
+                with self.assertRaises(Exception):
+                    await client.get_balance(self.pubkey)
+        finally:
+            await client.close()
+        self.assertTrue(pool.endpoints[0].ejected)
+        self.assertEqual(pool.endpoints[0].ejections, 1)
+
+    async def test_calls_avoid_an_ejected_endpoint(self):
+        ejected, healthy = self.servers
+        self.pool._eject(self.pool.endpoints[0])
+        for _ in range(5):
+            self.assertEqual(await self.balance(), 7)
+        self.assertEqual((ejected.requests, healthy.requests), (0, 5))
+
+    async def test_ejected_endpoint_is_readmitted_after_recovering(self):
+        down, _ = self.servers
+        down.down = True
+        for _ in range(self.pool.eject_after):
+            await self.client._provider.probe()
+        endpoint = self.pool.endpoints[0]
+        self.assertTrue(endpoint.ejected)
+
+        # Still down once the ejection is served: out again, for longer
+        endpoint.ejected_until = time.monotonic()
+        await self.client._provider.probe()
+        self.assertGreater(endpoint.ejected_until, time.monotonic() + self.pool.eject_for)
+        self.assertEqual(endpoint.ejections, 2)
+
+        # Not probed while serving it, then re-admitted by the first probe that succeeds
+        down.down = False
+        await self.client._provider.probe()
+        self.assertTrue(endpoint.ejected)
+        endpoint.ejected_until = time.monotonic()
+        await self.client._provider.probe()
+        self.assertFalse(endpoint.ejected)
+        self.assertEqual(await self.balance(), 7)
+
+    async def test_lagging_endpoint_is_ejected(self):
+        _, lagging = self.servers
+        lagging.slot_lag = self.pool.max_slot_lag + 10
+        for _ in range(self.pool.eject_after):
+            await self.client._provider.probe()
+
+        self.assertFalse(self.pool.endpoints[0].ejected)
+        self.assertTrue(self.pool.endpoints[1].ejected)
+
+    async def test_in_flight_call_fails_over(self):
+        failing, healthy = self.servers
+        failing.latency = 0.2
+        call = asyncio.create_task(self.balance())
+        while not failing.requests:
+            await asyncio.sleep(0.01)
+        # Goes down while answering this very request
+        failing.down = True
+
+        self.assertEqual(await call, 7)
+        self.assertEqual((failing.requests, healthy.requests), (1, 1))
+        self.assertEqual(self.pool.endpoints[0].failures, 1)
+
+    async def test_errors_surface_once_every_endpoint_fails(self):
+        for server in self.servers:
+            server.down = True
+        with self.assertRaises(Exception):
+            await self.balance()
+        self.assertEqual([server.requests for server in self.servers], [1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import asyncio
+import unittest
+
+from src.fake_rpc import FakeRpcServer
+from src.rpc_pubsub import RpcPubSub
+from tests.helpers import eventually, free_port
+
+
+class RpcPubSubTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeRpcServer(free_port())
+        await self.server.start()
+        self.pubsub = RpcPubSub(self.server.url.replace("http", "ws", 1), request_timeout=2)
+        self.events = []
+        self.pubsub.on_connect(self.connected)
+        self.pubsub.on_disconnect(lambda: self.events.append("disconnect"))
+        await self.pubsub.start()
+        await eventually(lambda: self.pubsub.connected)
+
+    async def asyncTearDown(self):
+        await self.pubsub.stop()
+        await self.server.stop()
+
+    async def connected(self):
+        self.events.append("connect")
+
+    async def test_identical_subscriptions_share_one_node_subscription(self):
+        first, second = [], []
+        a = await self.pubsub.account_subscribe("pubkey", first.append)
+        b = await self.pubsub.account_subscribe("pubkey", second.append)
+        other = await self.pubsub.account_subscribe("other", lambda _: None)
+        self.assertEqual(len(self.server.subscriptions), 2)
+        self.assertEqual(self.pubsub.subscriptions, 2)
+
+        await self.server.publish("accountSubscribe", "pubkey", {"lamports": 5})
+        await eventually(lambda: first and second)
+        self.assertEqual(first, [{"lamports": 5}])
+
+        # The node subscription outlives all but its last sharer
+        await a.close()
+        self.assertEqual(len(self.server.subscriptions), 2)
+        await b.close()
+        await eventually(lambda: len(self.server.subscriptions) == 1)
+        await other.close()
+        await eventually(lambda: not self.server.subscriptions)
+        self.assertEqual(self.pubsub.subscriptions, 0)
+
+    async def test_closed_subscription_gets_no_more_notifications(self):
+        received = []
+        subscription = await self.pubsub.account_subscribe("pubkey", received.append)
+        await subscription.close()
+        await self.server.publish("accountSubscribe", "pubkey", {"lamports": 5})
+        await asyncio.sleep(0.05)
+        self.assertEqual(received, [])
+
+    async def test_subscriptions_are_restored_after_a_reconnect(self):
+        received = []
+        await self.pubsub.account_subscribe("pubkey", received.append)
+        await self.server.disconnect()
+        await eventually(lambda: self.events.count("connect") == 2)
+        await eventually(lambda: len(self.server.subscriptions) == 1)
+        self.assertEqual(self.events, ["connect", "disconnect", "connect"])
+
+        await self.server.publish("accountSubscribe", "pubkey", {"lamports": 7})
+        await eventually(lambda: received)
+        self.assertEqual(received, [{"lamports": 7}])
+
+    async def test_subscribing_while_disconnected_waits_for_the_connection(self):
+        await self.server.stop()
+        await eventually(lambda: not self.pubsub.connected)
+        received = []
+        await self.pubsub.account_subscribe("pubkey", received.append)
+        self.assertEqual(self.pubsub.subscriptions, 1)
+
+        await self.server.start()
+        await eventually(lambda: len(self.server.subscriptions) == 1, timeout=5)
+        await self.server.publish("accountSubscribe", "pubkey", {"lamports": 1})
+        await eventually(lambda: received)
+
+    async def test_calls_fail_fast_while_disconnected(self):
+        await self.server.stop()
+        await eventually(lambda: not self.pubsub.connected)
+        with self.assertRaises(ConnectionError):
+            await self.pubsub.call("getSlot", [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+from unittest import mock
+import asyncio
+import time
+import unittest
+
+from src.transport import CircuitBreaker, CircuitOpenError, HttpTransport
+from tests.helpers import FakeApiServer, free_port
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("src.transport.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+
+    def trip(self):
+        for _ in range(3):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.trip()
+        self.assertEqual(self.breaker.state, "open")
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_lets_one_trial_through(self):
+        self.trip()
+        self.now += 10
+        self.assertEqual(self.breaker.state, "half-open")
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_failed_trial_reopens(self):
+        self.trip()
+        self.now += 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "open")
+        self.now += 9
+        self.assertFalse(self.breaker.allow())
+
+    def test_released_trial_frees_the_slot(self):
+        self.trip()
+        self.now += 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow())
+
+
+class HttpTransportTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeApiServer()
+        await self.server.start()
+        self.transport = HttpTransport(self.server.url, timeout=2, backoff=0.01)
+        self.calls = []
+        self.transport.add_hook(lambda method, path, status, elapsed: self.calls.append((method, path, status)))
+
+    async def asyncTearDown(self):
+        await self.transport.close()
+        await self.server.stop()
+
+    async def test_idempotent_calls_are_retried(self):
+        self.server.statuses = [503, 429]
+        response = await self.transport.request("GET", "/transactions")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual([status for _, _, status in self.calls], [503, 429, 200])
+
+    async def test_post_is_not_retried(self):
+        self.server.statuses = [503]
+        response = await self.transport.request("POST", "/transaction", json={})
+        self.assertEqual(response.status, 503)
+        self.assertEqual(self.server.requests, 1)
+
+    async def test_gives_up_after_the_last_retry(self):
+        self.server.statuses = [503, 503, 503, 503]
+        response = await self.transport.request("GET", "/transactions")
+        self.assertEqual(response.status, 503)
+        self.assertEqual(self.server.requests, self.transport.retries + 1)
+
+    async def test_deadline_covers_every_attempt(self):
+        self.server.delay = 1
+        started = time.monotonic()
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.transport.request("GET", "/transactions", timeout=0.2)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    async def test_slow_call_is_hedged(self):
+        self.transport.hedge_after = 0.05
+        self.server.delays = [1]
+        started = time.monotonic()
+        response = await self.transport.request("GET", "/transactions")
+        self.assertEqual(response.status, 200)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(self.server.requests, 2)
+
+    async def test_fast_call_is_not_hedged(self):
+        self.transport.hedge_after = 0.5
+        await self.transport.request("GET", "/transactions")
+        self.assertEqual(self.server.requests, 1)
+
+    async def test_breaker_fails_fast_while_the_server_is_down(self):
+        transport = HttpTransport(f"http://127.0.0.1:{free_port()}", retries=0, breaker=CircuitBreaker(2, 10))
+        self.addAsyncCleanup(transport.close)
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                await transport.request("POST", "/transaction", json={})
+        with self.assertRaises(CircuitOpenError):
+            await transport.request("POST", "/transaction", json={})
+
+
+if __name__ == "__main__":
+    unittest.main()